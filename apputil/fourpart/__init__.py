@@ -14,6 +14,9 @@ __init__ program for FourPart package containing algorithms using music21.
 
 # ----- SYSTEM IMPORTS ----- #
 
+from collections import Counter
+from itertools import permutations
+
 # from copy import deepcopy
 # from enum import IntEnum
 
@@ -50,6 +53,9 @@ from fourpart.settings import default_config
 # utility function
 do_nothing = lambda *args, **kwargs : None
 
+# distinct r-permutations of a multiset (doubled members), in order of first occurrence, with their multiplicities
+distinctPermutations = lambda members, r: Counter(permutations(members, r)).items()
+
 # alternative to pitchClass, returns 0..6 for C..B (for comparison purposes)
 scale_value = lambda n : {'C':0,'D':1,'E':2,'F':3,'G':4,'A':5,'B':6}[n[0]]
 
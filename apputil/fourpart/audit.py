@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+ #--------------#
+# Author:  @npvq #
+# Licence: GPLv3 #
+ #--------------#
+
+ #==================#
+# Module Description #
+ #==================#
+"""\
+Optimality audit of the heuristic pruning (dp_pruning=True) over a corpus of progressions.
+Every phrase is solved with and without pruning (see FourPartBaseObject.DP_AuditPhrase), and the cost gap,
+the pairs saved and the first chord where the optimal solution was pruned are reported, phrase by phrase.
+Run from apputil:
+    python -m fourpart.audit                                   (the Benchmarks progression, default config)
+    python -m fourpart.audit -c dp_confidence=1.1 -c dp_buffer=2 progressions.txt
+Progression files use the parseProgression format (one phrase per line).
+"""
+
+# ----- SYSTEM IMPORTS ----- #
+
+import argparse
+import ast
+import sys
+
+# ----- 3RD PARTY IMPORTS ----- #
+
+
+
+# ----- LOCAL IMPORTS ----- #
+
+from fourpart import do_nothing
+from fourpart.corpus import BENCHMARKS
+from fourpart.fpchords import FourPartChords
+from fourpart.parallel import phraseLines
+
+# ------------------------------ #
+
+def auditProgression(engine, cp):
+    """Yields (phrase text, DP_AuditPhrase report) for every phrase of a progression."""
+    for line in phraseLines(cp):
+        for phrase, _ in engine.parseProgression(line):
+            yield line.strip(), engine.DP_AuditPhrase(phrase)
+
+
+def summarize(reports):
+    """Totals over a list of DP_AuditPhrase reports."""
+    pairs, pairs_exact = sum(r['pairs'] for r in reports), sum(r['pairs_exact'] for r in reports)
+    return {
+        'phrases': len(reports),
+        'suboptimal': sum(r['gap'] > 0 for r in reports),
+        'optimum_pruned': sum(r['first_pruned'] is not None for r in reports),
+        'gap': sum(r['gap'] for r in reports),
+        'max_relative': max((r['relative'] for r in reports), default=0.0),
+        'pairs': pairs,
+        'pairs_exact': pairs_exact,
+        'savings': 1 - pairs / pairs_exact if pairs_exact else 0.0,
+    }
+
+
+def parseSetting(text):
+    """'key=value' (value as a python literal, or a string) -> (key, value), for -c."""
+    key, _, value = text.partition('=')
+    try:
+        return key.strip(), ast.literal_eval(value.strip())
+    except (ValueError, SyntaxError):
+        return key.strip(), value.strip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m fourpart.audit", description="Optimality audit of the pruned DP (dp_pruning=True).")
+    parser.add_argument('files', nargs='*', help="progression files (default: the Benchmarks progression)")
+    parser.add_argument('-c', '--config', action='append', default=[], type=parseSetting, metavar="KEY=VALUE",
+                        help="engine configuration, e.g. -c dp_confidence=1.1 (repeatable)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="print the engine's DP logs")
+    args = parser.parse_args(argv)
+
+    engine = FourPartChords()
+    engine.configure(**dict(args.config))
+    if not args.verbose:
+        engine.logging = False
+        engine.logStream = do_nothing
+    corpus = []
+    for name in args.files:
+        with open(name) as f:
+            corpus.append((name, f.read()))
+    corpus = corpus or [("Benchmarks", BENCHMARKS)]
+
+    reports = []
+    for name, cp in corpus:
+        print(f"== {name}")
+        for line, report in auditProgression(engine, cp):
+            reports.append(report)
+            first = '-' if report['first_pruned'] is None else report['first_pruned'] + 1 # (chords numbered from 1, like the logs)
+            print(f"{line}\n    cost {report['cost']} (optimal {report['optimal']}, gap {report['gap']}), "
+                  f"pairs {report['pairs']}/{report['pairs_exact']} ({report['savings']:.0%} saved), optimum pruned at chord {first}")
+
+    total = summarize(reports)
+    print(f"== {total['phrases']} phrases: {total['suboptimal']} suboptimal (total gap {total['gap']}, worst {total['max_relative']:.1%}), "
+          f"optimum pruned in {total['optimum_pruned']}, pairs {total['pairs']}/{total['pairs_exact']} ({total['savings']:.0%} saved)")
+    return 1 if total['suboptimal'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
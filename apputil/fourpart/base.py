@@ -11,6 +11,10 @@
 
 # ----- SYSTEM IMPORTS ----- #
 
+import copy
+import heapq
+import threading
+
 # Debugging/Logging
 import time
 
@@ -20,11 +24,15 @@ import time
 #   pitch, # MUSIC21 fundamentals
 # )
 import music21 as mus # unfortunately it is necessary (for consistency)
+import numpy as np
 
 # ----- LOCAL IMPORTS ----- #
 
 from fourpart import do_nothing
 from fourpart.settings import default_config
+from fourpart.cache import LRUCache
+from fourpart.vectorized import VoicingArrays, minPlusRow
+from fourpart.parallel import solveProgression
 
 # ------------------------------ #
 
@@ -33,8 +41,7 @@ class FourPartBaseObject(object):
     # Virtual Class (Don't Instantiate)
 
     def __init__(self, **kwargs):
-        self.config = default_config
-        self.config.update(kwargs)
+        self.config = default_config.replace(**kwargs) # (immutable: default_config itself is never modified)
 
         self._range_keys = [['bass_range_min',    'bass_range_max',    'bass_range_min_allowable',    'bass_range_max_allowable'   ],
                             ['tenor_range_min',   'tenor_range_max',   'tenor_range_min_allowable',   'tenor_range_max_allowable'  ],
@@ -42,10 +49,28 @@ class FourPartBaseObject(object):
                             ['soprano_range_min', 'soprano_range_max', 'soprano_range_min_allowable', 'soprano_range_max_allowable']]
         
         self.ranges = [[self.config[k] for k in voice] for voice in self._range_keys]
+        self.rangeFingerprint = self._get_rangeFingerprint()
+
+        # generated voicing sets (see voiceChord), valid for one rangeFingerprint
+        self.voicingCache = LRUCache(self.config['voicing_cache_size'], self.config['voicing_cache_dir'])
+        # transition cost matrices (see _get_transitionCostMatrix), valid for one vlFingerprint
+        self.vlFingerprint = self._get_vlFingerprint()
+        self.transitionCache = LRUCache(self.config['transition_cache_size'])
+        # rule features of the same matrices (see _get_transitionFeatures), valid for any weights
+        self.featureCache = LRUCache(self.config['feature_cache_size'])
+        # rules left out of the cost kernels (zero weights), see _ruleOn
+        self.zeroRules = self._get_zeroRules()
+
+        self.DP_MemoizePhrase = self._get_DP_MemoizePhrase()
 
-        self.DP_MemoizePhrase = self.DP_MemoizePhrasePrune if self.config['dp_pruning'] else self.DP_MemoizePhraseNoPruning
+        # cost functions built by the factories, keyed by the fingerprint of the config subset they read (shared with overlays):
+        # chordCost, and the voiceLeadingCost kernel of every chord pair
+        self.costFunctionCache = LRUCache(256)
+        self.chordCost = self._get_cachedChordCostFunction()
 
-        self.chordCost = self._get_chordCostFunction() # this will break the program if you run __init__.
+        # Engine statistics (counters accumulated over the lifetime of the engine). Non config-related.
+        self.stats = {'voicing_duplicates_removed': 0, 'pairs_bounded': 0}
+        self.statsLock = threading.Lock() # (stats are shared with overlays, see addStat)
 
         # Debug/Logging. Non config-related.
         self.logging = True
@@ -54,21 +79,114 @@ class FourPartBaseObject(object):
     def configure(self, **kwargs):
         """\
         Updates configurations and ensures that those updates take effect.
+        The config is immutable (settings.Config), so it is replaced rather than updated: default_config and other
+        engines are unaffected. For settings that only apply to one request, see overlay and solve.
         Should be overridden by subclasses should more internal states be implemented."""
 
-        self.config.update(kwargs)
+        self._applyConfig(self.config.replace(**kwargs))
+
+    def _applyConfig(self, config, shared=False):
+        """\
+        Switches to config, rebuilding only the state that depends on the keys that changed.
+        shared: the caches are shared with another engine (see overlay), so they are kept (their keys include the
+        fingerprints of what they depend on) or replaced, never cleared.
+        """
+        changed = self.config.changed(config)
+        self.config = config
 
         chord_cost_change = False
 
-        if any("_range_" in key for key in kwargs.keys()):
+        if any("_range_" in key for key in changed):
             self.ranges = [[self.config[k] for k in voice] for voice in self._range_keys]
+            self.rangeFingerprint = self._get_rangeFingerprint()
+            if not shared:
+                self.voicingCache.clear() # cached voicings were generated for the old ranges
             chord_cost_change = True
 
-        if chord_cost_change or any(key.startswith("ch_") for key in kwargs.keys()):
-            self.chordCost = self._get_chordCostFunction() # this will break the program if you run __init__.
+        if any(key.startswith("voicing_cache_") for key in changed):
+            self.voicingCache = LRUCache(self.config['voicing_cache_size'], self.config['voicing_cache_dir'])
+
+        if any(key.startswith("vl_") for key in changed):
+            self.vlFingerprint = self._get_vlFingerprint()
+            if not shared:
+                self.transitionCache.clear() # cached matrices were computed with the old weights
+
+        if "transition_cache_size" in changed:
+            self.transitionCache = LRUCache(self.config['transition_cache_size'])
+
+        if "feature_cache_size" in changed:
+            self.featureCache = LRUCache(self.config['feature_cache_size'])
+
+        if any(key.startswith(("ch_", "vl_")) for key in changed):
+            self.zeroRules = self._get_zeroRules()
+
+        if chord_cost_change or any(key.startswith("ch_") for key in changed):
+            self.chordCost = self._get_cachedChordCostFunction()
+
+        if "dp_pruning" in changed:
+            self.DP_MemoizePhrase = self._get_DP_MemoizePhrase()
+
+    def overlay(self, **overrides):
+        """\
+        Engine for one request: a shallow copy of this engine with overrides applied to its config (this engine and its
+        config are left untouched). The copy shares the caches (voicings, transition matrices, cost functions) and
+        only rebuilds what the changed ch_/vl_/range keys invalidate, so an overlay is cheap, and overlays of one engine
+        can solve concurrently (in threads: the caches and the stats, which accumulate in this engine's, are locked).
+        """
+        engine = copy.copy(self)
+        engine._applyConfig(self.config.replace(**overrides), shared=True)
+        engine.DP_MemoizePhrase = engine._get_DP_MemoizePhrase() # (bound to the copy)
+        return engine
+
+    def solve(self, cp, overrides=None):
+        """\
+        Parses and solves progression cp: the best (totalCost, [compact voicing of every chord]) of every phrase.
+        overrides: config values for this call only (see overlay), e.g. engine.solve(cp, overrides={'dp_confidence': 1.5}).
+        """
+        return solveProgression(self.overlay(**overrides) if overrides else self, cp)
+
+    def _get_DP_MemoizePhrase(self):
+        """DP algorithm selected by dp_pruning: True (heuristic), 'exact' (bound-based, optimal), 'beam' (bounded width) or False."""
+        if self.config['dp_pruning'] == 'exact':
+            return self.DP_MemoizePhraseExact
+        if self.config['dp_pruning'] == 'beam':
+            return self.DP_MemoizePhraseBeam
+        return self.DP_MemoizePhrasePrune if self.config['dp_pruning'] else self.DP_MemoizePhraseNoPruning
+
+    def _get_rangeFingerprint(self):
+        """Hashable summary of the voice ranges, part of every voicing cache key."""
+        return tuple(p.nameWithOctave for voice in self.ranges for p in voice)
+
+    def _get_vlFingerprint(self):
+        """Fingerprint of the voiceLeadingCost weights, part of every transition cache key."""
+        return self.config.subset(lambda k: k.startswith('vl_')).fingerprint
+
+    def _get_zeroRules(self):
+        """\
+        Cost rules disabled by the config: the names of the ch_/vl_ weights set to 0. The cost kernels leave these rules
+        out when they are built (see _ruleOn) instead of evaluating them and adding 0. (Memoized rule features keep
+        them: a weight set to 0 and back only re-scores them.)
+        """
+        return frozenset(k for k, v in self.config.items() if k.startswith(('ch_', 'vl_')) and v == 0)
+
+    def _ruleOn(self, *keys):
+        """Whether the rule costing the product of the weights keys is enabled (none of them is 0)."""
+        return self.zeroRules.isdisjoint(keys)
+
+    def _get_cachedChordCostFunction(self):
+        """chordCost for the current ch_ weights and voice ranges, built once per distinct (fingerprinted) subset."""
+        key = self.config.subset(lambda k: k.startswith('ch_') or '_range_' in k).fingerprint
+        return self.costFunctionCache.get(('chordCost', key), self._get_chordCostFunction)
 
-        if "dp_pruning" in kwargs.keys():
-            self.DP_MemoizePhrase = self.DP_MemoizePhrasePrune if self.config['dp_pruning'] else self.DP_MemoizePhraseNoPruning
+    def cacheInfo(self):
+        """Hit/miss counters and sizes of the engine's caches (for tuning cache sizes)."""
+        return {name: {'hits': cache.hits, 'misses': cache.misses, 'size': len(cache), 'maxsize': cache.maxsize}
+                for name, cache in (('voicing', self.voicingCache), ('transition', self.transitionCache), ('feature', self.featureCache))}
+
+    def addStat(self, stat, n):
+        """Adds n to self.stats[stat] (under statsLock: overlays solving in other threads share the stats)."""
+        with self.statsLock:
+            self.stats[stat] += n
 
     def log(self, *args):
         self.logStream(" ".join([i.__str__() for i in args]))
@@ -91,10 +209,125 @@ class FourPartBaseObject(object):
     def _get_voiceLeadingCostFunction(self, rm1, rm2):
         return NotImplementedError
 
+    def _get_transitionCostFunction(self, rm1, rm2):
+        """Vectorized voiceLeadingCost factory: (VoicingArrays, VoicingArrays) -> cost matrix. Used by the 'numpy' dp_engine."""
+        return NotImplementedError
+
+    def _get_chordFeatureFunction(self, rm, last_chord=False):
+        """\
+        Chord rule features factory: sequence of voicings of rm -> vectorized.RuleFeatures over them, the weight
+        independent counts behind chordCost. None if the engine has none (chord costs are then computed voicing by voicing).
+        """
+        return None
+
+    def _chordCacheKey(self, rm):
+        """Hashable key of everything (but the voicings, ranges and weights) the chord costs of rm depend on, or None (no caching)."""
+        return None
+
+    def chordCosts(self, phrase, V, i, last_chord=None):
+        """\
+        Chord costs of every voicing of chord i of a phrase (V: its voicings per chord), as a list, with the last chord's
+        extra costs if last_chord (default: whether i is the last chord). Scored from the chord rule features memoized in
+        self.featureCache (under chord context, voicing set id and ranges), so that a change of ch_ weights re-scores them
+        with a dot product; computed voicing by voicing with chordCost otherwise.
+        """
+        rm, last_chord = phrase[i][0], i+1 == len(phrase) if last_chord is None else last_chord
+        context, id = self._chordCacheKey(rm), getattr(V[i], 'id', None)
+        if self.featureCache.maxsize and context is not None and id is not None:
+            def compute():
+                featureFunction = self._get_chordFeatureFunction(rm, last_chord)
+                return None if featureFunction is None else featureFunction(V[i])
+            features = self.featureCache.get(('chord', context, id, last_chord, self.rangeFingerprint), compute)
+            if features is not None:
+                return features.score(self.config).tolist()
+        return [self.chordCost(v, rm, last_chord=last_chord) for v in V[i]]
+
+    def _get_transitionFeatureFunction(self, rm1, rm2, skip=frozenset()):
+        """\
+        Rule features factory: (VoicingArrays, VoicingArrays) -> vectorized.RuleFeatures, the weight independent counts
+        _get_transitionCostFunction scores, leaving out the rules weighted by a key in skip (default: none).
+        None if the engine has none (transition costs are then always computed directly).
+        """
+        return None
+
+    def _transitionCacheKey(self, rm1, rm2):
+        """Hashable key of everything (but the voicings and weights) the transition costs from rm1 to rm2 depend on, or None (no caching)."""
+        return None
+
+    def _get_transitionCostMatrix(self, rm1, rm2, V1, V2, A, B):
+        """\
+        Transition cost matrix between the voicings of two chords (V1, V2 as VoicingSets, A, B as VoicingArrays).
+        Matrices are memoized in self.transitionCache under (chord context, voicing set ids, vl_ weights),
+        so a chord pair that repeats (within or across phrases and queries) costs one lookup.
+        Their rule features are memoized in self.featureCache under (chord context, voicing set ids) only, so after
+        a change of weights a matrix is re-scored with a dot product instead of re-evaluating the rules.
+        """
+        context, ids = self._transitionCacheKey(rm1, rm2), (getattr(V1, 'id', None), getattr(V2, 'id', None))
+        if context is None or None in ids:
+            return self._computeTransitionCosts(rm1, rm2, A, B)
+
+        def compute():
+            C = self._computeTransitionCosts(rm1, rm2, A, B, (context, ids))
+            C.flags.writeable = False # shared by every later hit
+            return C
+        return self.transitionCache.get((context, ids, self.vlFingerprint), compute)
+
+    def _get_transitionCostRows(self, rm1, rm2, V1, V2, A, B, rows):
+        """\
+        Rows (voicings of V1 listed in rows, ascending) of the transition cost matrix between V1 and V2, for DP rows
+        whose work is bounded by a mask (deadline or pair budget). Taken from the memoized full matrix, or re-scored
+        from its memoized rule features, when there is one; otherwise only these len(rows) x len(V2) pairs are
+        computed (and not memoized: they are not a full matrix).
+        """
+        context, ids = self._transitionCacheKey(rm1, rm2), (getattr(V1, 'id', None), getattr(V2, 'id', None))
+        if context is not None and None not in ids:
+            C = self.transitionCache.peek((context, ids, self.vlFingerprint))
+            if C is not None:
+                return C[rows]
+            features = self.featureCache.peek((context, ids))
+            if features is not None:
+                return features.score(self.config, rows)
+        return self._get_transitionCostFunction(rm1, rm2)(VoicingArrays([V1[k] for k in rows]), B)
+
+    def _computeTransitionCosts(self, rm1, rm2, A, B, key=None):
+        """\
+        Transition cost matrix, scored from the rule features memoized under key (see _get_transitionFeatures), if any.
+        """
+        features = None if key is None else self._get_transitionFeatures(rm1, rm2, A, B, key)
+        if features is not None:
+            return features.score(self.config)
+        return self._get_transitionCostFunction(rm1, rm2)(A, B)
+
+    def _get_transitionFeatures(self, rm1, rm2, A, B, key):
+        """\
+        Rule features of the transitions between A and B (VoicingArrays of rm1 and rm2), memoized in self.featureCache
+        under key (chord context and voicing set ids: features do not depend on the weights). None if the engine has no
+        feature function or feature_cache_size is 0.
+        """
+        if not self.featureCache.maxsize:
+            return None
+
+        def compute():
+            featureFunction = self._get_transitionFeatureFunction(rm1, rm2)
+            return None if featureFunction is None else featureFunction(A, B)
+        return self.featureCache.get(key, compute)
+
+    def _get_transitionLowerBounds(self, rm1, rm2, A, B):
+        """\
+        Cheap admissible lower bounds of voiceLeadingCost for every (A[k], B[j]) voicing pair (VoicingArrays),
+        as a len(A) x len(B) array, used by the 'exact' pruning. Every rule adds a non-negative count times its weight,
+        so 0 is a bound when no vl_ weight is negative; None (no bound) otherwise. Subclasses may provide tighter bounds.
+        """
+        if any(v < 0 for k, v in self.config.items() if k.startswith('vl_')):
+            return None
+        return np.zeros((len(A), len(B)))
+
     def voiceChord(self, *args):
         """\
         Abstractable (reusable) construct: for each element of "phrase," let it be a tuple
         whose first element contains the roman numeral (with "Key" information).
+        Should return a sequence of compact voicings (fourpart.voicing.Voicing), which is what the DP runs on,
+        preferably a fourpart.voicing.VoicingSet (whose id lets the transition cost matrices be cached).
         """
         return NotImplementedError
 
@@ -102,119 +335,621 @@ class FourPartBaseObject(object):
         """Simplifying construct for voiceLeadingCost"""
         return self._get_voiceLeadingCostFunction(rm1, rm2)(chord1, chord2)
 
-    def DP_MemoizePhraseNoPruning(self, phrase):
+    def _DP_bestPredecessors(self, phrase, V, VA, DP, i, mask=None, kept_only=False):
+        """\
+        Finds the best (totalCost, backReference) into every voicing of chord i (chord cost not yet added).
+        VA (list of VoicingArrays) selects the vectorized ('numpy' dp_engine) path: the whole transition cost
+        matrix is computed at once (and memoized) and reduced with one masked min-plus step. With kept_only (masks
+        that bound the work: deadline, pair budget), only the rows of the predecessors mask keeps are computed
+        instead (see _get_transitionCostRows). Otherwise runs the scalar double loop, which only visits those.
+        All paths break ties towards the smallest backReference. The scalar path skips predecessors that provably
+        cannot win with an exact branch and bound (see dp_branch_and_bound); the result is the same.
+        """
+        if VA is not None:
+            if kept_only and mask is not None:
+                rows = [k for k in range(len(V[i-1])) if mask[k]] # (ascending: ties -> smallest k)
+                if not rows:
+                    return [(1e9, None) for _ in range(len(V[i]))]
+                C = self._get_transitionCostRows(phrase[i-1][0], phrase[i][0], V[i-1], V[i], VA[i-1], VA[i], rows)
+                back, _ = minPlusRow([DP[i-1][k][0] for k in rows], C)
+                best = [(DP[i-1][rows[b]][0] + C[b, j].item(), rows[b]) for j, b in enumerate(back.tolist())]
+                return [b if b[0] < 1e9 else (1e9, None) for b in best]
+            C = self._get_transitionCostMatrix(phrase[i-1][0], phrase[i][0], V[i-1], V[i], VA[i-1], VA[i])
+            back, _ = minPlusRow([item[0] for item in DP[i-1]], C, mask)
+            # recompute the winning sums in python so that costs are identical (value and type) to the scalar loop
+            best = [(DP[i-1][k][0] + C[k, j].item(), k) for j, k in enumerate(back.tolist())]
+            return [b if b[0] < 1e9 else (1e9, None) for b in best]
+
+        voiceLeadingCost = self._get_voiceLeadingCostFunction(phrase[i-1][0], phrase[i][0])
+        predecessors = [k for k in range(len(V[i-1])) if mask is None or mask[k]]
+        bounds = None
+        if self.config['dp_branch_and_bound']:
+            bounds = self._get_voiceLeadingLowerBounds(phrase[i-1][0], phrase[i][0], [V[i-1][k] for k in predecessors], V[i])
+            # Branch and bound: cheapest predecessors first, so that best is found early and the loop stops once
+            # DP[i-1][k] + bounds[j] (a lower bound of every remaining candidate) can no longer beat or tie best.
+            predecessors.sort(key=lambda k: DP[i-1][k][0])
+        row, bounded = [], 0
+        for j in range(len(V[i])):
+            best = (1e9, None) # (totalCost, backReference)
+            for n, k in enumerate(predecessors):
+                if bounds is not None and DP[i-1][k][0] + bounds[j] > best[0]:
+                    bounded += len(predecessors) - n
+                    break
+                current_cost = DP[i-1][k][0] + voiceLeadingCost(V[i-1][k], V[i][j]) # previous_cost + progression cost
+                if current_cost < best[0] or (current_cost == best[0] and best[1] is not None and k < best[1]): # ties -> smallest k
+                    best = (current_cost, k)
+            row.append(best)
+        self.addStat('pairs_bounded', bounded)
+        return row
+
+    @staticmethod
+    def _DP_beamMask(row, width, mask=None):
+        """Mask keeping only the width lowest-cost states of a DP row (among those mask keeps), ties -> smallest index."""
+        keep = sorted((j for j in range(len(row)) if mask is None or mask[j]), key=lambda j: row[j][0])[:width]
+        beam = [False] * len(row)
+        for j in keep:
+            beam[j] = True
+        return beam
+
+    @staticmethod
+    def _DP_newRun(run=None):
+        """\
+        Record of one DP run, filled in by the run (and kept per call, so that concurrent solves of one engine or its
+        overlays do not mix them up): 'mask' (pruning mask, None: nothing pruned), 'deadline' (chord at which the deadline
+        expired, None: it did not) and 'cutoffs' (per chord cutoffs chosen by adaptive pruning, see _DP_budgetMask).
+        run: the caller's dict to fill in (reset), or None for a new one.
+        """
+        run = {} if run is None else run
+        run.update(mask=None, deadline=None, cutoffs=[])
+        return run
+
+    def _DP_budgetMask(self, DP, V, i, budget, run):
+        """\
+        Adaptive pruning of chord i: keeps its lowest-cost voicings so that extending them into chord i+1 costs about
+        budget pairs (at least one voicing). When the best two costs are within dp_budget_widen_gap, the choice is
+        uncertain and twice as many are kept. Ties at the cutoff go to the smallest index, so a chord never costs more
+        than twice its budget. Records {'chord', 'kept', 'of', 'cutoff', 'widened', 'pairs'} in run['cutoffs'].
+        """
+        order = sorted(range(len(DP[i])), key=lambda j: DP[i][j][0])
+        keep = max(1, int(budget // len(V[i+1])))
+        widened = len(order) > 1 and DP[i][order[1]][0] - DP[i][order[0]][0] <= self.config['dp_budget_widen_gap']
+        if widened:
+            keep *= 2
+        mask = self._DP_beamMask(DP[i], keep)
+        run['cutoffs'].append({'chord': i, 'kept': sum(mask), 'of': len(mask), 'cutoff': DP[i][order[min(keep, len(order)) - 1]][0],
+                                 'widened': widened, 'pairs': sum(mask) * len(V[i+1])})
+        return mask
+
+    def _DP_deadlineMask(self, DP, V, Mask, i, run):
+        """\
+        Anytime fallback once a deadline has expired: chord i only extends the dp_deadline_beam best states of chord i-1,
+        so that every remaining chord computes only O(beam x voicings) pairs (under either dp_engine). Returns the (created if None) updated mask.
+        Records chord i in run['deadline'] (the first time).
+        """
+        if run['deadline'] is None:
+            run['deadline'] = i
+            self.log(f"DP: deadline reached at chord {i+1}, finishing with the {self.config['dp_deadline_beam']} best voicings per chord (non-optimal)")
+        if Mask is None:
+            Mask = [[True for _ in range(len(V[r]))] for r in range(len(V))]
+        Mask[i-1] = self._DP_beamMask(DP[i-1], self.config['dp_deadline_beam'], Mask[i-1])
+        return Mask
+
+    def _get_voiceLeadingLowerBounds(self, rm1, rm2, V1, V2):
+        """\
+        Cheap admissible lower bounds of voiceLeadingCost into every voicing of V2 (from any voicing of V1), used by
+        branch and bound. Every rule adds a non-negative count times its weight, so 0 is a bound when no vl_ weight
+        is negative; None (no bound) otherwise. Subclasses may provide tighter bounds.
+        """
+        if any(v < 0 for k, v in self.config.items() if k.startswith('vl_')):
+            return None
+        return [0] * len(V2)
+
+    def DP_MemoizePhraseNoPruning(self, phrase, resume=None, deadline=None, run=None):
         """\
 
         Abstractable (reusable) construct: for each element of "phrase," let it be a tuple
         whose first element contains the roman numeral (with "Key" information).
+        resume: optional (V, DP, Mask) rows of an earlier solve whose leading chords (and their being last or not) are
+        unchanged; those rows are kept as is and the DP resumes after them (see utils.FPChordsSession).
+        deadline: optional fourpart.deadline.Deadline; once expired, the remaining chords only extend the dp_deadline_beam
+        best states of each chord (see _DP_deadlineMask), and run['deadline'] records where that started.
+        run: optional dict, filled in with the record of this run (see _DP_newRun): its pruning mask, deadline chord and
+        cutoffs. They are returned this way rather than kept on the engine, which may be solving other phrases meanwhile.
         """
 
         # NOTE: chordCost and voiceLeadingCost do not take in "extra information" in these tuples. They only judge based on roman numeral and chord voicing (for now).
 
         # O(L^2 N), L = max number of voicings per chord (~120), N = number of chords in phrase.
         L = len(phrase)
-        V = [list(self.voiceChord(*chordinfo)) for chordinfo in phrase]
-        DP = [[None for _ in range(len(V[i]))] for i in range(L)]
+        duplicates_removed, cache_hits = self.stats['voicing_duplicates_removed'], self.voicingCache.hits
+        start = len(resume[0]) if resume else 0 # number of rows kept from resume
+        V = (list(resume[0]) if resume else []) + [self.voiceChord(*chordinfo) for chordinfo in phrase[start:]]
+        self.log(f"DP: {sum(map(len, V))} voicings ({self.voicingCache.hits - cache_hits} of {L-start} chords cached, {self.stats['voicing_duplicates_removed'] - duplicates_removed} duplicates removed, {start} rows resumed)")
+        VA = [VoicingArrays(v) for v in V] if self.config['dp_engine'] == 'numpy' else None
+        DP = (list(resume[1]) if resume else []) + [[None for _ in range(len(V[i]))] for i in range(start, L)]
 
         # first layer i=0, only chord cost, and no back reference.
-        self.log(f"DP: Setting up first chord...")
-        for j in range(len(V[0])):
-            DP[0][j] = (self.chordCost(V[0][j], phrase[0][0]), None)
-        # Mask updating (pruning)
-        # pruning first chord options greatly decrease bottleneck during second chord
-        bar = _confidence * ( min(DP[0])[0] + self.config['dp_first_buffer']//(len(V[0])*len(V[1])) )
-        for j in range(len(V[0])):
-            if DP[0][j][0] > bar:
-                Mask[0][j] = False
-
-        # subsequent layers i=1..L-1
-        for i in range(1, L):
+        if not start:
+            self.log(f"DP: Setting up first chord...")
+            for j, chord_cost in enumerate(self.chordCosts(phrase, V, 0, last_chord=False)):
+                DP[0][j] = (chord_cost, None)
+
+        # subsequent layers i=1..L-1 (or those after the resumed rows)
+        Mask = None
+        run = self._DP_newRun(run)
+        for i in range(max(1, start), L):
+            if deadline is not None and deadline.expired():
+                Mask = self._DP_deadlineMask(DP, V, Mask, i, run)
             if self.logging:
                 self.log(f"DP: running {i+1}(th) chord (of {L} total)... ({len(V[i-1])}x{len(V[i])}={len(V[i-1])*len(V[i])} pairs to run)")
                 start_time = time.time()
 
-            voiceLeadingCost = self._get_voiceLeadingCostFunction(phrase[i-1][0], phrase[i][0])
-            for j in range(len(V[i])):
-                # Note: chord cost of current voicing added at the end.
-                best = (1e9, None) # (totalCost, backReference)
-                for k in range(len(V[i-1])):
-                    current_cost = DP[i-1][k][0] + voiceLeadingCost(V[i-1][k], V[i][j]) # previous_cost + progression cost
-                    if current_cost < best[0]:
-                        best = (current_cost, k)
-
-                if i+1 == L:
-                    DP[i][j] = (best[0] + self.chordCost(V[i][j], phrase[i][0], last_chord=True), best[1])
-                else:
-                    DP[i][j] = (best[0] + self.chordCost(V[i][j], phrase[i][0]), best[1])
+            # Note: chord cost of current voicing added at the end (last_chord when i+1 == L).
+            G = self.chordCosts(phrase, V, i)
+            for j, best in enumerate(self._DP_bestPredecessors(phrase, V, VA, DP, i, mask=Mask and Mask[i-1], kept_only=True)): # (deadline mask)
+                DP[i][j] = (best[0] + G[j], best[1])
             
             if self.logging:
                 total_time = time.time() - start_time
                 self.log(f"DP:         took {total_time} seconds total ({total_time/(len(V[i-1])*len(V[i]))}) seconds per pair)")
 
-        return DP, V # Return DP memoized tables, and the list of list of voicings.
+        run['mask'] = Mask # (None unless a deadline expired)
+        return DP, V # Return DP memoized tables, and the list of list of (compact) voicings.
 
-    def DP_MemoizePhrasePrune(self, phrase):
+    def DP_MemoizePhrasePrune(self, phrase, resume=None, deadline=None, run=None):
         """\
         DP Algorithm where Pruning is enabled.
         Abstractable (reusable) construct: for each element of "phrase," let it be a tuple
         whose first element contains the roman numeral (with "Key" information).
+        resume: as in DP_MemoizePhraseNoPruning. The first chord's pruning bar depends on the second chord's voicings,
+        so resumed rows must cover at least the first two chords.
+        deadline, run: as in DP_MemoizePhraseNoPruning.
+        Adaptive pruning: with dp_pair_budget (pairs per chord) and/or dp_pair_budget_phrase (pairs per phrase, spread over
+        the chords still to run), the bar is replaced by a per-chord cutoff chosen from the sorted DP costs to meet that
+        budget (see _DP_budgetMask); every chosen cutoff is recorded in run['cutoffs']. Under either dp_engine, only the kept
+        pairs are then computed (see _get_transitionCostRows).
         """
 
         # NOTE: chordCost and voiceLeadingCost do not take in "extra information" in these tuples. They only judge based on roman numeral and chord voicing (for now).
 
         # O(L^2 N), L = max number of voicings per chord (~120), N = number of chords in phrase.
         L = len(phrase)
-        V = [list(self.voiceChord(*chordinfo)) for chordinfo in phrase]
-        DP = [[None for _ in range(len(V[i]))] for i in range(L)]
-        Mask = [[True for _ in range(len(V[i]))] for i in range(L)] # DP MASK
+        duplicates_removed, cache_hits = self.stats['voicing_duplicates_removed'], self.voicingCache.hits
+        start = len(resume[0]) if resume else 0 # number of rows kept from resume
+        V = (list(resume[0]) if resume else []) + [self.voiceChord(*chordinfo) for chordinfo in phrase[start:]]
+        self.log(f"DP: {sum(map(len, V))} voicings ({self.voicingCache.hits - cache_hits} of {L-start} chords cached, {self.stats['voicing_duplicates_removed'] - duplicates_removed} duplicates removed, {start} rows resumed)")
+        VA = [VoicingArrays(v) for v in V] if self.config['dp_engine'] == 'numpy' else None
+        DP = (list(resume[1]) if resume else []) + [[None for _ in range(len(V[i]))] for i in range(start, L)]
+        Mask = (list(resume[2]) if resume else []) + [[True for _ in range(len(V[i]))] for i in range(start, L)] # DP MASK
+        assert start != 1, "resumed rows must cover at least the first two chords"
 
         # localizing class variables: optimization
         _confidence = self.config['dp_confidence']
         _buffer = self.config['dp_buffer']
+        _budget, _budget_phrase = self.config['dp_pair_budget'], self.config['dp_pair_budget_phrase']
+        run = self._DP_newRun(run)
+
+        def budget(i): # pair budget of chord i+1, extending (the kept voicings of) chord i
+            spent = sum(sum(Mask[r-1]) * len(V[r]) for r in range(1, i+1))
+            per_chord = (_budget_phrase - spent) / (L-1-i) if _budget_phrase is not None else float('inf')
+            return min(per_chord, _budget if _budget is not None else float('inf'))
         
         # first layer i=0, only chord cost, and no back reference.
-        self.log(f"DP: Setting up first chord...")
-        for j in range(len(V[0])):
-            DP[0][j] = (self.chordCost(V[0][j], phrase[0][0]), None)
+        if not start:
+            self.log(f"DP: Setting up first chord...")
+            for j, chord_cost in enumerate(self.chordCosts(phrase, V, 0, last_chord=False)):
+                DP[0][j] = (chord_cost, None)
         # Mask updating (pruning)
-        if self.config['dp_prune_first']:
+        if (_budget is not None or _budget_phrase is not None) and not start:
+            if self.config['dp_prune_first'] and L > 1:
+                Mask[0] = self._DP_budgetMask(DP, V, 0, budget(0), run)
+        elif self.config['dp_prune_first'] and not start:
             # pruning first chord options greatly decrease bottleneck during second chord
             bar = _confidence * ( min(DP[0])[0] + self.config['dp_first_buffer']//(len(V[0])*(len(V[1]) if len(V)>1 else 1)) )
             for j in range(len(V[0])):
                 if DP[0][j][0] > bar:
                     Mask[0][j] = False
 
-        # subsequent layers i=1..L-1
-        for i in range(1, L):
+        # subsequent layers i=1..L-1 (or those after the resumed rows)
+        for i in range(max(1, start), L):
+            if deadline is not None and deadline.expired():
+                Mask = self._DP_deadlineMask(DP, V, Mask, i, run)
             if self.logging:
                 dbg_temp_count = sum(Mask[i-1]) #### DEBUG
                 self.log(f"DP: running {i+1}(th) chord (of {L} total)... (({dbg_temp_count} of {len(V[i-1])})x{len(V[i])}={dbg_temp_count*len(V[i])} pairs to run)")
                 start_time = time.time()
 
-            voiceLeadingCost = self._get_voiceLeadingCostFunction(phrase[i-1][0], phrase[i][0])
-            for j in range(len(V[i])):
-                # Note: chord cost of current voicing added at the end.
-                best = (1e9, None) # (totalCost, backReference)
-                for k in range(len(V[i-1])):
-                    if not Mask[i-1][k]:
-                        continue
-                    current_cost = DP[i-1][k][0] + voiceLeadingCost(V[i-1][k], V[i][j]) # previous_cost + progression cost
-                    if current_cost < best[0]:
-                        best = (current_cost, k)
-
-                if i+1 == L:
-                    DP[i][j] = (best[0] + self.chordCost(V[i][j], phrase[i][0], last_chord=True), best[1])
-                else:
-                    DP[i][j] = (best[0] + self.chordCost(V[i][j], phrase[i][0]), best[1])
+            # Note: chord cost of current voicing added at the end (last_chord when i+1 == L).
+            G = self.chordCosts(phrase, V, i)
+            bounded = run['deadline'] is not None or _budget is not None or _budget_phrase is not None # (masks that bound the work)
+            for j, best in enumerate(self._DP_bestPredecessors(phrase, V, VA, DP, i, mask=Mask[i-1], kept_only=bounded)):
+                DP[i][j] = (best[0] + G[j], best[1])
 
             # Mask updating (pruning)
-            bar = _confidence * (min(DP[i])[0] + _buffer) 
-            for j in range(len(V[i])):
-                if DP[i][j][0] > bar:
-                    Mask[i][j] = False
+            if _budget is not None or _budget_phrase is not None:
+                if i+1 < L:
+                    Mask[i] = self._DP_budgetMask(DP, V, i, budget(i), run)
+            else:
+                bar = _confidence * (min(DP[i])[0] + _buffer) 
+                for j in range(len(V[i])):
+                    if DP[i][j][0] > bar:
+                        Mask[i][j] = False
             
             if self.logging:
                 total_time = time.time() - start_time
                 self.log(f"DP:         took {total_time} seconds total ({total_time/(dbg_temp_count*len(V[i]))}) seconds per pair)")
 
-        return DP, V # Return DP memoized tables, and the list of list of voicings.
+        run['mask'] = Mask # voicings pruned from the lattice (see lattice.LatticePaths)
+        return DP, V # Return DP memoized tables, and the list of list of (compact) voicings.
+
+    def DP_MemoizePhraseExact(self, phrase, deadline=None, run=None):
+        """\
+        DP Algorithm with exact (optimality preserving) pruning, dp_pruning='exact'.
+        A cheap backward pass computes, for every voicing, a lower bound H of the cost still to come after it
+        (from lower bounds of the transition costs, see _get_transitionLowerBounds, and the exact chord costs).
+        Following those bounds greedily gives a complete solution whose cost UB is a feasible upper bound.
+        The forward DP then prunes voicings whose cost so far plus H exceeds UB: they cannot be on an optimal path.
+        The optimal solution (and its cost and back references) is the same as without pruning;
+        only alternative solutions of higher cost may be missing (unless deadline, as in DP_MemoizePhraseNoPruning, expires).
+        run: as in DP_MemoizePhraseNoPruning.
+        Abstractable (reusable) construct: for each element of "phrase," let it be a tuple
+        whose first element contains the roman numeral (with "Key" information).
+        """
+
+        L = len(phrase)
+        duplicates_removed, cache_hits = self.stats['voicing_duplicates_removed'], self.voicingCache.hits
+        V = [self.voiceChord(*chordinfo) for chordinfo in phrase]
+        self.log(f"DP: {sum(map(len, V))} voicings ({self.voicingCache.hits - cache_hits} of {L} chords cached, {self.stats['voicing_duplicates_removed'] - duplicates_removed} duplicates removed)")
+        VA = [VoicingArrays(v) for v in V]
+        DP = [[None for _ in range(len(V[i]))] for i in range(L)]
+        Mask = [[True for _ in range(len(V[i]))] for i in range(L)] # DP MASK
+
+        # chord costs, computed once (used by both passes); the first chord is never scored as a last chord
+        G = [self.chordCosts(phrase, V, i, last_chord=0 < i == L-1) for i in range(L)]
+
+        # backward pass: H[i][j] <= cost of the best completion after voicing j of chord i.
+        H = [None for _ in range(L)]
+        H[L-1] = np.zeros(len(V[L-1]))
+        LB = [None for _ in range(L)] # LB[i]: transition lower bounds from chord i-1 to chord i
+        for i in reversed(range(1, L)):
+            LB[i] = self._get_transitionLowerBounds(phrase[i-1][0], phrase[i][0], VA[i-1], VA[i])
+            if LB[i] is None:
+                self.log("DP: no admissible bound (negative vl_ weights), running without pruning...")
+                return self.DP_MemoizePhraseNoPruning(phrase, deadline=deadline, run=run)
+            H[i-1] = (LB[i] + (np.asarray(G[i]) + H[i])[None, :]).min(axis=1)
+
+        # feasible upper bound: the cost of a greedy solution, each next voicing minimizing (true) transition cost + chord cost + H.
+        op = int(np.argmin(np.asarray(G[0]) + H[0]))
+        UB = G[0][op]
+        for i in range(1, L):
+            voiceLeadingCost = self._get_voiceLeadingCostFunction(phrase[i-1][0], phrase[i][0])
+            costs = [voiceLeadingCost(V[i-1][op], V[i][j]) + G[i][j] for j in range(len(V[i]))]
+            op = min(range(len(V[i])), key=lambda j: costs[j] + H[i][j])
+            UB += costs[op]
+        bar = UB + 1e-9 * max(1, abs(UB)) # (tolerance for floating point summation order)
+        self.log(f"DP: feasible upper bound {UB}")
+
+        # first layer i=0, only chord cost, and no back reference.
+        self.log(f"DP: Setting up first chord...")
+        for j in range(len(V[0])):
+            DP[0][j] = (G[0][j], None)
+            Mask[0][j] = DP[0][j][0] + H[0][j] <= bar
+
+        # subsequent layers i=1..L-1
+        run = self._DP_newRun(run)
+        for i in range(1, L):
+            if deadline is not None and deadline.expired():
+                Mask = self._DP_deadlineMask(DP, V, Mask, i, run)
+            if self.logging:
+                dbg_temp_count = sum(Mask[i-1]) #### DEBUG
+                self.log(f"DP: running {i+1}(th) chord (of {L} total)... (({dbg_temp_count} of {len(V[i-1])})x{len(V[i])}={dbg_temp_count*len(V[i])} pairs to run)")
+                start_time = time.time()
+
+            for j, best in enumerate(self._DP_bestPredecessors(phrase, V, VA if self.config['dp_engine'] == 'numpy' else None, DP, i, mask=Mask[i-1],
+                                                               kept_only=run['deadline'] is not None)):
+                DP[i][j] = (best[0] + G[i][j], best[1])
+                # Mask updating (pruning): lower bound of any solution through this voicing above a known solution's cost
+                Mask[i][j] = DP[i][j][0] + H[i][j] <= bar
+
+            if self.logging:
+                total_time = time.time() - start_time
+                self.log(f"DP:         took {total_time} seconds total ({total_time/max(1, dbg_temp_count*len(V[i]))}) seconds per pair)")
+
+        run['mask'] = Mask # voicings pruned from the lattice (see lattice.LatticePaths)
+        return DP, V # Return DP memoized tables, and the list of list of (compact) voicings.
+
+    def DP_MemoizePhraseBeam(self, phrase, resume=None, deadline=None, run=None):
+        """\
+        Beam search DP, dp_pruning='beam': every chord only extends the dp_beam_width (B) lowest-cost voicings of the
+        previous chord (instead of the dp_confidence/dp_buffer bar), and only those B x L transition costs are computed
+        (taken from a memoized full matrix or its rule features when there is one, see _get_transitionCostRows). O(N B L) pairs (L voicings per chord, N chords), bounded by construction whatever the cost distribution;
+        the solution may be suboptimal (see optimalityGap). resume, deadline, run: as in DP_MemoizePhraseNoPruning (a chord's
+        beam only depends on its own row, so any number of rows can be resumed).
+        Abstractable (reusable) construct: for each element of "phrase," let it be a tuple
+        whose first element contains the roman numeral (with "Key" information).
+        """
+
+        L = len(phrase)
+        duplicates_removed, cache_hits = self.stats['voicing_duplicates_removed'], self.voicingCache.hits
+        start = len(resume[0]) if resume else 0 # number of rows kept from resume
+        V = (list(resume[0]) if resume else []) + [self.voiceChord(*chordinfo) for chordinfo in phrase[start:]]
+        self.log(f"DP: {sum(map(len, V))} voicings ({self.voicingCache.hits - cache_hits} of {L-start} chords cached, {self.stats['voicing_duplicates_removed'] - duplicates_removed} duplicates removed, {start} rows resumed)")
+        VA = [VoicingArrays(v) for v in V] if self.config['dp_engine'] == 'numpy' else None
+        DP = (list(resume[1]) if resume else []) + [[None for _ in range(len(V[i]))] for i in range(start, L)]
+        Mask = (list(resume[2]) if resume else []) + [[True for _ in range(len(V[i]))] for i in range(start, L)] # DP MASK (the beams)
+        _width = self.config['dp_beam_width']
+
+        # first layer i=0, only chord cost, and no back reference.
+        if not start:
+            self.log(f"DP: Setting up first chord (beam width {_width})...")
+            for j, chord_cost in enumerate(self.chordCosts(phrase, V, 0, last_chord=False)):
+                DP[0][j] = (chord_cost, None)
+
+        # subsequent layers i=1..L-1 (or those after the resumed rows)
+        run = self._DP_newRun(run)
+        for i in range(max(1, start), L):
+            Mask[i-1] = self._DP_beamMask(DP[i-1], _width)
+            if deadline is not None and deadline.expired():
+                Mask = self._DP_deadlineMask(DP, V, Mask, i, run)
+            if self.logging:
+                width = sum(Mask[i-1])
+                self.log(f"DP: running {i+1}(th) chord (of {L} total)... ({width}x{len(V[i])}={width*len(V[i])} pairs to run)")
+                start_time = time.time()
+
+            # Note: chord cost of current voicing added at the end.
+            G = self.chordCosts(phrase, V, i)
+            for j, best in enumerate(self._DP_bestPredecessors(phrase, V, VA, DP, i, mask=Mask[i-1], kept_only=True)):
+                DP[i][j] = (best[0] + G[j], best[1])
+
+            if self.logging:
+                total_time = time.time() - start_time
+                self.log(f"DP:         took {total_time} seconds total ({total_time/max(1, width*len(V[i]))}) seconds per pair)")
+
+        run['mask'] = Mask # voicings outside the beams (see lattice.LatticePaths)
+        return DP, V # Return DP memoized tables, and the list of list of (compact) voicings.
+
+    @staticmethod
+    def optimalityGap(DP, DP_exact):
+        """\
+        Optimality gap of a (beam, pruned, deadline) solve against an exact one of the same phrase (both DP tables):
+        {'cost', 'optimal', 'gap' (absolute), 'relative' (gap / optimal cost)}.
+        """
+        cost, optimal = min(item[0] for item in DP[-1]), min(item[0] for item in DP_exact[-1])
+        return {'cost': cost, 'optimal': optimal, 'gap': cost - optimal, 'relative': (cost - optimal) / optimal if optimal else 0.0}
+
+    def DP_AuditPhrase(self, phrase):
+        """\
+        Audit of the heuristic pruning (DP_MemoizePhrasePrune, with the current dp_ settings) on one phrase: solves it
+        without pruning and pruned, and reports what the pruning saved and what it cost. The pruned run takes its
+        transition cost matrices from the unpruned one ('numpy' engine: the transitionCache is grown to hold the whole
+        phrase for the duration), so only the DP itself runs twice.
+        Returns the optimalityGap fields, plus 'pairs' (pairs run by the pruned DP), 'pairs_exact', 'savings' (fraction
+        of pairs saved), 'path' (voicing indices of the optimal solution) and 'first_pruned' (first chord where that
+        solution's voicing was pruned, None if it survived; with ties, the pruned solution may still be optimal).
+        """
+        L = len(phrase)
+        run = self._DP_newRun()
+        cache = self.transitionCache
+        if cache.maxsize < L:
+            self.transitionCache = LRUCache(L, cache.path)
+        try:
+            DP_exact, V = self.DP_MemoizePhraseNoPruning(phrase)
+            DP, _ = self.DP_MemoizePhrasePrune(phrase, run=run)
+        finally:
+            self.transitionCache = cache
+        Mask = run['mask']
+
+        # optimal solution (ties -> smallest index, like the retrace of every query)
+        path = [min(range(len(DP_exact[-1])), key=lambda j: DP_exact[-1][j][0])]
+        for i in reversed(range(1, L)):
+            path.append(DP_exact[i][path[-1]][1])
+        path.reverse()
+
+        report = self.optimalityGap(DP, DP_exact)
+        report['pairs'] = sum(sum(Mask[i-1]) * len(V[i]) for i in range(1, L))
+        report['pairs_exact'] = sum(len(V[i-1]) * len(V[i]) for i in range(1, L))
+        report['savings'] = 1 - report['pairs'] / report['pairs_exact'] if report['pairs_exact'] else 0.0
+        report['path'] = path
+        # (the last chord is never pruned: its mask only matters as a predecessor)
+        report['first_pruned'] = next((i for i in range(L-1) if not Mask[i][path[i]]), None)
+        return report
+
+    def DP_MemoizePhraseBackward(self, phrase, V, suffix=None):
+        """\
+        Backward (cost-to-go) counterpart of the DP tables, over the voicings V of a solved phrase:
+        BW[i][j] = (costToGo, forwardReference), the cost of the best completion after voicing j of chord i
+        (chords i+1.., excluding chord i's own chord cost) and the voicing of chord i+1 it continues with.
+        Then DP[i][j][0] + BW[i][j][0] is the best total cost through voicing j of chord i (see bestThrough),
+        exact when the forward DP did not prune (otherwise the cost of the best solution the pruned DP can retrace
+        through it). No pruning. With the 'numpy' dp_engine, the transition cost matrices are those the forward
+        pass cached, so the backward pass mostly costs the chord costs and one min-plus step per chord.
+        suffix: optional last rows of an earlier solve whose trailing chords are unchanged; they are kept as is.
+        """
+        L = len(phrase)
+        BW = [None for _ in range(L)]
+        BW[L-1] = [(0, None) for _ in range(len(V[L-1]))]
+        if suffix:
+            BW[L-len(suffix):] = suffix
+
+        # subsequent layers (backwards) i=L-2..0 (or those before the kept suffix)
+        for i in reversed(range(L - max(1, len(suffix or ())))):
+            # cost of continuing with voicing k of chord i+1: its chord cost, then its own best completion
+            togo = [chord_cost + BW[i+1][k][0] for k, chord_cost in enumerate(self.chordCosts(phrase, V, i+1))]
+            if self.config['dp_engine'] == 'numpy':
+                C = self._get_transitionCostMatrix(phrase[i][0], phrase[i+1][0], V[i], V[i+1], VoicingArrays(V[i]), VoicingArrays(V[i+1]))
+                fwd, _ = minPlusRow(togo, C.T)
+                BW[i] = [(C[j, k].item() + togo[k], k) for j, k in enumerate(fwd.tolist())]
+            else:
+                voiceLeadingCost = self._get_voiceLeadingCostFunction(phrase[i][0], phrase[i+1][0])
+                BW[i] = [min((voiceLeadingCost(v, V[i+1][k]) + togo[k], k) for k in range(len(V[i+1]))) for v in V[i]] # ties -> smallest k
+
+        return BW # Return backward (cost-to-go) tables.
+
+    @staticmethod
+    def bestThrough(DP, BW, i, j):
+        """Best total cost of a complete solution through voicing j of chord i, in O(1) (DP, BW as above)."""
+        return DP[i][j][0] + BW[i][j][0]
+
+    @staticmethod
+    def pinnedSolution(DP, BW, i, j):
+        """\
+        The best complete solution through (pinned) voicing j of chord i, as (totalCost, [voicing index of every chord]):
+        a retrace backwards along the DP back references and forwards along the BW forward references, no re-solve.
+        """
+        path = []
+        op = j
+        for ch in reversed(range(i+1)): # ch=chord number
+            path.append(op)
+            op = DP[ch][op][1]
+        path.reverse()
+        op = j
+        for ch in range(i, len(DP)-1):
+            op = BW[ch][op][1]
+            path.append(op)
+        return DP[i][j][0] + BW[i][j][0], path
+
+    def DP_TransitionCosts(self, phrase, V, i):
+        """\
+        All transition costs from the voicings of chord i-1 to those of chord i, as a list of lists [k][j],
+        with the same values (and types) the DP adds up. Used to walk a solved lattice (see lattice.LatticePaths).
+        """
+        if self.config['dp_engine'] == 'numpy':
+            return self._get_transitionCostMatrix(phrase[i-1][0], phrase[i][0], V[i-1], V[i], VoicingArrays(V[i-1]), VoicingArrays(V[i])).tolist()
+        voiceLeadingCost = self._get_voiceLeadingCostFunction(phrase[i-1][0], phrase[i][0])
+        return [[voiceLeadingCost(v1, v2) for v2 in V[i]] for v1 in V[i-1]]
+
+    def DP_Segment(self, phrase, a, b, kind):
+        """\
+        DP over chords a..b of a phrase only, for segmented (meet-in-the-middle) solving, see parallel.solveSegmented.
+        Only the voicings of chords a..b are generated. kind:
+        - 'forward' (a = 0): f[j] = best cost of chords 0..b ending in voicing j of chord b, with back[i][j] (chord i-1
+          voicing) for i = 1..b, like the DP tables.
+        - 'backward' (b = last chord): h[j] = best cost of chords a+1.. after voicing j of chord a (cost-to-go),
+          with fwd[i][j] (chord i+1 voicing) for i = a..b-1, like DP_MemoizePhraseBackward.
+        - 'matrix': M[p, q] = best cost from voicing p of chord a (excluded) to voicing q of chord b (included),
+          with back[i][p, j] (chord i-1 voicing, from source p) for i = a+2..b. Segments compose by min-plus products.
+        Returns (costs, references) as arrays, references as {chord number: array}. No pruning.
+        """
+        L = len(phrase)
+        V = {i: self.voiceChord(*phrase[i]) for i in range(a, b+1)}
+        G = {i: np.asarray(self.chordCosts(phrase, V, i)) for i in range(a, b+1)}
+        T = lambda i: np.asarray(self.DP_TransitionCosts(phrase, V, i)) # [len(V[i-1]), len(V[i])]
+        refs = {}
+
+        if kind == 'forward':
+            f = G[0]
+            for i in range(1, b+1):
+                total = f[:, None] + T(i)
+                refs[i] = total.argmin(axis=0) # ties -> smallest k
+                f = total.min(axis=0) + G[i]
+            return f, refs
+
+        if kind == 'backward':
+            h = np.zeros(len(V[b]), dtype=np.int64)
+            for i in reversed(range(a, b)):
+                total = T(i+1) + (G[i+1] + h)[None, :]
+                refs[i] = total.argmin(axis=1)
+                h = total.min(axis=1)
+            return h, refs
+
+        M = T(a+1) + G[a+1][None, :]
+        for i in range(a+2, b+1):
+            total = M[:, :, None] + T(i)[None, :, :] # [source, chord i-1, chord i]
+            refs[i] = total.argmin(axis=1)
+            M = total.min(axis=1) + G[i][None, :]
+        return M, refs
+
+    def _DP_kBestPredecessors(self, phrase, V, VA, DP, i, k, mask=None):
+        """\
+        k-best counterpart of _DP_bestPredecessors: for every voicing of chord i, the k best (totalCost, backReference, backRank)
+        entries over all entries of all voicings of chord i-1 (chord cost not yet added), best first.
+        Ties resolve to the smallest (backReference, backRank), so with k=1 entries match _DP_bestPredecessors.
+        mask: optional (deadline) mask of chord i-1; only the voicings it keeps are extended (and their costs computed).
+        """
+        rows = list(range(len(V[i-1]))) if mask is None else [p for p in range(len(V[i-1])) if mask[p]]
+        if VA is not None:
+            if mask is None:
+                C = self._get_transitionCostMatrix(phrase[i-1][0], phrase[i][0], V[i-1], V[i], VA[i-1], VA[i])
+            else:
+                C = self._get_transitionCostRows(phrase[i-1][0], phrase[i][0], V[i-1], V[i], VA[i-1], VA[i], rows)
+            prev = np.full((len(rows), k), np.inf)
+            for b, p in enumerate(rows):
+                prev[b, :len(DP[i-1][p])] = [e[0] for e in DP[i-1][p]]
+            # candidates of voicing j: prev[b, r] + C[b, j], flattened over (b, r)
+            total = (prev[:, :, None] + C[:, None, :]).reshape(-1, C.shape[1])
+            order = np.argsort(total, axis=0, kind='stable')[:k]
+            return [[(DP[i-1][rows[b]][r][0] + C[b, j].item(), rows[b], r) for b, r in (divmod(flat, k) for flat in order[:, j].tolist()) if r < len(DP[i-1][rows[b]])]
+                    for j in range(len(V[i]))]
+
+        voiceLeadingCost = self._get_voiceLeadingCostFunction(phrase[i-1][0], phrase[i][0])
+        row = []
+        for j in range(len(V[i])):
+            candidates = []
+            for p in rows:
+                cost = voiceLeadingCost(V[i-1][p], V[i][j]) # progression cost, shared by all entries of p
+                candidates.extend((entry[0] + cost, p, r) for r, entry in enumerate(DP[i-1][p]))
+            row.append(heapq.nsmallest(k, candidates))
+        return row
+
+    def DP_MemoizePhraseKBest(self, phrase, k, deadline=None, run=None):
+        """\
+        k-best (list) Viterbi DP: every voicing keeps its k best (totalCost, backReference, backRank) entries, best first,
+        where (backReference, backRank) is the entry of the previous chord it extends. Entries are distinct partial solutions,
+        so the n <= k best complete solutions are the n best entries of the last chord (see kBestSolutions).
+        No pruning. O(L^2 N k log(L k)) time and O(L N k) memory (L voicings per chord, N chords).
+        deadline, run: as in DP_MemoizePhraseNoPruning (the dp_deadline_beam voicings with the best first entries are extended,
+        with all their entries); the n best solutions are then only the best found.
+        Abstractable (reusable) construct: for each element of "phrase," let it be a tuple
+        whose first element contains the roman numeral (with "Key" information).
+        """
+
+        L = len(phrase)
+        duplicates_removed, cache_hits = self.stats['voicing_duplicates_removed'], self.voicingCache.hits
+        V = [self.voiceChord(*chordinfo) for chordinfo in phrase]
+        self.log(f"DP: {sum(map(len, V))} voicings ({self.voicingCache.hits - cache_hits} of {L} chords cached, {self.stats['voicing_duplicates_removed'] - duplicates_removed} duplicates removed)")
+        VA = [VoicingArrays(v) for v in V] if self.config['dp_engine'] == 'numpy' else None
+        DP = [[None for _ in range(len(V[i]))] for i in range(L)]
+
+        # first layer i=0, only chord cost, and no back reference.
+        self.log(f"DP: Setting up first chord ({k}-best)...")
+        for j, chord_cost in enumerate(self.chordCosts(phrase, V, 0, last_chord=False)):
+            DP[0][j] = [(chord_cost, None, None)]
+
+        # subsequent layers i=1..L-1
+        Mask = None
+        run = self._DP_newRun(run)
+        for i in range(1, L):
+            if deadline is not None and deadline.expired(): # (ranked by the best entry of every voicing)
+                Mask = self._DP_deadlineMask(DP[:i-1] + [[entries[0] for entries in DP[i-1]]], V, Mask, i, run)
+            if self.logging:
+                self.log(f"DP: running {i+1}(th) chord (of {L} total)... ({len(V[i-1])}x{len(V[i])}={len(V[i-1])*len(V[i])} pairs to run, {k}-best)")
+                start_time = time.time()
+
+            # Note: chord cost of current voicing added at the end.
+            G = self.chordCosts(phrase, V, i)
+            for j, entries in enumerate(self._DP_kBestPredecessors(phrase, V, VA, DP, i, k, mask=Mask and Mask[i-1])):
+                DP[i][j] = [(cost + G[j], p, r) for cost, p, r in entries]
+
+            if self.logging:
+                total_time = time.time() - start_time
+                self.log(f"DP:         took {total_time} seconds total ({total_time/(len(V[i-1])*len(V[i]))}) seconds per pair)")
+
+        run['mask'] = Mask # (None unless a deadline expired)
+        return DP, V # Return DP memoized (k-best) tables, and the list of list of (compact) voicings.
+
+    @staticmethod
+    def kBestSolutions(DP, n):
+        """\
+        The n best complete solutions of a k-best DP table (n <= k), best first, as (totalCost, [voicing index of every chord]).
+        """
+        finals = sorted((entry[0], j, r) for j, entries in enumerate(DP[-1]) for r, entry in enumerate(entries))[:n]
+        solutions = []
+        for cost, j, r in finals:
+            path = []
+            for ch in reversed(range(len(DP))): # ch=chord number
+                path.append(j)
+                _, j, r = DP[ch][j][r] # follow (backReference, backRank)
+            path.reverse()
+            solutions.append((cost, path))
+        return solutions
+
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+ #--------------#
+# Author:  @npvq #
+# Licence: GPLv3 #
+ #--------------#
+
+ #==================#
+# Module Description #
+ #==================#
+"""\
+Caches for the fourpart engines.
+LRUCache: bounded in-process cache (least recently used entries are evicted first), with an
+optional on-disk tier (a directory of pickles) so that long-running processes only warm up once.
+Keys must be hashable and have a stable repr (tuples of strings/numbers). Thread-safe (one engine's overlays share
+its caches across threads).
+"""
+
+# ----- SYSTEM IMPORTS ----- #
+
+from collections import OrderedDict
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+
+# ----- 3RD PARTY IMPORTS ----- #
+
+
+
+# ----- LOCAL IMPORTS ----- #
+
+
+
+# ------------------------------ #
+
+class LRUCache(object):
+    """\
+    Bounded mapping from keys to computed values. Use get(key, compute) to look up a value,
+    computing (and storing) it on a miss. maxsize=0 disables the in-process tier, path=None the disk tier.
+    compute() runs outside the lock: threads missing the same key at once may each compute it (the last one is kept).
+    """
+
+    def __init__(self, maxsize=128, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def clear(self):
+        """Empties the in-process tier (the disk tier is keyed on everything that matters, so it is kept)."""
+        with self._lock:
+            self._data.clear()
+
+    def peek(self, key):
+        """Returns the value cached under key in the in-process tier (a hit), or None (not counted as a miss)."""
+        with self._lock:
+            if key not in self._data:
+                return None
+            self.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def get(self, key, compute):
+        """Returns the value cached under key, or compute() (which is then cached)."""
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return self._data[key]
+
+        value = self._load(key)
+        hit = value is not None
+        if not hit:
+            value = compute()
+            self._dump(key, value)
+
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            if self.maxsize:
+                self._data[key] = value
+                self._data.move_to_end(key)
+                if len(self._data) > self.maxsize:
+                    self._data.popitem(last=False) # evict least recently used
+        return value
+
+    # disk tier: one pickle per key, named by a digest of the key's repr.
+    def _file(self, key):
+        return os.path.join(self.path, hashlib.sha1(repr(key).encode()).hexdigest() + '.pkl')
+
+    def _load(self, key):
+        if self.path is None:
+            return None
+        try:
+            with open(self._file(key), 'rb') as f:
+                stored_key, value = pickle.load(f)
+        except Exception: # missing, partial or stale (e.g. classes changed since) files are plain misses
+            return None
+        return value if stored_key == key else None # (digest collision)
+
+    def _dump(self, key, value):
+        if self.path is None:
+            return
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            # write then rename, so that concurrent workers never read a partial file
+            fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((key, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._file(key))
+        except OSError:
+            pass # the disk tier is best effort
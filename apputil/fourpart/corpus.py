@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+ #--------------#
+# Author:  @npvq #
+# Licence: GPLv3 #
+ #--------------#
+
+ #==================#
+# Module Description #
+ #==================#
+"""\
+Reference progressions (parseProgression format, one phrase per line), shared by the audit CLI and the tests.
+"""
+
+# ----- SYSTEM IMPORTS ----- #
+
+
+
+# ----- 3RD PARTY IMPORTS ----- #
+
+
+
+# ----- LOCAL IMPORTS ----- #
+
+
+
+# ------------------------------ #
+
+# progression realized in algorithms/Benchmarks (Benchmark#N-raw-data.txt: 8 phrases x 7 chords)
+BENCHMARKS = """D: I vi I6 IV I64 V I!2
+D: I6 V64 I IV6 V I6 V!2
+D: I IV6 I6 IV I64 V7 vi!2
+D: I6 V43 I I6 ii65 V I!2
+A: I IV64 I vi ii6 V7 I!2
+b: iv6 i64 iv iio6 i64 V7 i!2
+A: IV IV V I6 ii V65 I!2
+D: IV6 I V65 I ii65 V7 I!2"""
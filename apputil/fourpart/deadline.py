@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+ #--------------#
+# Author:  @npvq #
+# Licence: GPLv3 #
+ #--------------#
+
+ #==================#
+# Module Description #
+ #==================#
+"""\
+Deadline: wall-clock budget and cancellation token for the DP algorithms (anytime solving).
+The DP checks it before every chord; once it has expired, the remaining chords are solved with only the
+dp_deadline_beam best states of each chord as predecessors, so that a complete (feasible, possibly
+non-optimal) solution is still returned, quickly. The DP records where that happened (its run's 'deadline').
+"""
+
+# ----- SYSTEM IMPORTS ----- #
+
+import threading
+import time
+
+# ----- 3RD PARTY IMPORTS ----- #
+
+
+
+# ----- LOCAL IMPORTS ----- #
+
+
+
+# ------------------------------ #
+
+class Deadline(object):
+    """\
+    seconds: wall-clock budget from now (None: no time limit, cancellation only).
+    cancel() may be called from any thread (e.g. a GUI's cancel button, a web request going away).
+    """
+
+    def __init__(self, seconds=None):
+        self.end = None if seconds is None else time.monotonic() + seconds
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def remaining(self):
+        """Seconds left (0 once expired), None without a time limit."""
+        if self.cancelled:
+            return 0
+        return None if self.end is None else max(0, self.end - time.monotonic())
+
+    def expired(self):
+        return self.cancelled or (self.end is not None and time.monotonic() >= self.end)
@@ -12,8 +12,6 @@
 # ----- SYSTEM IMPORTS -----
 
 from fractions import Fraction
-from itertools import permutations
-from copy import deepcopy
 
 # Debugging/Logging
 import time
@@ -24,11 +22,16 @@ import time
 #   pitch, chord, roman, key, interval, # MUSIC21 fundamentals
 # )
 import music21 as mus # unfortunately it is necessary
+import numpy as np
 
 # ----- LOCAL IMPORTS -----
 
-from fourpart import do_nothing, octaveAbove, octaveBelow, nextOctaveDown, dominantScaleDegrees, tonicScaleDegrees
+from fourpart import do_nothing, distinctPermutations, dominantScaleDegrees, tonicScaleDegrees
 from fourpart.base import FourPartBaseObject
+from fourpart.cache import LRUCache
+from fourpart.voicing import LETTERS, _naturalPC, Voicing, VoicingSet, spellingId, spellingLetter, spellingAlter, stepAbove, stepBelow
+from fourpart.vectorized import RuleFeatures, VoicingArrays, stepsAbove, stepsBelow, firstIndex, gatherVoices
+from fourpart.intervals import INTERVALS, spelledIntervals
 
 # ------------------------------ #
 
@@ -39,57 +42,73 @@ class FourPartChords(FourPartBaseObject):
     """
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        # voice leading contexts and signatures per pair of chord contexts (tiny, config independent)
+        self._contextCache = LRUCache(4096)
+        self._signatureCache = LRUCache(4096)
 
     def _get_chordCostFunction(self):
         """\
         Overrides FourPartBassObject._get_chordCostFunction().
 
         Factory function to provide a fast and static chordCost function stored as a class method.
-        Runs once during object initialization. Uses closure to store config as local variables.
+        Runs once per distinct config (see _get_cachedChordCostFunction). Uses closure to store config as local variables.
+        The function is specialized to the config: groups of rules whose weights are all 0 are left out (see _ruleOn).
         """
 
         # stores needed configurations as local variables for speed optimization
         _midi_ranges = [[p.midi for p in v] for v in self.ranges]
         _config = {k:v for k,v in self.config.items() if k.startswith('ch_')} # 'ch_': chord cost configs
 
+        # enabled rule groups (a group is left out if all its weights are 0)
+        _on = self._ruleOn
+        _seventh_rules = _on('ch_seventh_inc_doubled_root') or _on('ch_seventh_inc_doubled_third')
+        _triad_root_rule = _on('ch_triad_did_not_double_root')
+        _triad_inc_rules = any(_on(k) for k in ('ch_triad_inc_tripled_root', 'ch_triad_inc_doubled_third', 'ch_triad_inc_tripled_root_last', 'ch_triad_inc_doubled_third_last'))
+        _doubling_rules = _seventh_rules or _triad_root_rule or _triad_inc_rules # (the only ones that query music21 per voicing)
+        _range_rules = _on('ch_voice_outside_common_range') or _on('ch_voice_outside_range')
+        _authentic_rules = _on('ch_last_not_authentic_third') or _on('ch_last_not_authentic_fifth')
+
         # output function is static (class configured and class independent)
         def _chordCost(chord, rm, last_chord=False):
             """This method computes the cost of chord voicing infractions and is run once on every chord.
-               Its purpose is to encourage some voicings over others."""
+               Its purpose is to encourage some voicings over others. chord is a (compact) Voicing."""
             # Note to reader: this function should only discriminate between the different voicings of a particular chord (the chord has already been decided and locked-in).
             cost = 0
-            _set_size = len(set(chord.pitchClasses))
 
             # encourage full chord voicings, prefer root doubling.
+            if _doubling_rules:
+                _set_size = len(set(chord.pc))
+                _root_pc = rm.root().pitchClass
+
+                if rm.containsSeventh(): # SEVENTH CHORD
+                    if _seventh_rules and _set_size < 4:
+                        if chord.pc.count(_root_pc) == 2:
+                            cost += _config['ch_seventh_inc_doubled_root']
+                        else:
+                            cost += _config['ch_seventh_inc_doubled_third']
+                else: # TRIAD
+                    if _triad_root_rule and rm.inversion() != 2 and chord.pc.count(_root_pc) < 2:
+                            cost += _config['ch_triad_did_not_double_root']
+                    if _triad_inc_rules and _set_size < 3:
+                        # incomplete chord should only be last chord (it is guaranteed by voiceChord that they are also RP chords)
+                        if chord.pc.count(_root_pc) == 3:
+                            cost += _config['ch_triad_inc_tripled_root_last'] if last_chord else _config['ch_triad_inc_tripled_root']
+                        else:
+                            cost += _config['ch_triad_inc_doubled_third_last'] if last_chord else _config['ch_triad_inc_doubled_third']
 
-            if rm.containsSeventh(): # SEVENTH CHORD
-                if _set_size < 4:
-                    if chord.pitchClasses.count(rm.root().pitchClass) == 2:
-                        cost += _config['ch_seventh_inc_doubled_root']
-                    else:
-                        cost += _config['ch_seventh_inc_doubled_third']
-            else: # TRIAD
-                if rm.inversion() != 2 and chord.pitchClasses.count(rm.root().pitchClass) < 2:
-                        cost += _config['ch_triad_did_not_double_root']
-                if _set_size < 3:
-                    # incomplete chord should only be last chord (it is guaranteed by voiceChord that they are also RP chords)
-                    if chord.pitchClasses.count(rm.root().pitchClass) == 3:
-                        cost += _config['ch_triad_inc_tripled_root_last'] if last_chord else _config['ch_triad_inc_tripled_root']
-                    else:
-                        cost += _config['ch_triad_inc_doubled_third_last'] if last_chord else _config['ch_triad_inc_doubled_third']
-            
             # check for voice-range vilations or deductions.
-            for i in range(4):
-                if _midi_ranges[i][0] <= chord[i].pitch.midi <= _midi_ranges[i][1]:
-                    continue
-                elif _midi_ranges[i][2] <= chord[i].pitch.midi <= _midi_ranges[i][3]:
-                    cost += _config['ch_voice_outside_common_range']
-                else:
-                    cost += _config['ch_voice_outside_range'] # not permissible (high penalty by default)
+            if _range_rules:
+                for i in range(4):
+                    if _midi_ranges[i][0] <= chord.midi[i] <= _midi_ranges[i][1]:
+                        continue
+                    elif _midi_ranges[i][2] <= chord.midi[i] <= _midi_ranges[i][3]:
+                        cost += _config['ch_voice_outside_common_range']
+                    else:
+                        cost += _config['ch_voice_outside_range'] # not permissible (high penalty by default)
 
             # slightly prefer authentic cadences (soprano doubles root)
-            if last_chord and rm.figure in {'i', 'I'} and chord[3].pitch.name != rm.root().name:
-                if (chord[3].pitch.name == rm.third.name):
+            if _authentic_rules and last_chord and rm.figure in {'i', 'I'} and chord.spell[3] != spellingId(rm.root().name):
+                if (chord.spell[3] == spellingId(rm.third.name)):
                     cost += _config['ch_last_not_authentic_third']
                 else:
                     cost += _config['ch_last_not_authentic_fifth']
@@ -97,16 +116,71 @@ class FourPartChords(FourPartBaseObject):
 
         return _chordCost
 
-    def _get_voiceLeadingCostFunction(self, rm1, rm2):
+    def _get_chordFeatureFunction(self, rm, last_chord=False):
         """\
-        Factory function for voiceLeadingCost pre-loaded with roman numerals.
-        Executed once for every chord pair in DP. Uses closure to load config as local variables.
+        Overrides FourPartBaseObject._get_chordFeatureFunction().
+        Returns a function mapping the (compact) Voicings of rm to their RuleFeatures: how many times each rule of
+        _chordCost is hit by every voicing, computed with NumPy over the whole set. The voicing-independent information
+        on rm is only queried once. Each rule is keyed by its ch_ weight; weights are not read.
         """
-        
-        # Stategy: precomputes chord data, returns one function with no recursive calls.
-        # Alternatively we could return different functions based on chord information, but that seems unnecessary and possibly counterintuitive right now.
 
-        # OVERHEAD (Non-voicing-dependent information on chords, used later)
+        _midi_ranges = [[p.midi for p in v] for v in self.ranges]
+        _root_pc = rm.root().pitchClass
+        _seventh = rm.containsSeventh()
+        _double_root = not _seventh and rm.inversion() != 2
+        _authentic = last_chord and rm.figure in {'i', 'I'}
+        _root_spell, _third_spell = (spellingId(rm.root().name), spellingId(rm.third.name)) if _authentic else (None, None)
+        _last = '_last' if last_chord else ''
+
+        def _chordFeatures(V):
+            """Counts the rule hits of every voicing of V at once; returns RuleFeatures over [len(V)]."""
+            F = RuleFeatures((len(V),))
+            VA = VoicingArrays(V)
+            roots = (VA.pc == _root_pc).sum(axis=1)
+            pcs = np.sort(VA.pc, axis=1)
+            set_size = 1 + (pcs[:, 1:] != pcs[:, :-1]).sum(axis=1)
+
+            # encourage full chord voicings, prefer root doubling.
+            if _seventh: # SEVENTH CHORD
+                F.add(('ch_seventh_inc_doubled_root',), (set_size < 4) & (roots == 2))
+                F.add(('ch_seventh_inc_doubled_third',), (set_size < 4) & (roots != 2))
+            else: # TRIAD
+                if _double_root:
+                    F.add(('ch_triad_did_not_double_root',), roots < 2)
+                F.add((f'ch_triad_inc_tripled_root{_last}',), (set_size < 3) & (roots == 3))
+                F.add((f'ch_triad_inc_doubled_third{_last}',), (set_size < 3) & (roots != 3))
+
+            # check for voice-range vilations or deductions.
+            for i in range(4):
+                m = VA.midi[:, i]
+                common = (_midi_ranges[i][0] <= m) & (m <= _midi_ranges[i][1])
+                allowable = (_midi_ranges[i][2] <= m) & (m <= _midi_ranges[i][3])
+                F.add(('ch_voice_outside_common_range',), ~common & allowable)
+                F.add(('ch_voice_outside_range',), ~common & ~allowable)
+
+            # slightly prefer authentic cadences (soprano doubles root)
+            if _authentic:
+                soprano = VA.spell[:, 3]
+                F.add(('ch_last_not_authentic_third',), (soprano != _root_spell) & (soprano == _third_spell))
+                F.add(('ch_last_not_authentic_fifth',), (soprano != _root_spell) & (soprano != _third_spell))
+
+            return F.freeze()
+
+        return _chordFeatures
+
+    def _get_voiceLeadingContext(self, rm1, rm2):
+        """\
+        Non-voicing-dependent information on a chord pair, shared by the voiceLeadingCost factories (see _voiceLeadingContext).
+        Memoized per pair of chord contexts, since building it queries music21 keys and scales (~0.4 ms): treat it as read-only.
+        """
+        return self._contextCache.get((self._chordContext(rm1), self._chordContext(rm2)), lambda: self._voiceLeadingContext(rm1, rm2))
+
+    @staticmethod
+    def _voiceLeadingContext(rm1, rm2):
+        """\
+        Non-voicing-dependent information on a chord pair, shared by the voiceLeadingCost factories.
+        Pitches are given as spelling ids (see fourpart.voicing), letters as C=0..B=6.
+        """
         _rm1_key = rm1.secondaryRomanNumeralKey if rm1.secondaryRomanNumeral else rm1.key
         _rm2_key = rm2.secondaryRomanNumeralKey if rm2.secondaryRomanNumeral else rm2.key
         # Functional
@@ -116,175 +190,442 @@ class FourPartChords(FourPartBaseObject):
         _rm1_is_dominant = func1 in dominantScaleDegrees[_rm1_key.mode]
         _rm2_is_dominant = func2 in dominantScaleDegrees[_rm2_key.mode]
         _rm2_is_tonic = func2 in tonicScaleDegrees[_rm2_key.mode]
-        # rm1 might resolve to rm2 as a secondary dominant rather than a cadence.
-        _resolves = _rm1_is_dominant and (_rm1_key.tonic.name == _rm2_key.getDominant().name if rm1.secondaryRomanNumeral else _rm2_is_tonic)
         # Scale/pitch related
         _rm1_scale = _rm1_key.getPitches()
-        _LT = _rm1_key.getLeadingTone().name # ti->do leading tone (WARNING: _rm1_scale[6] returns natural 7th degree in minor mode.)
-        _FT = _rm1_scale[3].name # fa->mi tendency tone
-        # Resolution tones (local variable shortcut optimizations)
-        _DO = _rm1_scale[0]
-        _SOL = _rm1_scale[4]
-        _MI = _rm1_scale[2]
+        return {
+            'rm1_is_dominant': _rm1_is_dominant,
+            'rm2_is_dominant': _rm2_is_dominant,
+            # rm1 might resolve to rm2 as a secondary dominant rather than a cadence.
+            'resolves': _rm1_is_dominant and (_rm1_key.tonic.name == _rm2_key.getDominant().name if rm1.secondaryRomanNumeral else _rm2_is_tonic),
+            'LT': spellingId(_rm1_key.getLeadingTone().name), # ti->do leading tone (WARNING: _rm1_scale[6] returns natural 7th degree in minor mode.)
+            'FT': spellingId(_rm1_scale[3].name), # fa->mi tendency tone
+            # Resolution tones
+            'DO': spellingId(_rm1_scale[0].name),
+            'SOL': spellingId(_rm1_scale[4].name),
+            'MI': spellingId(_rm1_scale[2].name),
+            # Sevenths (cannot be doubled, so they are unique in a voicing)
+            'rm1_seventh': spellingId(rm1.seventh.name) if rm1.containsSeventh() else None,
+            'rm2_seventh': spellingId(rm2.seventh.name) if rm2.containsSeventh() else None,
+            'repeated': rm1 == rm2,
+        }
+
+    def _get_voiceLeadingCostFunction(self, rm1, rm2):
+        """\
+        Factory function for voiceLeadingCost pre-loaded with roman numerals (see _get_voiceLeadingKernel).
+        Memoized in costFunctionCache per pair of chord contexts and vl_ fingerprint (the kernel reads the spellings of
+        rm1's key, so pairs that merely share a voice leading signature cannot share it).
+        """
+        return self.costFunctionCache.get(('voiceLeadingCost', self._chordContext(rm1), self._chordContext(rm2), self.vlFingerprint),
+                                          lambda: self._get_voiceLeadingKernel(rm1, rm2))
+
+    def _get_voiceLeadingKernel(self, rm1, rm2):
+        """\
+        Builds voiceLeadingCost pre-loaded with roman numerals and specialized to the config: rules (or groups of rules)
+        whose weights are all 0 are left out of the function rather than evaluated and multiplied by 0 (see _ruleOn).
+        Uses closure to load config as local variables.
+        """
+
+        # Stategy: precomputes chord data, returns one function with no recursive calls.
+        # Alternatively we could return different functions based on chord information, but that seems unnecessary and possibly counterintuitive right now.
+
+        # OVERHEAD (Non-voicing-dependent information on chords, used later)
+        _ctx = self._get_voiceLeadingContext(rm1, rm2)
+        _rm1_is_dominant, _rm2_is_dominant, _resolves = _ctx['rm1_is_dominant'], _ctx['rm2_is_dominant'], _ctx['resolves']
+        _LT, _FT, _DO, _MI = _ctx['LT'], _ctx['FT'], _ctx['DO'], _ctx['MI']
+        _DO_letter, _MI_letter = spellingLetter(_DO), spellingLetter(_MI)
+        _rm1_seventh, _rm2_seventh, _repeated = _ctx['rm1_seventh'], _ctx['rm2_seventh'], _ctx['repeated']
         # make local function reference (save reference): optimization... is it really necessary?
-        _above = octaveAbove
-        _below = octaveBelow
+        _above = stepAbove
+        _below = stepBelow
+        _intervals = INTERVALS # spelled interval table, indexed [step delta][semitone delta]
 
         # preload configs ('vl_': voice leading configs)
         _config = {k:v for k,v in self.config.items() if k.startswith('vl_')}
         # NOTE: might be a little slower than manually preloading config variables as local variables, but this way is much more maintainable (and preserves sanity)
 
+        # SPECIALIZATION: enabled rules (for this chord pair and config), everything else is skipped by the function
+        _on = self._ruleOn
+        _multiplier = ('vl_lt_tt_violation_cadential_multiplier',) if _resolves else ()
+        _lt_rules = (_on('vl_frustrated_lt_dominant') or _on('vl_lt_violation_dominant', *_multiplier) if _rm1_is_dominant
+                     else _on('vl_frustrated_lt') or _on('vl_lt_violation'))
+        _fa_mi_rule = _rm1_is_dominant and not _rm2_is_dominant and _on('vl_dominant_tt_not_resolved', *_multiplier)
+        _nd7_resolution_rule = not _rm1_is_dominant and _rm1_seventh is not None and _on('vl_nd7_not_resolved')
+        _nd7_preparation_rule = not _rm2_is_dominant and _rm2_seventh is not None and _on('vl_nd7_not_prepared')
+        _crossing_rule = _on('vl_voice_crossing')
+        _leap_rules = any(_on(k) for k in _config if '_leap_' in k)
+        _octave_rule = _on('vl_bass_leaps_octave_up')
+        _repeated_rule = _repeated and _on('vl_repeated_chord_static')
+        _parallel_rules = any(_on(k) for k in ('vl_parallelism', 'vl_parallelism_outer', 'vl_unequal_5', 'vl_unequal_5_outer'))
+        _direct_rule = _on('vl_direct_parallelism')
+        _static_rule = _on('vl_melody_static')
+        _motion_rule = _on('vl_outer_voices_similar_motion')
+        _diffs = _leap_rules or _octave_rule or _repeated_rule or _motion_rule # (spelled intervals of every voice)
+
         def _voiceLeadingCost(chord1, chord2):
             """\
             This method computes the costs of voice leading infractions/violations
-            and is run on every adjacent chord pair in a phrase.
+            and is run on every adjacent chord pair in a phrase. Chords are (compact) Voicings.
             """
-            
+
             cost = 0
-            # helper/shorthands
-            pchord1 = chord1.pitches
-            pchord2 = chord2.pitches
-            
+            # helper/shorthands: (midi, diatonic step, spelling) of each voice
+            m1, st1, sp1 = chord1.midi, chord1.step, chord1.spell
+            m2, st2, sp2 = chord2.midi, chord2.step, chord2.spell
+
             # (FUNCTION SPECIFIC)
             if _rm1_is_dominant:
                 # ti->ti or ti->do (ti->sol)
-                if _LT in chord1.pitchNames:
-                    lt_idx = chord1.pitchNames.index(_LT) # leadingtone_index : there can only be one.
-                    if ( pchord2[lt_idx] not in (pchord1[lt_idx], mus.pitch.Pitch(_DO, octave=_above(_DO, pchord1[lt_idx])))
-                    and (lt_idx != 0 or chord2[0].name not in {_LT, _DO.name}) ): #ForgiveBass if it is *not* at all possible to resolve/sustain
-                        
+                if _lt_rules and _LT in sp1:
+                    lt_idx = sp1.index(_LT) # leadingtone_index : there can only be one.
+                    if ( (st2[lt_idx], sp2[lt_idx]) not in ((st1[lt_idx], _LT), (_above(st1[lt_idx], _DO_letter), _DO))
+                    and (lt_idx != 0 or sp2[0] not in {_LT, _DO}) ): #ForgiveBass if it is *not* at all possible to resolve/sustain
+
                         # FRUSTRATED LEADING TONE (inner voice)
-                        if lt_idx in {1, 2} and mus.pitch.Pitch(_SOL, octave=_below(_SOL, chord1[lt_idx])):
+                        # NOTE: the ti->sol target itself is not checked (the music21 version tested a Pitch object, which is always truthy).
+                        if lt_idx in {1, 2}:
                             cost += _config['vl_frustrated_lt_dominant']
-                        else: 
+                        else:
                             cost += _config['vl_lt_violation_dominant'] * (_config['vl_lt_tt_violation_cadential_multiplier'] if _resolves else 1)
                 # fa->mi
-                if not _rm2_is_dominant: # alternate condition: if _resolves. Note: even in resolution, Dom/V -> i64 can have the "fa" held/sustained before resolving to "mi."
-                    if _FT in chord1.pitchNames: # possibly more than one
-                        for ft_idx, p in enumerate(chord1.pitchNames):
-                            if ( p == _FT and pchord2[ft_idx] not in (chord1[ft_idx].pitch, mus.pitch.Pitch(_MI, octave=_below(_MI, pchord1[ft_idx]))) 
-                            and (ft_idx != 0 or chord2[ft_idx].name == _MI.name) ): #ForgiveBass
+                if _fa_mi_rule: # (rm2 not dominant) alternate condition: if _resolves. Note: even in resolution, Dom/V -> i64 can have the "fa" held/sustained before resolving to "mi."
+                    if _FT in sp1: # possibly more than one
+                        for ft_idx in range(4):
+                            if ( sp1[ft_idx] == _FT and (st2[ft_idx], sp2[ft_idx]) not in ((st1[ft_idx], _FT), (_below(st1[ft_idx], _MI_letter), _MI))
+                            and (ft_idx != 0 or sp2[ft_idx] == _MI) ): #ForgiveBass
 
                                 cost += _config['vl_dominant_tt_not_resolved'] * (_config['vl_lt_tt_violation_cadential_multiplier'] if _resolves else 1)
-            
+
             else: # rm1 not dominant
                 # ti->ti or ti->do (ti->sol)
-                if _LT in chord1.pitchNames:
-                    lt_idx = chord1.pitchNames.index(_LT) # leadingtone_index : there can only be one.
-                    if ( pchord2[lt_idx] not in (pchord1[lt_idx], mus.pitch.Pitch(_DO, octave=_above(_DO, pchord1[lt_idx])))
-                    and (lt_idx != 0 or chord2[0].name not in {_LT, _DO.name}) ): #ForgiveBass if it is *not* at all possible to resolve/sustain
-                        
+                if _lt_rules and _LT in sp1:
+                    lt_idx = sp1.index(_LT) # leadingtone_index : there can only be one.
+                    if ( (st2[lt_idx], sp2[lt_idx]) not in ((st1[lt_idx], _LT), (_above(st1[lt_idx], _DO_letter), _DO))
+                    and (lt_idx != 0 or sp2[0] not in {_LT, _DO}) ): #ForgiveBass if it is *not* at all possible to resolve/sustain
+
                         # FRUSTRATED LEADING TONE (inner voice)
-                        if lt_idx in {1, 2} and mus.pitch.Pitch(_SOL, octave=_below(_SOL, chord1[lt_idx])): 
+                        if lt_idx in {1, 2}:
                             cost += _config['vl_frustrated_lt']
                         else:
                             cost += _config['vl_lt_violation']
 
                 # non-dominant 7 resolution
-                if rm1.containsSeventh():
-                    seventh = chord1.seventh
-                    seven_idx = pchord1.index(seventh) # (seventh cannot be doubled, so is unique)
+                if _nd7_resolution_rule: # (rm1 has a seventh)
+                    seven_idx = sp1.index(_rm1_seventh) # (seventh cannot be doubled, so is unique)
+                    step_down = _intervals[st1[seven_idx]-st2[seven_idx]][m1[seven_idx]-m2[seven_idx]]
                     # Resolutions have to go down a m2 or M2.
-                    if ( not (seventh == pchord2[seven_idx] or mus.interval.Interval(noteStart=chord2[seven_idx], noteEnd=chord1[seven_idx]).name in {'m2','M2'})
-                    and (seven_idx != 0 or (seventh.pitchClass + 12 - pchord2[seven_idx].pitchClass)%12 > 2) ): #ForgiveBass
-                        
+                    if ( not ((st2[seven_idx], sp2[seven_idx]) == (st1[seven_idx], _rm1_seventh) or (step_down[0] == 2 and not step_down[1]))
+                    and (seven_idx != 0 or (m1[seven_idx] + 12 - m2[seven_idx])%12 > 2) ): #ForgiveBass
+
                         cost += _config['vl_nd7_not_resolved']
 
             # non-dominant 7 preparation
-            if not _rm2_is_dominant and rm2.containsSeventh():
-                seventh = chord2.seventh
-                seven_idx = pchord2.index(seventh)
+            if _nd7_preparation_rule: # (rm2 not dominant, has a seventh)
+                seven_idx = sp2.index(_rm2_seventh)
+
+                if ( (st1[seven_idx], sp1[seven_idx]) != (st2[seven_idx], _rm2_seventh)
+                and (seven_idx != 0 or sp1[seven_idx] == _rm2_seventh) ): #ForgiveBass && does not allow enharmonic equivalent (respelling) preparation.
 
-                if ( pchord1[seven_idx] != seventh
-                and (seven_idx != 0 or chord1[seven_idx].name == seventh.name) ): #ForgiveBass && does not allow enharmonic equivalent (respelling) preparation.
-                    
                     cost += _config['vl_nd7_not_prepared']
-            
+
             # (GENERIC)
             # VOICE CROSSING
-            cost += _config['vl_voice_crossing'] * ((chord1[0]>chord2[1])+(chord1[1]<chord2[0]) + (chord1[1]>chord2[2])+(chord1[2]<chord2[1]) + (chord1[2]>chord2[3])+(chord1[3]<chord2[2]))
-            
+            if _crossing_rule:
+                cost += _config['vl_voice_crossing'] * ((m1[0]>m2[1])+(m1[1]<m2[0]) + (m1[1]>m2[2])+(m1[2]<m2[1]) + (m1[2]>m2[3])+(m1[3]<m2[2]))
+
+            if _diffs:
+                diffs = [ _intervals[st2[j]-st1[j]][m2[j]-m1[j]] for j in range(4) ] # (generic size, dissonant, direction)
+
             # LEAPS: Avoid big leaps (generally). Octave leaps in bass is ok. Extra penalty for dissonant leaps, semitone-steps are not considered dissonant leaps (d2s not yet considered)
-            diffs = [ (abs(i.generic.value), not(i.specifier in {mus.interval.Specifier.PERFECT, mus.interval.Specifier.MAJOR, mus.interval.Specifier.MINOR} or i.generic.value==1))
-                      for i in (mus.interval.Interval(noteStart=chord1[j], noteEnd=chord2[j]) for j in range(4)) ]
-            cost += ((0 if diffs[0][0] <= 5 or diffs[0][0] == 8               else                                                                              _config['vl_bass_leap_gt5']    if diffs[0][0] <  8 else _config['vl_bass_leap_gt8'])    + _config['vl_bass_leap_dissonant']    * diffs[0][1]  # Bass
-                    + (0 if diffs[1][0]<= 2 else _config['vl_tenor_leap_3']   if diffs[1][0] == 3 else _config['vl_tenor_leap_4to5']   if diffs[1][0] <= 5 else _config['vl_tenor_leap_gt5']   if diffs[1][0] <= 8 else _config['vl_tenor_leap_gt8'])   + _config['vl_tenor_leap_dissonant']   * diffs[1][1]  # Tenor
-                    + (0 if diffs[2][0]<= 2 else _config['vl_alto_leap_3']    if diffs[2][0] == 3 else _config['vl_alto_leap_4to5']    if diffs[2][0] <= 5 else _config['vl_alto_leap_gt5']    if diffs[2][0] <= 8 else _config['vl_alto_leap_gt8'])    + _config['vl_alto_leap_dissonant']    * diffs[2][1]  # Alto
-                    + (0 if diffs[3][0]<= 2 else _config['vl_soprano_leap_3'] if diffs[3][0] == 3 else _config['vl_soprano_leap_4to5'] if diffs[3][0] <= 5 else _config['vl_soprano_leap_gt5'] if diffs[3][0] <= 8 else _config['vl_soprano_leap_gt8']) + _config['vl_soprano_leap_dissonant'] * diffs[3][1]) # Soprano
-            
+            if _leap_rules:
+                cost += ((0 if diffs[0][0] <= 5 or diffs[0][0] == 8               else                                                                              _config['vl_bass_leap_gt5']    if diffs[0][0] <  8 else _config['vl_bass_leap_gt8'])    + _config['vl_bass_leap_dissonant']    * diffs[0][1]  # Bass
+                        + (0 if diffs[1][0]<= 2 else _config['vl_tenor_leap_3']   if diffs[1][0] == 3 else _config['vl_tenor_leap_4to5']   if diffs[1][0] <= 5 else _config['vl_tenor_leap_gt5']   if diffs[1][0] <= 8 else _config['vl_tenor_leap_gt8'])   + _config['vl_tenor_leap_dissonant']   * diffs[1][1]  # Tenor
+                        + (0 if diffs[2][0]<= 2 else _config['vl_alto_leap_3']    if diffs[2][0] == 3 else _config['vl_alto_leap_4to5']    if diffs[2][0] <= 5 else _config['vl_alto_leap_gt5']    if diffs[2][0] <= 8 else _config['vl_alto_leap_gt8'])    + _config['vl_alto_leap_dissonant']    * diffs[2][1]  # Alto
+                        + (0 if diffs[3][0]<= 2 else _config['vl_soprano_leap_3'] if diffs[3][0] == 3 else _config['vl_soprano_leap_4to5'] if diffs[3][0] <= 5 else _config['vl_soprano_leap_gt5'] if diffs[3][0] <= 8 else _config['vl_soprano_leap_gt8']) + _config['vl_soprano_leap_dissonant'] * diffs[3][1]) # Soprano
+
             # prefer bass leaping down octave over bass leaping up.
-            if diffs[0][0]==8 and mus.interval.Interval(noteStart=chord1[0],noteEnd=chord2[0]).direction.value==1:
+            if _octave_rule and diffs[0][0]==8 and diffs[0][2]==1:
                 cost += _config['vl_bass_leaps_octave_up']
-            
+
             # SPECIAL CASE (REPEATED CHORD)
-            if rm1==rm2 and diffs[3][0]==1 and diffs[2][0]==1 and diffs[1][0]==1:
+            if _repeated_rule and diffs[3][0]==1 and diffs[2][0]==1 and diffs[1][0]==1:
                 cost += _config['vl_repeated_chord_static']
-            
+
             # PARALLELISMS
-            for i in range(3): # the i=3 (range(4)) case is degenerate.
-                i1, i2 = pchord1[i].midi, pchord2[i].midi
-                if i1 == i2: continue # oblique motion
-                for j in range(i+1, 4):
-                    j1, j2 = pchord1[j].midi, pchord2[j].midi
-                    
-                    # Parallel or Contrary fifths or octaves check.
-                    if (j1-i1)%12 == (j2-i2)%12 and (j1-i1)%12 in {0, 7}:
-                        cost += _config['vl_parallelism_outer'] if (i==0 and j==3) else _config['vl_parallelism']
-                    
-                    # Unequal 5ths. Bass & another voice has a º5 -> P5. (double not oblique voices)
-                    if i == 0 and j1 != j2 and (j1-i1)%12==6 and (j2-i2)%12==7:
-                        cost += _config['vl_unequal_5_outer'] if j==3 else _config['vl_unequal_5']
-            
+            if _parallel_rules:
+                for i in range(3): # the i=3 (range(4)) case is degenerate.
+                    i1, i2 = m1[i], m2[i]
+                    if i1 == i2: continue # oblique motion
+                    for j in range(i+1, 4):
+                        j1, j2 = m1[j], m2[j]
+
+                        # Parallel or Contrary fifths or octaves check.
+                        if (j1-i1)%12 == (j2-i2)%12 and (j1-i1)%12 in {0, 7}:
+                            cost += _config['vl_parallelism_outer'] if (i==0 and j==3) else _config['vl_parallelism']
+
+                        # Unequal 5ths. Bass & another voice has a º5 -> P5. (double not oblique voices)
+                        if i == 0 and j1 != j2 and (j1-i1)%12==6 and (j2-i2)%12==7:
+                            cost += _config['vl_unequal_5_outer'] if j==3 else _config['vl_unequal_5']
+
             # DIRECT/HIDDEN: Outer voices move in similar motion into P5 or P8 and soprano has a leap.
-            s1, s2, b1, b2 = pchord1[3].midi, pchord2[3].midi, pchord1[0].midi, pchord2[0].midi
-            if abs(s2-s1) > 2 and (s2-b2)%12 in {0,7}:
+            s1, s2, b1, b2 = m1[3], m2[3], m1[0], m2[0]
+            if _direct_rule and abs(s2-s1) > 2 and (s2-b2)%12 in {0,7}:
                 cost += _config['vl_direct_parallelism']
-            
+
             # Static melody in soprano
-            if s2 == s1:
+            if _static_rule and s2 == s1:
                 cost += _config['vl_melody_static']
-            
+
             # OUTER VOICES SHOULD NOT SIMILAR MOTION (should be incontrary motion instead)
-            if mus.interval.Interval(noteStart=chord1[3], noteEnd=chord2[3]).direction.value * mus.interval.Interval(noteStart=chord1[0], noteEnd=chord2[0]).direction.value == 1:
+            if _motion_rule and diffs[3][2] * diffs[0][2] == 1:
                 cost += _config['vl_outer_voices_similar_motion']
-            
+
             return cost
 
         return _voiceLeadingCost
 
 
+    def _get_transitionCostFunction(self, rm1, rm2):
+        """\
+        Vectorized counterpart of _get_voiceLeadingCostFunction (same context, same rules and costs).
+        Returns a function mapping VoicingArrays (A of rm1, B of rm2) to the len(A) x len(B)
+        matrix of voiceLeadingCosts: the rule features (see _get_transitionFeatureFunction) scored with the vl_ weights.
+        Rules with a 0 weight are left out of the features, as they are left out of the scalar kernel (see _ruleOn).
+        """
+        _features = self._get_transitionFeatureFunction(rm1, rm2, self.zeroRules)
+        _config = self.config
+
+        def _transitionCost(A, B):
+            return _features(A, B).score(_config)
+
+        return _transitionCost
+
+    def _get_transitionFeatureFunction(self, rm1, rm2, skip=frozenset()):
+        """\
+        Overrides FourPartBaseObject._get_transitionFeatureFunction().
+        Returns a function mapping VoicingArrays (A of rm1, B of rm2) to the RuleFeatures of every (A[k], B[j]) pair:
+        how many times each rule of _voiceLeadingCost is hit, computed with broadcast NumPy operations.
+        Each rule is keyed by its vl_ weight (and the cadential multiplier where it applies); weights are not read.
+        Rules keyed by a weight in skip are not evaluated (for features scored right away: see _get_transitionCostFunction).
+        """
+
+        # OVERHEAD (Non-voicing-dependent information on chords, used later)
+        _ctx = self._get_voiceLeadingContext(rm1, rm2)
+        _rm1_is_dominant, _rm2_is_dominant, _resolves = _ctx['rm1_is_dominant'], _ctx['rm2_is_dominant'], _ctx['resolves']
+        _LT, _FT, _DO, _MI = _ctx['LT'], _ctx['FT'], _ctx['DO'], _ctx['MI']
+        _DO_letter, _MI_letter = spellingLetter(_DO), spellingLetter(_MI)
+        _rm1_seventh, _rm2_seventh, _repeated = _ctx['rm1_seventh'], _ctx['rm2_seventh'], _ctx['repeated']
+
+        _multiplier = ('vl_lt_tt_violation_cadential_multiplier',) if _resolves else ()
+        _lt_keys = ((('vl_frustrated_lt_dominant',), ('vl_lt_violation_dominant',) + _multiplier) if _rm1_is_dominant
+                    else (('vl_frustrated_lt',), ('vl_lt_violation',)))
+        _on = lambda *keys: skip.isdisjoint(keys) # (rule enabled)
+
+        # LEAPS: per voice, the weights of its leap categories, and a lookup of the category (1..) of every undirected
+        # generic size (0: no cost), see _get_leapCosts
+        _voices = ('bass', 'tenor', 'alto', 'soprano')
+        _g = np.arange(64)
+        _leap_keys = [('vl_bass_leap_gt5', 'vl_bass_leap_gt8')] + [(f'vl_{v}_leap_3', f'vl_{v}_leap_4to5', f'vl_{v}_leap_gt5', f'vl_{v}_leap_gt8') for v in _voices[1:]]
+        _leap_category = [np.where((_g <= 5) | (_g == 8), 0, np.where(_g < 8, 1, 2))] + [np.select([_g <= 2, _g == 3, _g <= 5, _g <= 8], [0, 1, 2, 3], 4)] * 3
+        # enabled rules that need the spelled intervals of every voice, or the parallelism loop
+        _diffs = any(_on(k) for k in self.config if '_leap_' in k or k in {'vl_bass_leaps_octave_up', 'vl_outer_voices_similar_motion'}) or (_repeated and _on('vl_repeated_chord_static'))
+        _parallel_rules = any(_on(k) for k in ('vl_parallelism', 'vl_parallelism_outer', 'vl_unequal_5', 'vl_unequal_5_outer'))
+
+        def _transitionFeatures(A, B):
+            """\
+            Counts the rule hits of every (A[k], B[j]) voicing pair at once.
+            A and B are VoicingArrays; returns RuleFeatures over [len(A), len(B)].
+            """
+
+            F = RuleFeatures((len(A), len(B)))
+            # broadcast shapes: voice arrays of A are [L1,1], of B are [1,L2]
+            m1, st1, sp1 = A.midi[:, None, :], A.step[:, None, :], A.spell[:, None, :]
+            m2, st2, sp2 = B.midi[None, :, :], B.step[None, :, :], B.spell[None, :, :]
+
+            # (FUNCTION SPECIFIC)
+            # ti->ti or ti->do (ti->sol)
+            if _on(*_lt_keys[0]) or _on(*_lt_keys[1]):
+                lt_idx, has_lt = firstIndex(A.spell, _LT)
+                lt_st1 = A.step[np.arange(len(A)), lt_idx][:, None]
+                lt_st2, lt_sp2 = gatherVoices(B.step, lt_idx), gatherVoices(B.spell, lt_idx)
+                violation = (has_lt[:, None]
+                             & ~((lt_st2 == lt_st1) & (lt_sp2 == _LT))
+                             & ~((lt_st2 == stepsAbove(lt_st1, _DO_letter)) & (lt_sp2 == _DO))
+                             & ((lt_idx != 0)[:, None] | ~np.isin(B.spell[:, 0], (_LT, _DO))[None, :])) #ForgiveBass
+                # FRUSTRATED LEADING TONE (inner voice), see _voiceLeadingCost
+                inner = ((lt_idx == 1) | (lt_idx == 2))[:, None]
+                F.add(_lt_keys[0], violation & inner)
+                F.add(_lt_keys[1], violation & ~inner)
+
+            if _rm1_is_dominant:
+                # fa->mi
+                if not _rm2_is_dominant and _on('vl_dominant_tt_not_resolved', *_multiplier):
+                    for v in range(4):
+                        s1, s2 = st1[..., v], st2[..., v]
+                        F.add(('vl_dominant_tt_not_resolved',) + _multiplier,
+                              (sp1[..., v] == _FT)
+                              & ~((s2 == s1) & (sp2[..., v] == _FT))
+                              & ~((s2 == stepsBelow(s1, _MI_letter)) & (sp2[..., v] == _MI))
+                              & ((v != 0) | (sp2[..., v] == _MI))) #ForgiveBass
+
+            elif _rm1_seventh is not None and _on('vl_nd7_not_resolved'):
+                # non-dominant 7 resolution (down a m2 or M2)
+                seven_idx, _ = firstIndex(A.spell, _rm1_seventh)
+                k = np.arange(len(A))
+                s_st1, s_m1 = A.step[k, seven_idx][:, None], A.midi[k, seven_idx][:, None]
+                s_st2, s_sp2, s_m2 = gatherVoices(B.step, seven_idx), gatherVoices(B.spell, seven_idx), gatherVoices(B.midi, seven_idx)
+                generic, dissonant, _ = spelledIntervals(s_st1 - s_st2, s_m1 - s_m2)
+                F.add(('vl_nd7_not_resolved',),
+                      ~(((s_st2 == s_st1) & (s_sp2 == _rm1_seventh)) | ((generic == 2) & ~dissonant))
+                      & ((seven_idx != 0)[:, None] | ((s_m1 + 12 - s_m2) % 12 > 2))) #ForgiveBass
+
+            # non-dominant 7 preparation
+            if not _rm2_is_dominant and _rm2_seventh is not None and _on('vl_nd7_not_prepared'):
+                seven_idx, _ = firstIndex(B.spell, _rm2_seventh)
+                j = np.arange(len(B))
+                p_st2 = B.step[j, seven_idx][None, :]
+                p_st1, p_sp1 = A.step[:, seven_idx], A.spell[:, seven_idx]
+                F.add(('vl_nd7_not_prepared',),
+                      ~((p_st1 == p_st2) & (p_sp1 == _rm2_seventh))
+                      & ((seven_idx != 0)[None, :] | (p_sp1 == _rm2_seventh))) #ForgiveBass
+
+            # (GENERIC)
+            # VOICE CROSSING
+            if _on('vl_voice_crossing'):
+                F.add(('vl_voice_crossing',),
+                      (m1[..., 0] > m2[..., 1]).astype(np.uint8) + (m1[..., 1] < m2[..., 0]) + (m1[..., 1] > m2[..., 2])
+                      + (m1[..., 2] < m2[..., 1]) + (m1[..., 2] > m2[..., 3]) + (m1[..., 3] < m2[..., 2]))
+
+            # LEAPS
+            if _diffs:
+                generic, dissonant, direction = spelledIntervals(st2 - st1, m2 - m1) # [L1,L2,4]
+            for v in range(4):
+                if any(_on(key) for key in _leap_keys[v]):
+                    category = _leap_category[v][generic[..., v]]
+                    for c, key in enumerate(_leap_keys[v], 1):
+                        if _on(key):
+                            F.add((key,), category == c)
+                if _on(f'vl_{_voices[v]}_leap_dissonant'):
+                    F.add((f'vl_{_voices[v]}_leap_dissonant',), dissonant[..., v])
+
+            # prefer bass leaping down octave over bass leaping up.
+            if _on('vl_bass_leaps_octave_up'):
+                F.add(('vl_bass_leaps_octave_up',), (generic[..., 0] == 8) & (direction[..., 0] == 1))
+
+            # SPECIAL CASE (REPEATED CHORD)
+            if _repeated and _on('vl_repeated_chord_static'):
+                F.add(('vl_repeated_chord_static',), (generic[..., 3] == 1) & (generic[..., 2] == 1) & (generic[..., 1] == 1))
+
+            # PARALLELISMS
+            if _parallel_rules:
+                for i in range(3):
+                    i1, i2 = m1[..., i], m2[..., i]
+                    moving = i1 != i2 # (oblique motion excluded)
+                    for j in range(i+1, 4):
+                        j1, j2 = m1[..., j], m2[..., j]
+                        int1, int2 = (j1-i1) % 12, (j2-i2) % 12
+
+                        # Parallel or Contrary fifths or octaves check.
+                        key = 'vl_parallelism_outer' if (i==0 and j==3) else 'vl_parallelism'
+                        if _on(key):
+                            F.add((key,), moving & (int1 == int2) & ((int1 == 0) | (int1 == 7)))
+
+                        # Unequal 5ths. Bass & another voice has a º5 -> P5. (double not oblique voices)
+                        key = 'vl_unequal_5_outer' if j==3 else 'vl_unequal_5'
+                        if i == 0 and _on(key):
+                            F.add((key,), moving & (j1 != j2) & (int1 == 6) & (int2 == 7))
+
+            # DIRECT/HIDDEN: Outer voices move in similar motion into P5 or P8 and soprano has a leap.
+            s1, s2, b2 = m1[..., 3], m2[..., 3], m2[..., 0]
+            if _on('vl_direct_parallelism'):
+                outer = (s2-b2) % 12
+                F.add(('vl_direct_parallelism',), (np.abs(s2-s1) > 2) & ((outer == 0) | (outer == 7)))
+
+            # Static melody in soprano
+            if _on('vl_melody_static'):
+                F.add(('vl_melody_static',), s2 == s1)
+
+            # OUTER VOICES SHOULD NOT SIMILAR MOTION
+            if _on('vl_outer_voices_similar_motion'):
+                F.add(('vl_outer_voices_similar_motion',), direction[..., 3] * direction[..., 0] == 1)
+
+            return F.freeze()
+
+        return _transitionFeatures
+
+    def _get_leapCosts(self):
+        """\
+        Leap costs of _voiceLeadingCost as lookups: per voice (bass first), an array of the cost of a leap indexed
+        by its undirected generic size, and the extra cost of a dissonant leap.
+        """
+        _config = self.config
+        _g = np.arange(64)
+        _leap_costs = [np.where((_g <= 5) | (_g == 8), 0, np.where(_g < 8, _config['vl_bass_leap_gt5'], _config['vl_bass_leap_gt8']))] + [
+            np.select([_g <= 2, _g == 3, _g <= 5, _g <= 8], [0, _config[f'vl_{v}_leap_3'], _config[f'vl_{v}_leap_4to5'], _config[f'vl_{v}_leap_gt5']], _config[f'vl_{v}_leap_gt8'])
+            for v in ('tenor', 'alto', 'soprano')]
+        _leap_dissonant = [_config[f'vl_{v}_leap_dissonant'] for v in ('bass', 'tenor', 'alto', 'soprano')]
+        return _leap_costs, _leap_dissonant
+
+    def _get_voiceLeadingLowerBounds(self, rm1, rm2, V1, V2):
+        """\
+        Overrides FourPartBaseObject._get_voiceLeadingLowerBounds() with a tighter bound: each voice of V2[j] is reached
+        from the same voice of some voicing of V1, so it costs at least the cheapest leap (and bass octave leap) from
+        any pitch that voice takes in V1. Every other rule costs >= 0 (no negative vl_ weights).
+        """
+        if super()._get_voiceLeadingLowerBounds(rm1, rm2, V1, V2) is None:
+            return None
+
+        _leap_costs, _leap_dissonant = self._get_leapCosts()
+        _leap_costs = [c.tolist() for c in _leap_costs]
+        _octave_up = self.config['vl_bass_leaps_octave_up']
+        _intervals = INTERVALS
+        sources = [{(v.step[n], v.midi[n]) for v in V1} for n in range(4)] # distinct (step, midi) of every voice in V1
+        memo = {}
+
+        def cheapest(n, st2, m2):
+            if (n, st2, m2) not in memo:
+                costs = []
+                for st1, m1 in sources[n]:
+                    generic, dissonant, direction = _intervals[st2-st1][m2-m1]
+                    costs.append(_leap_costs[n][generic] + _leap_dissonant[n]*dissonant + (_octave_up if n == 0 and generic == 8 and direction == 1 else 0))
+                memo[n, st2, m2] = min(costs, default=0)
+            return memo[n, st2, m2]
+
+        return [sum(cheapest(n, v.step[n], v.midi[n]) for n in range(4)) for v in V2]
+
+    def _get_transitionLowerBounds(self, rm1, rm2, A, B):
+        """\
+        Overrides FourPartBaseObject._get_transitionLowerBounds() with a tighter bound: the leap costs (and bass octave
+        leap cost) of each pair, which are most of the voice leading cost. Every other rule costs >= 0 (no negative vl_ weights).
+        """
+        bounds = super()._get_transitionLowerBounds(rm1, rm2, A, B)
+        if bounds is None:
+            return None
+
+        _leap_costs, _leap_dissonant = self._get_leapCosts()
+        generic, dissonant, direction = spelledIntervals(B.step[None, :, :] - A.step[:, None, :], B.midi[None, :, :] - A.midi[:, None, :])
+        for v in range(4):
+            bounds = bounds + _leap_costs[v][generic[..., v]] + _leap_dissonant[v] * dissonant[..., v]
+        return bounds + self.config['vl_bass_leaps_octave_up'] * ((generic[..., 0] == 8) & (direction[..., 0] == 1))
+
     def _get_voiceLeadingCostFunction_Debug(self, rm1, rm2):
         """\
         Debug Version of Factory function for voiceLeadingCost pre-loaded with roman numerals.
         Executed once for every chord pair in DP. Uses closure to load config as local variables.
         """
-        
+
         # Stategy: precomputes chord data, returns one function with no recursive calls.
         # Alternatively we could return different functions based on chord information, but that seems unnecessary and possibly counterintuitive right now.
 
         # OVERHEAD (Non-voicing-dependent information on chords, used later)
-        _rm1_key = rm1.secondaryRomanNumeralKey if rm1.secondaryRomanNumeral else rm1.key
-        _rm2_key = rm2.secondaryRomanNumeralKey if rm2.secondaryRomanNumeral else rm2.key
-        # Functional
-        # NOTE: outdated. Should be replaced with new chord-based function model soon.
-        func1 = (lambda n: n[1].modifier+str(n[0]) if n[1] else str(n[0]))(rm1.scaleDegreeWithAlteration)
-        func2 = (lambda n: n[1].modifier+str(n[0]) if n[1] else str(n[0]))(rm2.scaleDegreeWithAlteration)
-        _rm1_is_dominant = func1 in dominantScaleDegrees[_rm1_key.mode]
-        _rm2_is_dominant = func2 in dominantScaleDegrees[_rm2_key.mode]
-        _rm2_is_tonic = func2 in tonicScaleDegrees[_rm2_key.mode]
-        # rm1 might resolve to rm2 as a secondary dominant rather than a cadence.
-        _resolves = _rm1_is_dominant and (_rm1_key.tonic.name == _rm2_key.getDominant().name if rm1.secondaryRomanNumeral else _rm2_is_tonic)
-        # Scale/pitch related
-        _rm1_scale = _rm1_key.getPitches()
-        _LT = _rm1_key.getLeadingTone().name # ti->do leading tone (WARNING: _rm1_scale[6] returns natural 7th degree in minor mode.)
-        _FT = _rm1_scale[3].name # fa->mi tendency tone
-        # Resolution tones (local variable shortcut optimizations)
-        _DO = _rm1_scale[0]
-        _SOL = _rm1_scale[4]
-        _MI = _rm1_scale[2]
+        _ctx = self._get_voiceLeadingContext(rm1, rm2)
+        _rm1_is_dominant, _rm2_is_dominant, _resolves = _ctx['rm1_is_dominant'], _ctx['rm2_is_dominant'], _ctx['resolves']
+        _LT, _FT, _DO, _MI = _ctx['LT'], _ctx['FT'], _ctx['DO'], _ctx['MI']
+        _DO_letter, _MI_letter = spellingLetter(_DO), spellingLetter(_MI)
+        _rm1_seventh, _rm2_seventh, _repeated = _ctx['rm1_seventh'], _ctx['rm2_seventh'], _ctx['repeated']
         # make local function reference (save reference): optimization... is it really necessary?
-        _above = octaveAbove
-        _below = octaveBelow
+        _above = stepAbove
+        _below = stepBelow
+        _intervals = INTERVALS # spelled interval table, indexed [step delta][semitone delta]
 
         # preload configs ('vl_': voice leading configs)
         _config = {k:v for k,v in self.config.items() if k.startswith('vl_')}
@@ -303,7 +644,7 @@ class FourPartChords(FourPartBaseObject):
 
             def __iadd__(self, other):
                 self.count += other
-                self.log(f"total_cost:{self.count} (added:{other})")
+                _log(f"total_cost:{self.count} (added:{other})")
                 return self
 
         _log = self.log
@@ -311,48 +652,48 @@ class FourPartChords(FourPartBaseObject):
         def _voiceLeadingCost_Debug(chord1, chord2):
             """\
             This method computes the costs of voice leading infractions/violations
-            and is run on every adjacent chord pair in a phrase.
+            and is run on every adjacent chord pair in a phrase. Chords are (compact) Voicings.
             """
             cost = counter(0)
-            
-            # helper/shorthands
-            pchord1 = chord1.pitches
-            pchord2 = chord2.pitches
-            
+
+            # helper/shorthands: (midi, diatonic step, spelling) of each voice
+            m1, st1, sp1 = chord1.midi, chord1.step, chord1.spell
+            m2, st2, sp2 = chord2.midi, chord2.step, chord2.spell
+
             # (FUNCTION SPECIFIC)
             if _rm1_is_dominant:
                 # ti->ti or ti->do (ti->sol)
-                if _LT in chord1.pitchNames:
-                    lt_idx = chord1.pitchNames.index(_LT) # leadingtone_index : there can only be one.
-                    if ( pchord2[lt_idx] not in (pchord1[lt_idx], mus.pitch.Pitch(_DO, octave=_above(_DO, pchord1[lt_idx])))
-                    and (lt_idx != 0 or chord2[0].name not in {_LT, _DO.name}) ): #ForgiveBass if it is *not* at all possible to resolve/sustain
-                        
+                if _LT in sp1:
+                    lt_idx = sp1.index(_LT) # leadingtone_index : there can only be one.
+                    if ( (st2[lt_idx], sp2[lt_idx]) not in ((st1[lt_idx], _LT), (_above(st1[lt_idx], _DO_letter), _DO))
+                    and (lt_idx != 0 or sp2[0] not in {_LT, _DO}) ): #ForgiveBass if it is *not* at all possible to resolve/sustain
+
                         # FRUSTRATED LEADING TONE (inner voice)
-                        if lt_idx in {1, 2} and mus.pitch.Pitch(_SOL, octave=_below(_SOL, chord1[lt_idx])): 
+                        if lt_idx in {1, 2}:
                             _log(f"VL: frustrated LT (dominant) voice:{lt_idx} cost:{_config['vl_frustrated_lt_dominant']}")
                             cost += _config['vl_frustrated_lt_dominant']
-                        else: 
+                        else:
                             _log(f"VL: LT violation (dominant) voice:{lt_idx} cost:{_config['vl_lt_violation_dominant']}, multiplier:{_config['vl_lt_tt_violation_cadential_multiplier'] if _resolves else 1}")
                             cost += _config['vl_lt_violation_dominant'] * (_config['vl_lt_tt_violation_cadential_multiplier'] if _resolves else 1)
                 # fa->mi
                 if not _rm2_is_dominant: # alternate condition: if _resolves. Note: even in resolution, Dom/V -> i64 can have the "fa" held/sustained before resolving to "mi."
-                    if _FT in chord1.pitchNames: # possibly more than one
-                        for ft_idx, p in enumerate(chord1.pitchNames):
-                            if ( p == _FT and pchord2[ft_idx] not in (chord1[ft_idx].pitch, mus.pitch.Pitch(_MI, octave=_below(_MI, pchord1[ft_idx])))
-                            and (ft_idx != 0 or chord2[ft_idx].name == _MI.name) ): #ForgiveBass
-                                
+                    if _FT in sp1: # possibly more than one
+                        for ft_idx in range(4):
+                            if ( sp1[ft_idx] == _FT and (st2[ft_idx], sp2[ft_idx]) not in ((st1[ft_idx], _FT), (_below(st1[ft_idx], _MI_letter), _MI))
+                            and (ft_idx != 0 or sp2[ft_idx] == _MI) ): #ForgiveBass
+
                                 _log(f"VL: fa->mi TT violation voice:{ft_idx} cost:{_config['vl_dominant_tt_not_resolved']}, multiplier:{_config['vl_lt_tt_violation_cadential_multiplier'] if _resolves else 1}")
                                 cost += _config['vl_dominant_tt_not_resolved'] * (_config['vl_lt_tt_violation_cadential_multiplier'] if _resolves else 1)
-            
+
             else: # rm1 not dominant
                 # ti->ti or ti->do (ti->sol)
-                if _LT in chord1.pitchNames:
-                    lt_idx = chord1.pitchNames.index(_LT) # leadingtone_index : there can only be one.
-                    if ( pchord2[lt_idx] not in (pchord1[lt_idx], mus.pitch.Pitch(_DO, octave=_above(_DO, pchord1[lt_idx])))
-                    and (lt_idx != 0 or chord2[0].name not in {_LT, _DO.name}) ): #ForgiveBass if it is *not* at all possible to resolve/sustain
-                        
+                if _LT in sp1:
+                    lt_idx = sp1.index(_LT) # leadingtone_index : there can only be one.
+                    if ( (st2[lt_idx], sp2[lt_idx]) not in ((st1[lt_idx], _LT), (_above(st1[lt_idx], _DO_letter), _DO))
+                    and (lt_idx != 0 or sp2[0] not in {_LT, _DO}) ): #ForgiveBass if it is *not* at all possible to resolve/sustain
+
                         # FRUSTRATED LEADING TONE (inner voice)
-                        if lt_idx in {1, 2} and mus.pitch.Pitch(_SOL, octave=_below(_SOL, chord1[lt_idx])): 
+                        if lt_idx in {1, 2}:
                             _log(f"VL: frustrated LT (nondominant) voice:{lt_idx} cost:{_config['vl_frustrated_lt']}")
                             cost += _config['vl_frustrated_lt']
                         else:
@@ -360,34 +701,32 @@ class FourPartChords(FourPartBaseObject):
                             cost += _config['vl_lt_violation']
 
                 # non-dominant 7 resolution
-                if rm1.containsSeventh():
-                    seventh = chord1.seventh
-                    seven_idx = pchord1.index(seventh) # (seventh cannot be doubled, so is unique)
+                if _rm1_seventh is not None:
+                    seven_idx = sp1.index(_rm1_seventh) # (seventh cannot be doubled, so is unique)
+                    step_down = _intervals[st1[seven_idx]-st2[seven_idx]][m1[seven_idx]-m2[seven_idx]]
                     # Resolutions have to go down a m2 or M2.
-                    if ( not (seventh == pchord2[seven_idx] or mus.interval.Interval(noteStart=chord2[seven_idx], noteEnd=chord1[seven_idx]).name in {'m2','M2'})
-                    and (seven_idx != 0 or (seventh.pitchClass + 12 - pchord2[seven_idx].pitchClass)%12 > 2) ): #ForgiveBass
-                        
+                    if ( not ((st2[seven_idx], sp2[seven_idx]) == (st1[seven_idx], _rm1_seventh) or (step_down[0] == 2 and not step_down[1]))
+                    and (seven_idx != 0 or (m1[seven_idx] + 12 - m2[seven_idx])%12 > 2) ): #ForgiveBass
+
                         _log(f"VL: Nondominant Seven not resolved (R of PSR) voice:{seven_idx} cost:{_config['vl_nd7_not_resolved']}")
                         cost += _config['vl_nd7_not_resolved']
 
             # non-dominant 7 preparation
-            if not _rm2_is_dominant and rm2.containsSeventh():
-                seventh = chord2.seventh
-                seven_idx = pchord2.index(seventh)
-                if ( pchord1[seven_idx] != seventh
-                and (seven_idx != 0 or chord1[seven_idx].name == seventh.name) ): #ForgiveBass && does not allow enharmonic equivalent (respelling) preparation.
+            if not _rm2_is_dominant and _rm2_seventh is not None:
+                seven_idx = sp2.index(_rm2_seventh)
+                if ( (st1[seven_idx], sp1[seven_idx]) != (st2[seven_idx], _rm2_seventh)
+                and (seven_idx != 0 or sp1[seven_idx] == _rm2_seventh) ): #ForgiveBass && does not allow enharmonic equivalent (respelling) preparation.
                     _log(f"VL: Nondominant Seven not prepared (S or PSR) voice:{seven_idx} cost:{_config['vl_nd7_not_prepared']}")
                     cost += _config['vl_nd7_not_prepared']
-            
+
             # (GENERIC)
             # VOICE CROSSING
-            dbgtemp = (chord1[0]>chord2[1])+(chord1[1]<chord2[0]) + (chord1[1]>chord2[2])+(chord1[2]<chord2[1]) + (chord1[2]>chord2[3])+(chord1[3]<chord2[2])
+            dbgtemp = (m1[0]>m2[1])+(m1[1]<m2[0]) + (m1[1]>m2[2])+(m1[2]<m2[1]) + (m1[2]>m2[3])+(m1[3]<m2[2])
             if dbgtemp: _log(f"DBG: Voice crossing: {dbgtemp} voices.")
-            cost += _config['vl_voice_crossing'] * ((chord1[0]>chord2[1])+(chord1[1]<chord2[0]) + (chord1[1]>chord2[2])+(chord1[2]<chord2[1]) + (chord1[2]>chord2[3])+(chord1[3]<chord2[2]))
-            
+            cost += _config['vl_voice_crossing'] * dbgtemp
+
             # LEAPS: Avoid big leaps (generally). Octave leaps in bass is ok. Extra penalty for dissonant leaps, semitone-steps are not considered dissonant leaps (d2s not yet considered)
-            diffs = [ (abs(i.generic.value), not(i.specifier in {mus.interval.Specifier.PERFECT, mus.interval.Specifier.MAJOR, mus.interval.Specifier.MINOR} or i.generic.value==1))
-                      for i in (mus.interval.Interval(noteStart=chord1[j], noteEnd=chord2[j]) for j in range(4)) ]
+            diffs = [ _intervals[st2[j]-st1[j]][m2[j]-m1[j]] for j in range(4) ] # (generic size, dissonant, direction)
             _log("LEAPS: diffs=", diffs)
             _log(f"Bass:{(0 if diffs[0][0] <= 5 or diffs[0][0] == 8 else _config['vl_bass_leap_gt5'] if diffs[0][0] <  8 else _config['vl_bass_leap_gt8'])} ::",
                 f"Tenor:{(0 if diffs[1][0]<= 2   else _config['vl_tenor_leap_3']   if diffs[1][0] == 3 else _config['vl_tenor_leap_4to5']   if diffs[1][0] <= 5 else _config['vl_tenor_leap_gt5']   if diffs[1][0] <= 8 else _config['vl_tenor_leap_gt8'])}, TChrom:{_config['vl_tenor_leap_dissonant'] * diffs[1][1]},",
@@ -397,34 +736,34 @@ class FourPartChords(FourPartBaseObject):
                     + (0 if diffs[1][0]<= 2 else _config['vl_tenor_leap_3']   if diffs[1][0] == 3 else _config['vl_tenor_leap_4to5']   if diffs[1][0] <= 5 else _config['vl_tenor_leap_gt5']   if diffs[1][0] <= 8 else _config['vl_tenor_leap_gt8'])   + _config['vl_tenor_leap_dissonant']   * diffs[1][1]  # Tenor
                     + (0 if diffs[2][0]<= 2 else _config['vl_alto_leap_3']    if diffs[2][0] == 3 else _config['vl_alto_leap_4to5']    if diffs[2][0] <= 5 else _config['vl_alto_leap_gt5']    if diffs[2][0] <= 8 else _config['vl_alto_leap_gt8'])    + _config['vl_alto_leap_dissonant']    * diffs[2][1]  # Alto
                     + (0 if diffs[3][0]<= 2 else _config['vl_soprano_leap_3'] if diffs[3][0] == 3 else _config['vl_soprano_leap_4to5'] if diffs[3][0] <= 5 else _config['vl_soprano_leap_gt5'] if diffs[3][0] <= 8 else _config['vl_soprano_leap_gt8']) + _config['vl_soprano_leap_dissonant'] * diffs[3][1]) # Soprano
-            
+
             # prefer bass leaping down octave over bass leaping up.
-            if diffs[0][0]==8 and mus.interval.Interval(noteStart=chord1[0],noteEnd=chord2[0]).direction.value==1:
+            if diffs[0][0]==8 and diffs[0][2]==1:
                 _log(f"Bass leaps octave up, cost:{_config['vl_bass_leaps_octave_up']}")
                 cost += _config['vl_bass_leaps_octave_up']
-            
+
             # SPECIAL CASE (REPEATED CHORD)
-            if rm1==rm2 and diffs[3][0]==1 and diffs[2][0]==1 and diffs[1][0]==1: cost += _config['vl_repeated_chord_static']
-            
+            if _repeated and diffs[3][0]==1 and diffs[2][0]==1 and diffs[1][0]==1: cost += _config['vl_repeated_chord_static']
+
             # PARALLELISMS
             for i in range(3): # the i=3 (range(4)) case is degenerate.
-                i1, i2 = pchord1[i].midi, pchord2[i].midi
+                i1, i2 = m1[i], m2[i]
                 if i1 == i2: continue # oblique motion
                 for j in range(i+1, 4):
-                    j1, j2 = pchord1[j].midi, pchord2[j].midi
-                    
+                    j1, j2 = m1[j], m2[j]
+
                     # Parallel or Contrary fifths or octaves check.
                     if (j1-i1)%12 == (j2-i2)%12 and (j1-i1)%12 in {0, 7}:
                         _log(f"Parallelism, voices:{i}&{j} cost:{_config['vl_parallelism']} outer_cost:{_config['vl_parallelism_outer']} outer:{i==0 and j==3}")
                         cost += _config['vl_parallelism_outer'] if (i==0 and j==3) else _config['vl_parallelism']
-                    
+
                     # Unequal 5ths. Bass & another voice has a º5 -> P5. (double not oblique voices)
                     if i == 0 and j1 != j2 and (j1-i1)%12==6 and (j2-i2)%12==7:
                         _log(f"Unequal Fifth, voices:{i}&{j} cost:{_config['vl_unequal_5']}, outer_cost:{_config['vl_unequal_5_outer']} outer:{j==3}")
                         cost += _config['vl_unequal_5_outer'] if j==3 else _config['vl_unequal_5']
-            
+
             # DIRECT/HIDDEN: Outer voices move in similar motion into P5 or P8 and soprano has a leap.
-            s1, s2, b1, b2 = pchord1[3].midi, pchord2[3].midi, pchord1[0].midi, pchord2[0].midi
+            s1, s2, b1, b2 = m1[3], m2[3], m1[0], m2[0]
             if abs(s2-s1) > 2 and (s2-b2)%12 in {0,7}:
                 _log(f"Direct fifth/octave in outer voices, cost:{_config['vl_direct_parallelism']}")
                 cost += _config['vl_direct_parallelism']
@@ -435,18 +774,19 @@ class FourPartChords(FourPartBaseObject):
                 cost += _config['vl_melody_static']
 
             # OUTER VOICES SHOULD NOT SIMILAR MOTION (should be incontrary motion instead)
-            if mus.interval.Interval(noteStart=chord1[3], noteEnd=chord2[3]).direction.value * mus.interval.Interval(noteStart=chord1[0], noteEnd=chord2[0]).direction.value == 1:
+            if diffs[3][2] * diffs[0][2] == 1:
                 _log(f"Outer voices in similar motion, cost:{_config['vl_outer_voices_similar_motion']}")
                 cost += _config['vl_outer_voices_similar_motion']
-            
+
             return cost.count
 
         return _voiceLeadingCost_Debug
 
     def _voiceLeadingCostDebug(self, chord1, rm1, chord2, rm2):
         """\
-        Simplifying construct for voiceLeadingCost
+        Simplifying construct for voiceLeadingCost. Accepts Voicings or music21 Chords.
         """
+        chord1, chord2 = [c if isinstance(c, Voicing) else Voicing.fromChord(c) for c in (chord1, chord2)]
         return self._get_voiceLeadingCostFunction_Debug(rm1, rm2)(chord1, chord2)
 
 
@@ -456,35 +796,61 @@ class FourPartChords(FourPartBaseObject):
 
         Given four notes to voice, try to voice using self.voices
         Also tasked to handle voicing rules. dist SA, AT < 8ve, dist TB < 2-8ves
+        Yields compact Voicings (see fourpart.voicing), enumerated with integer step/MIDI arithmetic only.
+        Doubled members only have their distinct orderings voiced (each SATB voicing is yielded once),
+        the number of duplicate voicings this avoids is counted in self.stats['voicing_duplicates_removed'].
         """
 
         assert len(chordMembers) == 4
 
+        # range bounds as (midi, step, spell) tuples, [voice][min, max, min_allowable, max_allowable]
+        _ranges = [[(p.midi, p.octave*7 + LETTERS.index(p.step), spellingId(p.name)) for p in voice] for voice in self.ranges]
+        _b_lb, _b_ub, _s_lb, _s_ub = _ranges[0][2], _ranges[0][3], _ranges[3][2], _ranges[3][3]
+        # Pitch comparisons (<=, >=) only accept an enharmonic bound when spelled the same (see music21.pitch.Pitch.__le__)
+        _within = lambda m, st, sp, lb, ub: (m > lb[0] or (st, sp) == lb[1:]) and (m < ub[0] or (st, sp) == ub[1:])
+        _midi = lambda st, alter: 12*(st//7 + 1) + _naturalPC[st % 7] + alter
+
+        # member name -> (letter, spell, alter)
+        members = {n: (LETTERS.index(n[0]), spellingId(n), spellingAlter(spellingId(n))) for n in chordMembers}
+
         # Strategy: try a random Soprano octave to start,
         # for Alto and Tenor there is basically only one correct choice; we are locked in.
-        bass = chordMembers.pop(0)
-        # sn,an,tn,bass: note names of chord members. s,a,t,b are pitches
-        for sn, an, tn in permutations(chordMembers, 3):
-            for s in self._generatePitches(mus.pitch.Pitch(sn), lb=self.ranges[3][2], ub=self.ranges[3][3]):
-                a = mus.pitch.Pitch(an)
-                a.octave = nextOctaveDown(an, s)
-                t = mus.pitch.Pitch(tn)
-                t.octave = nextOctaveDown(tn, a)
-                if not (self.ranges[2][2]<=a<=self.ranges[2][3] and self.ranges[1][2]<=t<=self.ranges[1][3]):
-                    continue # make sure Alto and Tenor are in range
-                for b in self._generatePitches(mus.pitch.Pitch(bass), lb=max(self.ranges[0][2], t.transpose('-d15')), ub=min(self.ranges[0][3], t.transpose('-m2'))):
-                    yield mus.chord.Chord(deepcopy([b,t,a,s]))
-
-    def voiceChord(self, rm):
+        bl, bsp, balter = members[chordMembers.pop(0)]
+        # sn,an,tn: note names of chord members. s,a,t,b (_st, _m) are steps and midi numbers of the voices
+        for (sn, an, tn), multiplicity in distinctPermutations(chordMembers, 3):
+            (sl, ssp, salter), (al, asp, aalter), (tl, tsp, talter) = members[sn], members[an], members[tn]
+            count = 0
+            # soprano in every octave from that of the lower bound, while below the upper bound (see _generatePitches)
+            s_st = _s_lb[1]//7*7 + sl
+            while _midi(s_st, salter) <= _s_ub[0]:
+                s_m = _midi(s_st, salter)
+                if s_m >= _s_lb[0]:
+                    # next octave down (see nextOctaveDown)
+                    a_st = stepBelow(s_st, al)
+                    t_st = stepBelow(a_st, tl)
+                    a_m, t_m = _midi(a_st, aalter), _midi(t_st, talter)
+                    # make sure Alto and Tenor are in range
+                    if _within(a_m, a_st, asp, _ranges[2][2], _ranges[2][3]) and _within(t_m, t_st, tsp, _ranges[1][2], _ranges[1][3]):
+                        # bass within range, and a minor 2nd to a diminished 15th below the tenor (-m2 is 1 step 1 semitone, -d15 is 14 steps 23 semitones)
+                        lb_m, lb_st = (t_m-23, t_st-14) if t_m-23 > _b_lb[0] else _b_lb[:2]
+                        ub_m = min(_b_ub[0], t_m-1)
+                        b_st = lb_st//7*7 + bl
+                        while _midi(b_st, balter) <= ub_m:
+                            b_m = _midi(b_st, balter)
+                            if b_m >= lb_m:
+                                yield Voicing((b_m, t_m, a_m, s_m), (b_st, t_st, a_st, s_st),
+                                              (b_m % 12, t_m % 12, a_m % 12, s_m % 12), (bsp, tsp, asp, ssp))
+                                count += 1
+                            b_st += 7
+                s_st += 7
+            self.addStat('voicing_duplicates_removed', count * (multiplicity-1)) # identical orderings would repeat these voicings
+
+    def _chordMemberSets(self, rm):
         """\
-        Overrides FourPartBaseObject.voiceChord(); only takes one argument (Roman Numeral).
-
-        Generates possible 4-part voicings for a triad or seventh chord.
-        Secondary dominants should be given in the key they tonicize, rather than the home key of the progression.
+        Helper function for voiceChord
+        Decides what set (multiset) of notes to use: yields lists of pitch names (bass first) for _generateVoicings.
         """
 
-        # Decides what set (multiset) of notes to use, hands off to _generateVoicings to determine potential voicings.
-
         # This step mostly determines doubling and avoids doubling leading/tendency tones.
         # Seventh chords can have incompelete voicings, but the fa->mi (aka the seventh) of seventh chords cannot be doubled (PSR Rule)
 
@@ -498,38 +864,98 @@ class FourPartChords(FourPartBaseObject):
 
         if rm.containsSeventh():
             # SEVENTH CHORD
-            yield from self._generateVoicings([p.name for p in rm.pitches])
+            yield ([p.name for p in rm.pitches])
             # Incomplete chord: Try omitting fifth if chord is in root position, unless chord is diminished (+half diminished)
             if rm.inversion() == 0 and rm.quality != 'diminished':
                 # double root
                 if rm.root().name != LT:
-                    yield from self._generateVoicings([rm.root().name]*2 + [rm.third.name, rm.seventh.name])
+                    yield ([rm.root().name]*2 + [rm.third.name, rm.seventh.name])
                 # double third
                 if rm.third.name != LT:
-                    yield from self._generateVoicings([rm.root().name, rm.seventh.name] + [rm.third.name]*2)
+                    yield ([rm.root().name, rm.seventh.name] + [rm.third.name]*2)
         else:
             # TRIAD
             chordMembers = [p.name for p in rm.pitches]
             if rm.inversion() == 2:
                 # 64 chord must double fifth
-                yield from self._generateVoicings(chordMembers + [rm.fifth.name])
+                yield (chordMembers + [rm.fifth.name])
             else:
                 # double root
                 if rm.root().name != LT:
-                    yield from self._generateVoicings(chordMembers + [rm.root().name])
+                    yield (chordMembers + [rm.root().name])
                     # Incomplete chord: Try omitting fifth if chord is in root position, unless chord is diminished
                     if rm.inversion() == 0 and rm.quality != 'diminished':
                         # tripled root
-                        yield from self._generateVoicings([rm.root().name]*3 + [rm.third.name])
+                        yield ([rm.root().name]*3 + [rm.third.name])
                         # doubled root and doubled third
                         if rm.third.name != LT:
-                            yield from self._generateVoicings([rm.root().name]*2 + [rm.third.name]*2)
+                            yield ([rm.root().name]*2 + [rm.third.name]*2)
                 # double third
                 if rm.third.name != LT:
-                    yield from self._generateVoicings(chordMembers + [rm.third.name])
+                    yield (chordMembers + [rm.third.name])
                 # double fifth
                 if rm.fifth.name != LT:
-                    yield from self._generateVoicings(chordMembers + [rm.fifth.name])
+                    yield (chordMembers + [rm.fifth.name])
+
+    def voiceChord(self, rm):
+        """\
+        Overrides FourPartBaseObject.voiceChord(); only takes one argument (Roman Numeral).
+
+        Generates possible 4-part voicings for a triad or seventh chord, returned as a VoicingSet (tuple of compact Voicings).
+        Secondary dominants should be given in the key they tonicize, rather than the home key of the progression.
+        """
+
+        return self.voicingCache.get(self._chordContext(rm) + (self.rangeFingerprint,), lambda: self._voiceChord(rm))
+
+    def _voiceChord(self, rm):
+        """voiceChord without the cache."""
+        # _chordMemberSets decides what sets (multisets) of notes to use, hands off to _generateVoicings to determine potential voicings.
+        chordMemberSets = [tuple(chordMembers) for chordMembers in self._chordMemberSets(rm)]
+        # the voicings only depend on the member sets and the ranges, which makes up the id of the set
+        return VoicingSet((v for chordMembers in chordMemberSets for v in self._generateVoicings(list(chordMembers))),
+                          id=(tuple(chordMemberSets), self.rangeFingerprint))
+
+    @staticmethod
+    def _chordContext(rm):
+        """Identifies a Roman numeral: figure, key (tonic, mode) and secondary key."""
+        secondary = rm.secondaryRomanNumeralKey
+        return (rm.figure, rm.key.tonic.name, rm.key.mode, (secondary.tonic.name, secondary.mode) if rm.secondaryRomanNumeral else None)
+
+    def _chordCacheKey(self, rm):
+        """Overrides FourPartBaseObject._chordCacheKey(): the chord context of rm."""
+        return self._chordContext(rm)
+
+    def _get_voiceLeadingSignature(self, rm1, rm2):
+        """\
+        Hashable signature of a chord pair's voice leading context (see _get_voiceLeadingContext): the voice leading
+        costs only depend on rm1 and rm2 through it, so distinct pairs with the same signature (and voicings) share their costs.
+        The context is reduced to what the rules actually read, entries that cannot affect the costs are set to None.
+        Memoized per pair of chord contexts (the reduction queries the pitches of rm1).
+        """
+        return self._signatureCache.get((self._chordContext(rm1), self._chordContext(rm2)),
+                                        lambda: self._reduceVoiceLeadingContext(self._get_voiceLeadingContext(rm1, rm2), rm1))
+
+    @staticmethod
+    def _reduceVoiceLeadingContext(ctx, rm1):
+        """Signature of a voice leading context, following the conditions of _voiceLeadingCost (see above)."""
+        members = {spellingId(p.name) for p in rm1.pitches} # tendency tones can only be checked if rm1 has them
+        dominant, dominant2 = ctx['rm1_is_dominant'], ctx['rm2_is_dominant']
+        lt = ctx['LT'] in members
+        fa_mi = dominant and not dominant2 and ctx['FT'] in members
+        return (
+            dominant,
+            ctx['resolves'] if dominant and (lt or fa_mi) else None, # (cadential multiplier)
+            dominant2 if dominant or ctx['rm2_seventh'] is not None else None,
+            (ctx['LT'], ctx['DO']) if lt else None,         # ti->do
+            (ctx['FT'], ctx['MI']) if fa_mi else None,      # fa->mi (sol is not used by any rule)
+            ctx['rm1_seventh'] if not dominant else None,   # non-dominant 7 resolution
+            ctx['rm2_seventh'] if not dominant2 else None,  # non-dominant 7 preparation
+            ctx['repeated'],
+        )
+
+    def _transitionCacheKey(self, rm1, rm2):
+        """Overrides FourPartBaseObject._transitionCacheKey(): the voice leading signature of the pair."""
+        return self._get_voiceLeadingSignature(rm1, rm2)
 
     # "Chord Mode"-Specific 4Part Writing Functions
     @staticmethod
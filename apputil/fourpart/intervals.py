@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+ #--------------#
+# Author:  @npvq #
+# Licence: GPLv3 #
+ #--------------#
+
+ #==================#
+# Module Description #
+ #==================#
+"""\
+Precomputed spelled-interval lookup tables, replacing music21.interval.Interval construction
+in the voice leading cost functions (and any future rule).
+
+Indexed by (directed diatonic step delta, directed semitone delta) between two pitches, e.g.
+INTERVALS[step2-step1][midi2-midi1], each entry is (generic, dissonant, direction):
+- generic:   undirected generic size, abs(Interval.generic.value) (1 = unison, 8 = octave)
+- dissonant: specifier class, True for augmented/diminished, False for perfect/major/minor (unisons never count)
+- direction: chromatic direction, Interval.direction.value (1, 0, -1)
+Deltas may be negative: like Python (and NumPy) sequences, the tables wrap negative indices around.
+"""
+
+# ----- SYSTEM IMPORTS ----- #
+
+
+
+# ----- 3RD PARTY IMPORTS ----- #
+
+import numpy as np
+
+# ----- LOCAL IMPORTS ----- #
+
+
+
+# ------------------------------ #
+
+TABLE_SIZE = 256 # supports deltas of up to 127 steps/semitones (the whole MIDI range) in either direction
+
+def spelledInterval(dstep, dsemi):
+    """\
+    Arithmetic equivalent of music21.interval.Interval(noteStart, noteEnd) for (generic, dissonant, direction).
+    Only used to build the tables (see music21.interval._getSpecifierFromGenericChromatic).
+    """
+    generic = abs(dstep) + 1
+    direction = (dsemi > 0) - (dsemi < 0)
+    if generic == 1:
+        return generic, False, direction
+    simple = (generic-1) % 7 + 1
+    normal = (None, 0, 2, 4, 5, 7, 9, 11)[simple] + 12*((generic-1)//7)
+    semis = -abs(dsemi) if (dstep > 0) - (dstep < 0) == -direction != 0 else abs(dsemi)
+    offset = semis - normal
+    if simple in {1, 4, 5}: # perfectable
+        return generic, offset != 0, direction
+    return generic, offset not in {0, -1}, direction
+
+_deltas = [d if d < TABLE_SIZE//2 else d - TABLE_SIZE for d in range(TABLE_SIZE)] # index -> signed delta
+
+# scalar table (nested tuples): INTERVALS[dstep][dsemi] -> (generic, dissonant, direction)
+INTERVALS = tuple(tuple(spelledInterval(dstep, dsemi) for dsemi in _deltas) for dstep in _deltas)
+
+# vectorized tables: INTERVAL_GENERIC[dstep, dsemi] etc., fancy-indexable with arrays of deltas
+_table = np.array(INTERVALS) # [TABLE_SIZE, TABLE_SIZE, 3]
+INTERVAL_GENERIC, INTERVAL_DISSONANT, INTERVAL_DIRECTION = _table[..., 0], _table[..., 1].astype(bool), _table[..., 2]
+
+def spelledIntervals(dstep, dsemi):
+    """Table lookup of (generic, dissonant, direction) for arrays of directed step and semitone deltas."""
+    return INTERVAL_GENERIC[dstep, dsemi], INTERVAL_DISSONANT[dstep, dsemi], INTERVAL_DIRECTION[dstep, dsemi]
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+ #--------------#
+# Author:  @npvq #
+# Licence: GPLv3 #
+ #--------------#
+
+ #==================#
+# Module Description #
+ #==================#
+"""\
+Algorithms over a solved DP lattice (chords x voicings, see FourPartBaseObject.DP_MemoizePhrase).
+LatticePaths: lazy enumeration of complete solutions in nondecreasing cost order, using the
+Recursive Enumeration Algorithm (Jimenez & Marzal, 1999) on top of the DP tables: the k-th best
+path into a voicing is derived from the (k-1)-th one, so the first solution is one retrace and
+every further one only costs the incremental work.
+"""
+
+# ----- SYSTEM IMPORTS ----- #
+
+import heapq
+
+# ----- 3RD PARTY IMPORTS ----- #
+
+
+
+# ----- LOCAL IMPORTS ----- #
+
+
+
+# ------------------------------ #
+
+class LatticePaths(object):
+    """\
+    Enumerates the complete paths of a solved DP lattice, best first.
+    DP[i][j] = (totalCost, backReference) as returned by the DP algorithms.
+    transitionCosts(i): costs from every voicing of chord i-1 to every voicing of chord i (list of lists), fetched lazily.
+    chordCosts(i, j): chord cost of voicing j of chord i (including the last chord's extra costs), fetched lazily.
+    mask: optional [i][j] booleans, False for voicings pruned by the DP (they are no one's predecessor),
+    so that enumeration happens over the same lattice the DP solved.
+    """
+
+    def __init__(self, DP, transitionCosts, chordCosts, mask=None):
+        self.DP = DP
+        self.transitionCosts = transitionCosts
+        self.chordCosts = chordCosts
+        self.mask = mask
+        self._C = {} # i -> transition costs into chord i
+        # k-best paths found so far into every voicing (and the virtual end node), as (totalCost, backReference, backRank)
+        self._paths = {}
+        self._candidates = {}
+
+    def _pathsInto(self, node):
+        """Best path into node = (i, j), from the DP table; node None is the virtual end node after the last chord."""
+        if node not in self._paths:
+            if node is None:
+                last = len(self.DP) - 1
+                cost, j = min((item[0], j) for j, item in enumerate(self.DP[last]))
+                self._paths[node] = [(cost, j, 0)]
+            else:
+                i, j = node
+                cost, back = self.DP[i][j]
+                # (a voicing past the first chord without back reference had every predecessor pruned: no path)
+                self._paths[node] = [(cost, back, None if back is None else 0)] if i == 0 or back is not None else []
+        return self._paths[node]
+
+    def _valid(self, i, k):
+        """Whether voicing k of chord i can be extended: not pruned and reachable."""
+        return (self.mask is None or self.mask[i][k]) and (i == 0 or self.DP[i][k][1] is not None)
+
+    def _initCandidates(self, node):
+        """Candidates for the 2nd best path into node: the best path of every other predecessor, extended."""
+        best = self._pathsInto(node)[0]
+        candidates = []
+        if node is None:
+            last = len(self.DP) - 1
+            candidates = [(item[0], j, 0) for j, item in enumerate(self.DP[last]) if j != best[1] and (last == 0 or item[1] is not None)]
+        else:
+            i, j = node
+            if i > 0:
+                if i not in self._C:
+                    self._C[i] = self.transitionCosts(i)
+                candidates = [(self._extend(node, k, self.DP[i-1][k][0]), k, 0) for k in range(len(self.DP[i-1]))
+                              if k != best[1] and self._valid(i-1, k)]
+        heapq.heapify(candidates)
+        self._candidates[node] = candidates
+
+    def _prev(self, node, k):
+        return (len(self.DP) - 1, k) if node is None else (node[0] - 1, k)
+
+    def _extend(self, node, k, cost):
+        """Cost of a path into voicing k of the previous chord, extended to node (summed in the same order as the DP)."""
+        if node is None:
+            return cost
+        i, j = node
+        return cost + self._C[i][k][j] + self.chordCosts(i, j)
+
+    def kthPath(self, node, k):
+        """The k-th (0-based) best path into node as (totalCost, backReference, backRank), or None if there are not that many."""
+        paths = self._pathsInto(node)
+        while len(paths) <= k:
+            if not paths or (node is not None and node[0] == 0):
+                return None # (a first chord voicing has exactly one path)
+            if node not in self._candidates:
+                self._initCandidates(node)
+            # the last path found continues into its predecessor's next best path
+            _, back, rank = paths[-1]
+            prev = self._prev(node, back)
+            nxt = self.kthPath(prev, rank + 1)
+            if nxt is not None:
+                heapq.heappush(self._candidates[node], (self._extend(node, back, nxt[0]), back, rank + 1))
+            if not self._candidates[node]:
+                return None
+            paths.append(heapq.heappop(self._candidates[node]))
+        return paths[k]
+
+    def retrace(self, k):
+        """Voicing indices (one per chord) of the k-th best complete path."""
+        cost, j, r = self.kthPath(None, k)
+        path = []
+        for i in reversed(range(len(self.DP))):
+            path.append(j)
+            _, j, r = self.kthPath((i, j), r)
+        path.reverse()
+        return path
+
+    def __iter__(self):
+        """Yields (totalCost, [voicing index of every chord]), best first."""
+        k = 0
+        while self.kthPath(None, k) is not None:
+            yield self.kthPath(None, k)[0], self.retrace(k)
+            k += 1
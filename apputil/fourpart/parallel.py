@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+ #--------------#
+# Author:  @npvq #
+# Licence: GPLv3 #
+ #--------------#
+
+ #==================#
+# Module Description #
+ #==================#
+"""\
+Multi-process solving for the fourpart engines.
+Phrases are independent DP problems (see algorithms README, "Break into Phrases"), so they can be solved
+by a pool of worker processes, each holding its own pre-initialized engine (and warm caches).
+Only text goes to the workers and only compact arrays come back: never music21 objects.
+"""
+
+# ----- SYSTEM IMPORTS ----- #
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import time
+import traceback
+
+# ----- 3RD PARTY IMPORTS ----- #
+
+import numpy as np
+
+# ----- LOCAL IMPORTS ----- #
+
+from fourpart.deadline import Deadline
+
+# ------------------------------ #
+
+def phraseLines(cp):
+    """Lines of a progression text that parseProgression turns into phrases (one phrase each), in order."""
+    return [l for l in cp.split("\n") if l.strip() and not l.strip().startswith('//')]
+
+
+def packPhrase(DP, V, mask=None, backward=None):
+    """\
+    Compact (picklable, music21-free) form of a solved phrase: per chord, a cost array and a back reference
+    array (-1 for None) for DP (and backward), a boolean array for the mask, and the compact voicings.
+    """
+    def packTable(table):
+        return [(np.asarray([item[0] for item in row]), np.asarray([-1 if item[1] is None else item[1] for item in row], dtype=np.int32)) for row in table]
+    return {
+        'DP': packTable(DP),
+        'V': V,
+        'mask': None if mask is None else [np.asarray(row, dtype=bool) for row in mask],
+        'backward': None if backward is None else packTable(backward),
+    }
+
+
+def unpackPhrase(packed):
+    """Inverse of packPhrase: (DP, V, mask, backward) in the engine's list form."""
+    def unpackTable(table):
+        return [list(zip(costs.tolist(), [None if b < 0 else b for b in backs.tolist()])) for costs, backs in table]
+    return (
+        unpackTable(packed['DP']),
+        packed['V'],
+        None if packed['mask'] is None else [row.tolist() for row in packed['mask']],
+        None if packed['backward'] is None else unpackTable(packed['backward']),
+    )
+
+
+# worker process state: one engine per process, built once by the pool's initializer.
+_engine = None
+
+def _initWorker(engineClass, config):
+    global _engine
+    _engine = engineClass(**config)
+    _engine.logStream = lambda s: None
+
+def _solvePhrase(line, until=None):
+    """\
+    Worker task: parses and solves one phrase line, returning it packed (see packPhrase) with the chord at which the
+    deadline expired ('deadline'). until: the deadline as a wall-clock (time.time) instant, None for none.
+    """
+    (phrase, _), = _engine.parseProgression(line)
+    deadline = None if until is None else Deadline(max(0, until - time.time()))
+    run = {}
+    DP, V = _engine.DP_MemoizePhrase(phrase, deadline=deadline, run=run)
+    backward = _engine.DP_MemoizePhraseBackward(phrase, V) if _engine.config['dp_backward'] else None
+    return dict(packPhrase(DP, V, run['mask'], backward), deadline=run['deadline'])
+
+
+class PhrasePool(object):
+    """\
+    A ProcessPoolExecutor of pre-initialized engines, configured like engine. Reusable across queries (the workers
+    keep their caches warm); rebuilt automatically if engine's config changed since. Use as a context manager,
+    or call shutdown() when done.
+    """
+
+    def __init__(self, engine, workers):
+        self.engine = engine
+        self.workers = workers
+        self._executor = None
+        self._config = None
+
+    def executor(self):
+        """The process pool, (re)started for engine's current config."""
+        if self._executor is None or self._config != self.engine.config:
+            self.shutdown()
+            self._config = self.engine.config # (immutable: configure replaces it)
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_initWorker,
+                                                 initargs=(type(self.engine), self._config))
+        return self._executor
+
+    def solvePhrases(self, cp, deadline=None):
+        """\
+        Solves every phrase of progression cp in the pool. Returns [(DP, V, mask, backward, deadlineRow)] in phrase order,
+        where deadlineRow is the chord at which the deadline (a fourpart.deadline.Deadline) expired, None if it did not.
+        The workers only see its time limit, as of the call: a later cancel() does not reach them.
+        """
+        lines = phraseLines(cp)
+        remaining = None if deadline is None else deadline.remaining()
+        until = [None if remaining is None else time.time() + remaining] * len(lines)
+        return [unpackPhrase(packed) + (packed['deadline'],) for packed in self.executor().map(_solvePhrase, lines, until)]
+
+    def solveLongPhrase(self, line, segments=None):
+        """Best solution of one long phrase (line) solved in segments by the pool (see solveSegmented)."""
+        return solveSegmented(self.engine, line, segments or self.workers, self.executor())
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+
+# ----- Batch solving ----- #
+
+def solveProgression(engine, cp):
+    """\
+    Parses and solves a whole progression, returning only what a batch needs (and pickles cheaply):
+    the best (totalCost, [compact voicing of every chord]) of every phrase.
+    """
+    solutions = []
+    for phrase, _ in engine.parseProgression(cp):
+        DP, V = engine.DP_MemoizePhrase(phrase)
+        op = min(range(len(DP[-1])), key=lambda j: DP[-1][j]) # (same choice as min(DP[-1]))
+        cost, sol = DP[-1][op][0], []
+        for ch in reversed(range(len(DP))): # ch=chord number
+            sol.append(V[ch][op])
+            op = DP[ch][op][1]
+        sol.reverse()
+        solutions.append((cost, sol))
+    return solutions
+
+def _solveItem(engine, cp):
+    """Solves one batch item, isolating its errors: (solutions, None) or (None, error description)."""
+    try:
+        return solveProgression(engine, cp), None
+    except Exception as e:
+        return None, ''.join(traceback.format_exception_only(type(e), e)).strip()
+
+def _solveItemWorker(cp):
+    return _solveItem(_engine, cp)
+
+def solve_many(engine, progressions, workers=None, maxInFlight=None, stats=None):
+    """\
+    Solves a whole corpus of progressions (an iterable of progression texts, consumed lazily), yielding one result
+    per progression as soon as it is done (in completion order with workers, so results carry their index):
+        {'index', 'solutions': [(totalCost, [compact voicings]) per phrase] or None, 'error': None or str, 'seconds'}
+    workers: number of worker processes (or a PhrasePool), None for in-process solving.
+    maxInFlight: bound on submitted but not yet yielded progressions (default 2 per worker), which bounds memory.
+    An error in one progression (bad chord symbol, ...) is reported in its result and does not stop the batch.
+    stats: optional dict, kept up to date with 'done', 'failed', 'seconds' and 'per_second' (throughput);
+    the summary is also logged at the end.
+    """
+    stats = {} if stats is None else stats
+    stats.update(done=0, failed=0, seconds=0.0, per_second=0.0)
+    start = time.time()
+
+    def record(index, result, seconds):
+        solutions, error = result
+        stats['done'] += 1
+        stats['failed'] += error is not None
+        stats['seconds'] = time.time() - start
+        stats['per_second'] = stats['done'] / stats['seconds'] if stats['seconds'] else 0.0
+        return {'index': index, 'solutions': solutions, 'error': error, 'seconds': seconds}
+
+    if not workers:
+        for index, cp in enumerate(progressions):
+            t = time.time()
+            result = _solveItem(engine, cp)
+            yield record(index, result, time.time() - t)
+    else:
+        pool = workers if isinstance(workers, PhrasePool) else PhrasePool(engine, workers)
+        maxInFlight = maxInFlight or 2 * pool.workers
+        pending = {} # future -> (index, submission time)
+        items = enumerate(progressions)
+        try:
+            while True:
+                for index, cp in items: # top up to maxInFlight
+                    pending[pool.executor().submit(_solveItemWorker, cp)] = (index, time.time())
+                    if len(pending) >= maxInFlight:
+                        break
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in sorted(finished, key=lambda f: pending[f][0]):
+                    index, submitted = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e: # (the task itself failed, e.g. a worker died)
+                        result = None, ''.join(traceback.format_exception_only(type(e), e)).strip()
+                    yield record(index, result, time.time() - submitted)
+        finally:
+            if pool is not workers:
+                pool.shutdown()
+
+    engine.log(f"BATCH: {stats['done']} progressions ({stats['failed']} failed) in {stats['seconds']:.2f} seconds, {stats['per_second']:.2f} progressions per second")
+
+
+# ----- Meet-in-the-middle (segmented) solving ----- #
+
+def _solveSegment(line, a, b, kind):
+    """Worker task: DP_Segment of chords a..b of a phrase line."""
+    (phrase, _), = _engine.parseProgression(line)
+    return _engine.DP_Segment(phrase, a, b, kind)
+
+def solveSegmented(engine, line, segments=2, executor=None):
+    """\
+    Best solution of one (long) phrase, solved as independent segments split at pivot chords: a forward DP from
+    the start, a backward (cost-to-go) DP from the end and, for segments > 2, min-plus transition matrices of the
+    segments in between (see DP_Segment). With an executor, the segments are solved concurrently, so latency scales
+    with phrase length / segments (plus the matrix segments' extra factor of voicings per chord); they are then
+    joined by min-plus composition at the pivots. Returns (totalCost, [voicing index of every chord]).
+    The cost is the optimum of the unpruned DP; among equally good solutions, another one may be returned.
+    """
+    (phrase, _), = engine.parseProgression(line)
+    L = len(phrase)
+    pivots = sorted(set(np.linspace(0, L-1, max(1, min(segments, L-1)) + 1).astype(int).tolist()))
+    if len(pivots) <= 2: # (a single segment: the plain forward DP)
+        pivots = [0, L-1, L-1]
+    kinds = ['matrix'] * (len(pivots)-1)
+    kinds[0], kinds[-1] = 'forward', 'backward'
+
+    tasks = list(zip(pivots, pivots[1:], kinds))
+    if executor is not None:
+        results = [f.result() for f in [executor.submit(_solveSegment, line, *task) for task in tasks]]
+    else:
+        results = [engine.DP_Segment(phrase, *task) for task in tasks]
+
+    # join: carry the forward costs across every matrix segment (min-plus vector x matrix), then meet the backward costs
+    f, _ = results[0]
+    sources = [] # best source voicing per voicing at each inner pivot
+    for M, _ in results[1:-1]:
+        total = f[:, None] + M
+        sources.append(total.argmin(axis=0))
+        f = total.min(axis=0)
+    h, _ = results[-1]
+    meet = int((f + h).argmin())
+    cost = (f + h)[meet].item()
+
+    # retrace: forward from the meeting pivot (backward segment), then backwards through the others
+    path = {pivots[-2]: meet}
+    a, b = tasks[-1][:2]
+    for i in range(a, b):
+        path[i+1] = int(results[-1][1][i][path[i]])
+    for t in reversed(range(len(tasks)-1)):
+        a, b, kind = tasks[t]
+        refs = results[t][1]
+        if kind == 'forward':
+            for i in reversed(range(1, b+1)):
+                path[i-1] = int(refs[i][path[i]])
+        else:
+            p = path[a] = int(sources[t-1][path[b]])
+            for i in reversed(range(a+2, b+1)):
+                path[i-1] = int(refs[i][p, path[i]])
+    return cost, [path[i] for i in range(L)]
@@ -11,12 +11,14 @@
 """\
 Settings for fourpart classes.
 default_config canonically imported and used in FourPartBaseObject.
+Config: the immutable (hashable, fingerprinted) mapping every engine configuration is held in.
 See Algorithm README for more information on config specification.
 """
 
 # ----- SYSTEM IMPORTS ----- #
 
-
+from collections.abc import Mapping
+import hashlib
 
 # ----- 3RD PARTY IMPORTS ----- #
 
@@ -29,7 +31,72 @@ from music21.pitch import Pitch
 
 # ------------------------------ #
 
-default_config = {
+class Config(Mapping):
+    """\
+    Immutable engine configuration: a read-only mapping from config keys to values (values are treated as read-only too).
+    Updates make new configs (replace), so one config can be shared by engines, threads and requests, and its
+    fingerprint (a digest of its contents, stable across processes) can key caches. Hashable and picklable.
+    """
+
+    __slots__ = ('_data', '_fingerprint')
+
+    def __init__(self, data=(), **kwargs):
+        self._data = dict(data, **kwargs)
+        self._fingerprint = None
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __eq__(self, other):
+        if isinstance(other, Config):
+            return self.fingerprint == other.fingerprint
+        return isinstance(other, Mapping) and self._data == dict(other)
+
+    def __hash__(self):
+        return hash(self.fingerprint)
+
+    def __reduce__(self):
+        return (Config, (self._data,))
+
+    def __repr__(self):
+        return f"Config({self._data!r})"
+
+    @staticmethod
+    def _stable(value):
+        """Value with a stable repr (pitches by name, as in the voicing cache keys)."""
+        return value.nameWithOctave if isinstance(value, Pitch) else value
+
+    @property
+    def fingerprint(self):
+        """Hex digest of the (key, value) items, equal for equal configs in every process."""
+        if self._fingerprint is None:
+            items = sorted((k, self._stable(v)) for k, v in self._data.items())
+            self._fingerprint = hashlib.sha1(repr(items).encode()).hexdigest()
+        return self._fingerprint
+
+    def replace(self, **kwargs):
+        """A new Config with kwargs updated (self is unchanged); self itself if nothing changes."""
+        if all(k in self._data and self._stable(self._data[k]) == self._stable(v) for k, v in kwargs.items()):
+            return self
+        return Config(self._data, **kwargs)
+
+    def changed(self, other):
+        """Keys whose values differ between self and other (or are only in one of them)."""
+        return {k for k in self._data.keys() | other.keys()
+                if k not in self._data or k not in other or self._stable(self._data[k]) != self._stable(other[k])}
+
+    def subset(self, keep):
+        """Config of the keys for which keep(key) is true (e.g. to fingerprint what one cost function reads)."""
+        return Config({k: v for k, v in self._data.items() if keep(k)})
+
+
+default_config = Config({
     # voice ranges
     'soprano_range_min': Pitch("E4"), # pitch.Pitch("C4"), # canonical, but a little too low and squishes other voices
     'soprano_range_max': Pitch("G5"),
@@ -48,12 +115,30 @@ default_config = {
     'bass_range_min_allowable': Pitch("D2"),
     'bass_range_max_allowable': Pitch("D4"),
 
+    # voicing cache: generated voicing sets, keyed by chord (figure, key, secondary key) and voice ranges
+    'voicing_cache_size': 512, # max number of chords kept in memory (0 disables)
+    'voicing_cache_dir': None, # optional directory for an on-disk tier shared across processes/restarts
+
+    # transition cache: transition cost matrices of chord pairs (numpy dp_engine), keyed by chord contexts, voicing sets and vl_ weights
+    'transition_cache_size': 256, # max number of matrices kept in memory (0 disables)
+    # feature cache: rule-hit counts behind those matrices (numpy dp_engine), keyed like them but without the weights, so that
+    # a change of vl_ weights re-scores the counts with a dot product instead of re-evaluating the rules
+    'feature_cache_size': 256, # max number of feature tensors kept in memory (0 disables)
+
     # DP settings
+    'dp_engine': 'numpy', # 'numpy' (vectorized transition cost matrices) or 'python' (scalar pair-by-pair loop); results are identical
+    'dp_branch_and_bound': True, # ('python' engine) exact: visit predecessors cheapest first, stop once none can beat the best one
     'dp_pruning': True,
     'dp_prune_first': True,
     'dp_confidence': 1.3,
     'dp_buffer': 10,
     'dp_first_buffer': 5000,
+    'dp_pair_budget': None, # adaptive pruning: target number of pair evaluations per chord (replaces dp_confidence/dp_buffer), None: off
+    'dp_pair_budget_phrase': None, # adaptive pruning: target number of pair evaluations per phrase, spread over the chords still to run
+    'dp_budget_widen_gap': 1, # adaptive pruning: keep twice as many voicings when the best two costs of a chord are this close
+    'dp_beam_width': 16, # dp_pruning='beam': number of lowest-cost voicings per chord that the next chord extends
+    'dp_deadline_beam': 8, # once a solve's deadline has expired, the remaining chords only extend this many best voicings per chord
+    'dp_backward': False, # (FPChordsQuery) also compute backward (cost-to-go) tables in every solve, see DP_MemoizePhraseBackward
 
     # chordCost costs/weights
     'ch_voice_outside_common_range': 4,
@@ -105,4 +190,4 @@ default_config = {
     'vl_melody_static': 5,
     'vl_outer_voices_similar_motion': 1,
     'vl_repeated_chord_static': 50,
-}
+})
@@ -30,6 +30,9 @@ import music21 as mus # unfortunately it is necessary
 
 from fourpart import do_nothing
 from fourpart.fpchords import FourPartChords
+from fourpart.lattice import LatticePaths
+from fourpart.parallel import PhrasePool
+from fourpart.deadline import Deadline
 
 # ------------------------------ #
 
@@ -45,7 +48,22 @@ class FPChordsQuery(object):
     Engine is required. Not meant to be used as a standalone class.
     """
 
-    def __init__(self, engine, cp, ts='4/4', consoleOutput=do_nothing):
+    def __init__(self, engine, cp, ts='4/4', consoleOutput=do_nothing, nBest=None, session=None, workers=None, deadline=None):
+        """\
+        nBest: if given, each phrase gets exactly its nBest best solutions (k-best DP) instead of the final-chord alternatives.
+        session: an FPChordsSession, whose previous solve is reused wherever the progression did not change
+            (not with nBest: a session keeps the rows of the 1-best DP).
+        workers: solve the phrases in parallel, in that many worker processes (or in a parallel.PhrasePool, to reuse one across queries);
+            not with nBest or session (the workers run the 1-best DP from scratch).
+        deadline: wall-clock budget in seconds (or a fourpart.deadline.Deadline, which can also be cancelled) for the whole query,
+            also with nBest, session or workers (whose processes only see the time limit, see PhrasePool.solvePhrases).
+            Phrases solved after it expired are still solved, quickly and possibly non-optimally (see DP_MemoizePhraseNoPruning);
+            self.data['deadline'][phr] is the chord at which that happened, None for phrases solved in full.
+        """
+        if nBest and session is not None:
+            raise ValueError("nBest cannot be combined with a session, which keeps the rows of the 1-best DP")
+        if workers and (nBest or session is not None):
+            raise ValueError("workers cannot be combined with nBest or a session: they run the 1-best DP from scratch")
         self.engine = engine
 
         self.engine.logging = True
@@ -56,20 +74,44 @@ class FPChordsQuery(object):
         # organization: self.data['TYPE'][PHRASE_NO] then possibly [CHORD_NO]
 
         # for DP, it is [PHRASE_NO][CHORD_NO][VOICING_NO][0=Current Cost, 1=Best Previous Candidate]
+        #   (with nBest, [PHRASE_NO][CHORD_NO][VOICING_NO][RANK][0=Current Cost, 1=Previous Candidate, 2=Its Rank])
         # for solutions, it is [PHRASE_NO][CHOICE][CHORD_NO][0=Chord Progression, 1=Cost]
 
         # remember, 'chords' is packed in singleton tuples for compatibility with other FP-Queries
 
-        self.data = {'chords': [], 'rhythm': [], 'DP': [], 'voicings': [], 'solutions': []}
+        self.data = {'chords': [], 'rhythm': [], 'DP': [], 'voicings': [], 'masks': [], 'backward': [], 'deadline': [], 'solutions': []}
+        if deadline is not None and not isinstance(deadline, Deadline):
+            deadline = Deadline(deadline)
+        self.nBest = nBest
+        self.session = session
 
         # solve (DP Memoize)
-        for p in self.engine.parseProgression(cp):
+        solved = None
+        if workers:
+            if isinstance(workers, PhrasePool):
+                solved = iter(workers.solvePhrases(cp, deadline))
+            else:
+                with PhrasePool(engine, workers) as pool:
+                    solved = iter(pool.solvePhrases(cp, deadline))
+        for p in (session.parseProgression(cp) if session is not None else self.engine.parseProgression(cp)):
             p_chords, p_rhythm = p
-            DP, V = engine.DP_MemoizePhrase(p_chords)
+            if solved is not None: # (solved by the worker processes)
+                DP, V, mask, backward, stopped = next(solved)
+            elif session is not None:
+                DP, V, mask, backward, stopped = session.solvePhrase(p_chords, deadline)
+            else:
+                run = {}
+                DP, V = engine.DP_MemoizePhraseKBest(p_chords, nBest, deadline=deadline, run=run) if nBest else engine.DP_MemoizePhrase(p_chords, deadline=deadline, run=run)
+                mask, stopped = None if nBest else run['mask'], run['deadline']
+                # backward (cost-to-go) tables: computed in the same solve with dp_backward, otherwise on first use
+                backward = engine.DP_MemoizePhraseBackward(p_chords, V) if engine.config['dp_backward'] and not nBest else None
             self.data['chords'].append(p_chords)
             self.data['rhythm'].append(p_rhythm)
             self.data['DP'].append(DP)
             self.data['voicings'].append(V)
+            self.data['masks'].append(mask)
+            self.data['backward'].append(backward)
+            self.data['deadline'].append(stopped)
 
         # integrity check
         self.length = len(self.data['chords'])
@@ -77,25 +119,81 @@ class FPChordsQuery(object):
 
         # choices: possible routes recovered from last chord. Cost <= max(99, 1.5*bestCost)
         self.data['solutions'] = [[] for _ in range(self.length)]
+        if nBest:
+            for phr in range(self.length):
+                for cost, path in self.engine.kBestSolutions(self.data['DP'][phr], nBest):
+                    solution = [self.data['voicings'][phr][ch][op].toChord() for ch, op in enumerate(path)] # materialize chosen voicings only
+                    self.data['solutions'][phr].append((solution, cost))
+            return
+
         for phr in range(self.length): # loop through every phrase
-            final_chord_DP = self.data['DP'][phr][-1]
-            finals = [(item[0], j) for j,item in enumerate(final_chord_DP)] #(cost, index), for alt-solution-search
-            finals.sort() # sort by first item (cost)
-            bestCost = finals[0][0]
-            maxCost = max(99, 1.5*bestCost)
-
-            # retrace all "valid" solutions
-            for cost, op in finals: # op = "optimal" solution to trace backwards.
-                if cost > maxCost:
-                    break # While loop breaking criteria. Precondition: sols is sorted.
-                
-                # retrace solution
-                solution = []
-                for ch in reversed(range(len(self.data['DP'][phr]))): # ch=chord number
-                    solution.append(mus.chord.Chord(self.data['voicings'][phr][ch][op]))
-                    op = self.data['DP'][phr][ch][op][1] # set op to op's backreference (to the last optimal element)
-                solution.reverse()
-                self.data['solutions'][phr].append((solution, cost))
+            if session is not None: # (phrases reused by the session keep their retraced solutions)
+                self.data['solutions'][phr] = session.solutions(phr, lambda: self._retraceSolutions(phr))
+            else:
+                self.data['solutions'][phr] = self._retraceSolutions(phr)
+
+    def _retraceSolutions(self, phr):
+        solutions = []
+        final_chord_DP = self.data['DP'][phr][-1]
+        finals = [(item[0], j) for j,item in enumerate(final_chord_DP)] #(cost, index), for alt-solution-search
+        finals.sort() # sort by first item (cost)
+        bestCost = finals[0][0]
+        maxCost = max(99, 1.5*bestCost)
+
+        # retrace all "valid" solutions
+        for cost, op in finals: # op = "optimal" solution to trace backwards.
+            if cost > maxCost:
+                break # While loop breaking criteria. Precondition: sols is sorted.
+            
+            # retrace solution
+            solution = []
+            for ch in reversed(range(len(self.data['DP'][phr]))): # ch=chord number
+                solution.append(self.data['voicings'][phr][ch][op].toChord()) # materialize chosen voicings only
+                op = self.data['DP'][phr][ch][op][1] # set op to op's backreference (to the last optimal element)
+            solution.reverse()
+            solutions.append((solution, cost))
+        return solutions
+
+    def optimalityGap(self, exact):
+        """Per phrase optimality gap of this query's solutions against exact, a query of the same progression solved exactly."""
+        return [self.engine.optimalityGap(DP, DP_exact) for DP, DP_exact in zip(self.data['DP'], exact.data['DP'])]
+
+    def iter_solutions(self, phr):
+        """\
+        Lazily yields the complete solutions of phrase phr as (solution, cost), in nondecreasing cost order (ties
+        in any order), until there are none left: enumeration walks the lattice the DP solved (voicings pruned
+        by the DP are never used as predecessors). The first solution is one retrace of the DP tables; every
+        later one only costs the incremental work (Recursive Enumeration Algorithm, see lattice.LatticePaths).
+        With nBest, the stored nBest solutions are yielded instead.
+        """
+        if self.nBest:
+            yield from self.data['solutions'][phr]
+            return
+
+        chords, V = self.data['chords'][phr], self.data['voicings'][phr]
+        lattice = LatticePaths(self.data['DP'][phr],
+                               lambda i: self.engine.DP_TransitionCosts(chords, V, i),
+                               lambda i, j: self.engine.chordCost(V[i][j], chords[i][0], last_chord=(i+1 == len(chords))),
+                               self.data['masks'][phr])
+        for cost, path in lattice:
+            yield [V[ch][op].toChord() for ch, op in enumerate(path)], cost # materialize chosen voicings only
+
+    def _backward(self, phr):
+        assert not self.nBest, "backward tables are only kept for the (1-best) DP"
+        if self.data['backward'][phr] is None:
+            self.data['backward'][phr] = self.engine.DP_MemoizePhraseBackward(self.data['chords'][phr], self.data['voicings'][phr])
+            if self.session is not None:
+                self.session.keepBackward(self.data['chords'][phr], self.data['backward'][phr])
+        return self.data['backward'][phr]
+
+    def bestCostThrough(self, phr, ch, op):
+        """Best total cost of phrase phr with voicing op pinned at chord ch (O(1) once the backward tables exist)."""
+        return self.engine.bestThrough(self.data['DP'][phr], self._backward(phr), ch, op)
+
+    def pinnedSolution(self, phr, ch, op):
+        """Best solution of phrase phr with voicing op pinned at chord ch, as (solution, cost): a retrace, not a re-solve."""
+        cost, path = self.engine.pinnedSolution(self.data['DP'][phr], self._backward(phr), ch, op)
+        return [self.data['voicings'][phr][c][o].toChord() for c, o in enumerate(path)], cost # materialize chosen voicings only
 
     def generateSolution(self, choices):
         # Collapsed SATB score.
@@ -145,6 +243,116 @@ class FPChordsQuery(object):
 
 
 
+class FPChordsSession(object):
+    """\
+    Incremental solving of a progression that is edited and re-solved, typically one chord at a time (GUI, web).
+    Keeps the voicing sets and DP rows (and backward tables, if any) of every phrase of the last solve; solve(cp)
+    diffs the newly parsed progression against it and
+    - reuses phrases whose chords are all unchanged outright,
+    - otherwise resumes the DP at the first changed chord of the phrase at the same position (rows before it are kept),
+    - and keeps the backward rows of its unchanged trailing chords.
+    Lines of the progression text that did not change are not re-parsed, and reused phrases keep their retraced
+    solutions. Any engine configuration change since the last solve discards everything. With dp_pruning='exact', a changed
+    phrase is solved from scratch (its bounds depend on the whole phrase), as are the first two chords with
+    dp_pruning=True (the first chord's pruning bar depends on the second chord's voicings), and a phrase whose length
+    changed with dp_pair_budget_phrase (its budget was spread over the old length). A phrase finished under an
+    expired deadline is never reused as is: only its rows before the deadline are kept.
+    """
+
+    def __init__(self, engine, ts='4/4', consoleOutput=do_nothing):
+        self.engine = engine
+        self.timeSignature = ts
+        self.consoleOutput = consoleOutput
+
+        self.phrases = [] # per phrase of the last solve: {'keys', 'V', 'DP', 'mask', 'backward', 'deadline', 'solutions'}
+        self._previous = []
+        self._parsed = {} # progression line -> parsed phrases (of the last solve)
+        self._config = None
+        self.stats = {'phrases_reused': 0, 'rows_reused': 0, 'rows_computed': 0, 'backward_rows_reused': 0}
+
+    def solve(self, cp, deadline=None):
+        """Solves progression cp (an FPChordsQuery), reusing the previous solve wherever possible. deadline: as in FPChordsQuery."""
+        self._previous, self.phrases = self.phrases if self._config == self.engine.config else [], []
+        query = FPChordsQuery(self.engine, cp, self.timeSignature, self.consoleOutput, session=self, deadline=deadline)
+        self._config = self.engine.config # (immutable: configure replaces it)
+        return query
+
+    def parseProgression(self, cp):
+        """engine.parseProgression, line by line: unchanged lines keep their parsed phrase."""
+        parsed = {line: self._parsed[line] if line in self._parsed else self.engine.parseProgression(line) for line in cp.split('\n')}
+        self._parsed = parsed
+        return [phrase for line in cp.split('\n') for phrase in parsed[line]]
+
+    def solutions(self, phr, retrace):
+        """Retraced solutions of phrase phr of the query being solved (retrace() unless the phrase was reused)."""
+        if self.phrases[phr].get('solutions') is None:
+            self.phrases[phr]['solutions'] = retrace()
+        return self.phrases[phr]['solutions']
+
+    def _chordKeys(self, phrase):
+        """What the DP rows of each chord depend on: its chord context (figure, key, secondary key)."""
+        return tuple(self.engine._chordContext(chordinfo[0]) for chordinfo in phrase)
+
+    def solvePhrase(self, phrase, deadline=None):
+        """\
+        DP tables of the next phrase of the query being solved, as (DP, V, mask, backward, deadlineRow).
+        deadline: optional fourpart.deadline.Deadline for the rows computed (see DP_MemoizePhraseNoPruning); deadlineRow
+        is the chord at which it expired, None if it did not.
+        """
+        keys = self._chordKeys(phrase)
+        L = len(keys)
+        for old in self._previous: # unchanged phrase (anywhere in the progression), unless it was cut short by a deadline
+            if old['keys'] == keys and old['deadline'] is None:
+                self.stats['phrases_reused'] += 1
+                self.stats['rows_reused'] += L
+                self.phrases.append(old)
+                return old['DP'], old['V'], old['mask'], old['backward'], None
+
+        # otherwise: the phrase at the same position, if any, shares a prefix and/or a suffix of chords
+        old = self._previous[len(self.phrases)] if len(self.phrases) < len(self._previous) else None
+        start, suffix = 0, 0
+        if old is not None:
+            M = len(old['keys'])
+            while start < min(L, M) and keys[start] == old['keys'][start]:
+                start += 1
+            if L != M: # the last chord's chord cost differs (last_chord), so its row cannot be kept unless it stays last
+                start = min(start, min(L, M) - 1)
+                if self.engine.config['dp_pair_budget_phrase'] is not None: # (its masks spread the budget over the old L)
+                    start = 0
+            while suffix < min(L, M) and keys[L-1-suffix] == old['keys'][M-1-suffix]:
+                suffix += 1
+            if old['deadline'] is not None: # rows from the deadline on only extended a beam (as did its mask of the row before)
+                start = min(start, old['deadline'] - 1)
+            if self.engine.config['dp_pruning'] == 'exact' or (self.engine.config['dp_pruning'] and start < 2):
+                start = 0
+
+        self.engine.log(f"Session: resuming phrase {len(self.phrases)+1} at chord {start+1} of {L}")
+        run = {}
+        if start:
+            DP, V = self.engine.DP_MemoizePhrase(phrase, resume=(old['V'][:start], old['DP'][:start], old['mask'] and old['mask'][:start]), deadline=deadline, run=run)
+        else:
+            DP, V = self.engine.DP_MemoizePhrase(phrase, deadline=deadline, run=run)
+        self.stats['rows_reused'] += start
+        self.stats['rows_computed'] += L - start
+
+        backward = None
+        if self.engine.config['dp_backward'] or (old is not None and old['backward'] is not None):
+            kept = old['backward'][len(old['backward'])-suffix:] if suffix and old['backward'] is not None else None
+            backward = self.engine.DP_MemoizePhraseBackward(phrase, V, suffix=kept)
+            self.stats['backward_rows_reused'] += len(kept or ())
+
+        self.phrases.append({'keys': keys, 'V': V, 'DP': DP, 'mask': run['mask'], 'backward': backward,
+                             'deadline': run['deadline'], 'solutions': None})
+        return DP, V, run['mask'], backward, run['deadline']
+
+    def keepBackward(self, phrase, backward):
+        """Remembers backward tables computed after the solve (on first use), for the next solve."""
+        keys = self._chordKeys(phrase)
+        for record in self.phrases:
+            if record['keys'] == keys and record['backward'] is None:
+                record['backward'] = backward
+
+
 def getInstrument():
         instr = mus.instrument.Piano()
         instr.instrumentName = ""
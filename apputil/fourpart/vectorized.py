@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+ #--------------#
+# Author:  @npvq #
+# Licence: GPLv3 #
+ #--------------#
+
+ #==================#
+# Module Description #
+ #==================#
+"""\
+NumPy helpers for the vectorized ('numpy') DP engine.
+Voicings of a chord are held as structure-of-arrays (VoicingArrays), so that the full
+len(V[i-1]) x len(V[i]) transition cost matrix can be computed with broadcasting.
+RuleFeatures: the weight independent rule-hit counts behind such a matrix, re-weighted by a dot product.
+"""
+
+# ----- SYSTEM IMPORTS ----- #
+
+import math
+
+# ----- 3RD PARTY IMPORTS ----- #
+
+import numpy as np # (music21 depends on numpy, so it is always available)
+
+# ----- LOCAL IMPORTS ----- #
+
+
+
+# ------------------------------ #
+
+class VoicingArrays(object):
+    """\
+    Structure-of-arrays view of a list of compact Voicings: midi[L,4], step[L,4], pc[L,4], spell[L,4].
+    Voice order is the same as in Voicing (bass first).
+    """
+
+    __slots__ = ('midi', 'step', 'pc', 'spell')
+
+    def __init__(self, voicings):
+        for attr in self.__slots__:
+            setattr(self, attr, np.array([getattr(v, attr) for v in voicings], dtype=np.int64).reshape(-1, 4))
+
+    def __len__(self):
+        return self.midi.shape[0]
+
+
+class RuleFeatures(object):
+    """\
+    Rule-hit counts (features) of every transition between two voicing sets, len(A) x len(B) pairs.
+    keys[r]: tuple of the config weights whose product is the cost of one hit of rule r (e.g. a weight and a multiplier),
+    counts[r]: uint8 matrix of how many times each pair hits rule r. Only rules hit at least once are kept (the tensor
+    is sparse over the rules), and nothing depends on the weights: score(config) re-weights it with one dot product.
+    Built with add(key, hits) for every rule, then freeze().
+    """
+
+    __slots__ = ('shape', 'keys', 'counts', '_hits')
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.keys, self.counts = (), None
+        self._hits = {}
+
+    def add(self, key, hits):
+        """Counts hits (booleans or counts, broadcastable to shape) of the rule costing the product of the key weights."""
+        hits = np.asarray(hits, dtype=np.uint8) # (a new array for boolean hits, the rules' temporaries otherwise)
+        if hits.shape != self.shape:
+            hits = np.broadcast_to(hits, self.shape).copy()
+        if key in self._hits:
+            self._hits[key] += hits
+        elif hits.any():
+            self._hits[key] = hits
+
+    def freeze(self):
+        """Stacks the counts (read-only from then on); returns self."""
+        self.keys = tuple(self._hits)
+        self.counts = np.stack([self._hits[key] for key in self.keys]) if self.keys else np.zeros((0,) + self.shape, dtype=np.uint8)
+        self.counts.flags.writeable = False
+        self._hits = None
+        return self
+
+    def score(self, config, rows=None):
+        """\
+        Cost matrix for the weights in config: sum over rules of weight x counts. int64 when every weight used is
+        integral (costs identical in value and type to the scalar engine), float64 otherwise.
+        rows: only score these rows (indices into the first axis), e.g. the predecessors a DP row keeps.
+        """
+        weights = [math.prod(config[k] for k in key) for key in self.keys]
+        dtype = np.int64 if all(isinstance(w, int) for w in weights) else np.float64
+        counts = self.counts if rows is None else self.counts[:, rows]
+        if not weights:
+            return np.zeros(counts.shape[1:], dtype=dtype)
+        return np.tensordot(np.asarray(weights, dtype=dtype), counts, axes=1)
+
+
+def stepsAbove(step, letter):
+    """Vectorized fourpart.voicing.stepAbove: next step strictly above with the given letter."""
+    d = (letter - step) % 7
+    return step + np.where(d == 0, 7, d)
+
+def stepsBelow(step, letter):
+    """Vectorized fourpart.voicing.stepBelow: next step strictly below with the given letter."""
+    d = (step - letter) % 7
+    return step - np.where(d == 0, 7, d)
+
+def firstIndex(spell, target):
+    """For each voicing (row of spell[L,4]), index of the first voice spelled as target, and whether there is one."""
+    hits = spell == target
+    return hits.argmax(axis=1), hits.any(axis=1)
+
+def gatherVoices(values, idx):
+    """values[L2,4], idx[L1] -> out[L1,L2] with out[k,j] = values[j, idx[k]]."""
+    return values[:, idx].T
+
+def minPlusRow(prev, C, mask=None):
+    """\
+    One DP row update: for every column j, the k minimizing prev[k] + C[k,j] over unmasked k.
+    Ties resolve to the smallest k, like the scalar loop. Returns (argmin[L2], min[L2]).
+    """
+    total = np.asarray(prev, dtype=np.float64)[:, None] + C
+    if mask is not None:
+        total[~np.asarray(mask, dtype=bool)] = np.inf
+    back = total.argmin(axis=0)
+    return back, total[back, np.arange(total.shape[1])]
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+ #--------------#
+# Author:  @npvq #
+# Licence: GPLv3 #
+ #--------------#
+
+ #==================#
+# Module Description #
+ #==================#
+"""\
+Compact (integer-encoded) voicing representation used on the DP hot path.
+music21 objects are only built from these once a solution has been chosen.
+
+Every voice (bass first, like a music21 Chord built from [b,t,a,s]) is stored as:
+- midi:  MIDI number (enharmonic pitch height)
+- step:  diatonic step number, octave*7 + letter (C=0..B=6)
+- pc:    pitch class, 0..11
+- spell: spelling id, position on the line of fifths (C=0, G=1, F=-1, F#=6, B-=-2 ...)
+Two pitches are "spelled equal" (music21 Pitch.__eq__) iff their steps and spellings match.
+"""
+
+# ----- SYSTEM IMPORTS ----- #
+
+
+
+# ----- 3RD PARTY IMPORTS ----- #
+
+import music21 as mus # only used to materialize voicings
+
+# ----- LOCAL IMPORTS ----- #
+
+
+
+# ------------------------------ #
+
+LETTERS = 'CDEFGAB'
+_fifths = {'C': 0, 'D': 2, 'E': 4, 'F': -1, 'G': 1, 'A': 3, 'B': 5} # letter -> line of fifths position
+_naturalPC = (0, 2, 4, 5, 7, 9, 11) # pitch class of natural letters, indexed by LETTERS
+
+def spellingId(name):
+    """Spelling id of a music21 pitch name (e.g. 'F#', 'B-', 'E--')."""
+    return _fifths[name[0]] + 7*(name.count('#') - name.count('-'))
+
+def spellingLetter(spell):
+    """Letter index (C=0..B=6) of a spelling id."""
+    return LETTERS.index('FCGDAEB'[(spell+1) % 7])
+
+def spellingAlter(spell):
+    """Number of semitones a spelling id is altered from its natural letter."""
+    return (spell - _fifths[LETTERS[spellingLetter(spell)]]) // 7
+
+def spellingName(spell):
+    """music21 pitch name of a spelling id (inverse of spellingId)."""
+    alter = spellingAlter(spell)
+    return LETTERS[spellingLetter(spell)] + ('#'*alter if alter > 0 else '-'*(-alter))
+
+def encodePitch(step, spell):
+    """(midi, step, pc, spell) of a pitch given its diatonic step number and spelling id."""
+    midi = 12*(step//7 + 1) + _naturalPC[step % 7] + spellingAlter(spell)
+    return midi, step, midi % 12, spell
+
+# helpers to fetch resolution target steps, equivalent to octaveAbove/octaveBelow (strict inequality)
+stepAbove = lambda step, letter: step + ((letter - step) % 7 or 7) # next step above with the given letter
+stepBelow = lambda step, letter: step - ((step - letter) % 7 or 7) # next step below with the given letter
+
+
+class Voicing(object):
+    """\
+    Immutable SATB voicing stored as four parallel integer tuples (bass first).
+    Hashable, cheap to compare and to pickle; see module description for the encoding.
+    """
+
+    __slots__ = ('midi', 'step', 'pc', 'spell')
+
+    def __init__(self, midi, step, pc, spell):
+        self.midi = midi
+        self.step = step
+        self.pc = pc
+        self.spell = spell
+
+    @classmethod
+    def fromSteps(cls, steps, spells):
+        """Builds a voicing from diatonic step numbers and spelling ids (bass first)."""
+        return cls(*map(tuple, zip(*(encodePitch(st, sp) for st, sp in zip(steps, spells)))))
+
+    @classmethod
+    def fromPitches(cls, pitches):
+        """Builds a voicing from music21 pitches (bass first). Only the numbers are kept."""
+        return cls.fromSteps([p.octave*7 + LETTERS.index(p.step) for p in pitches], [spellingId(p.name) for p in pitches])
+
+    @classmethod
+    def fromChord(cls, chord):
+        return cls.fromPitches(chord.pitches)
+
+    @property
+    def names(self):
+        return tuple(spellingName(s) for s in self.spell)
+
+    @property
+    def namesWithOctave(self):
+        return tuple(spellingName(s) + str(st//7) for st, s in zip(self.step, self.spell))
+
+    def toChord(self, **kwargs):
+        """Materializes the voicing as a music21 Chord (bass first)."""
+        return mus.chord.Chord([mus.pitch.Pitch(n) for n in self.namesWithOctave], **kwargs)
+
+    def __eq__(self, other):
+        return isinstance(other, Voicing) and self.step == other.step and self.spell == other.spell
+
+    def __hash__(self):
+        return hash((self.step, self.spell))
+
+    def __getstate__(self):
+        return (self.midi, self.step, self.pc, self.spell)
+
+    def __setstate__(self, state):
+        self.midi, self.step, self.pc, self.spell = state
+
+    def __repr__(self):
+        return f"<{type(self).__module__}.{type(self).__qualname__} {' '.join(self.namesWithOctave)}>"
+
+
+class VoicingSet(tuple):
+    """\
+    Tuple of the Voicings generated for a chord, tagged with an id identifying its contents:
+    sets with equal ids hold the same voicings in the same order (e.g. I in D and V in G).
+    """
+
+    def __new__(cls, voicings, id):
+        self = super().__new__(cls, voicings)
+        self.id = id
+        return self
+
+    def __reduce__(self):
+        return (type(self), (tuple(self), self.id))
@@ -59,7 +59,7 @@ def TEST_FPCHORDS_GETBEST(chordprogression, ts="4/4", engine=None):
         engine.log(f"Total Cost: {DP[-1][op][0]}")
         sol = []
         for i in reversed(range(len(phrase))):
-            sol.append(chord.Chord(V[i][op], lyric=phrase[i][0].figure))
+            sol.append(V[i][op].toChord(lyric=phrase[i][0].figure))
             op = DP[i][op][1] # set op to op's backreference (to the last optimal element)
         sol.reverse()
 
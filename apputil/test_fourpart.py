@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+ #--------------#
+# Author:  @npvq #
+# Licence: GPLv3 #
+ #--------------#
+
+ #==================#
+# Module Description #
+ #==================#
+"""\
+Automated checks of the fourpart engine (run `python -m pytest -q` from apputil).
+Small progressions only: every check should run in a few seconds.
+"""
+
+# ----- SYSTEM IMPORTS ----- #
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice, permutations
+import os
+import pickle
+
+# ----- 3RD PARTY IMPORTS ----- #
+
+import music21 as mus
+import numpy as np
+import pytest
+
+# ----- LOCAL IMPORTS ----- #
+
+from fourpart import audit, distinctPermutations
+from fourpart.corpus import BENCHMARKS
+from fourpart.deadline import Deadline
+from fourpart.fpchords import FourPartChords
+from fourpart.intervals import INTERVALS
+from fourpart.parallel import PhrasePool, solveSegmented, solve_many
+from fourpart.settings import default_config
+from fourpart.utils import FPChordsQuery, FPChordsSession
+from fourpart.vectorized import VoicingArrays
+from fourpart.voicing import Voicing
+
+# ------------------------------ #
+
+phrase = "Bb: I vi V/vi vi V6/V V/V V I IV7/V V/V V!2"
+short = "D: I IV V" # (brute force: every path)
+
+
+def engine(**config):
+    """A quiet engine."""
+    e = FourPartChords(**config)
+    e.logging = False
+    return e
+
+
+def enginePair(**config):
+    """The same engine twice: (vectorized, scalar), on the 'numpy' and the 'python' engine."""
+    return engine(dp_engine='numpy', **config), engine(dp_engine='python', **config)
+
+
+def parsePhrase(e, line):
+    (chords, _), = e.parseProgression(line)
+    return chords
+
+
+def bestCosts(query):
+    return [solutions[0][1] for solutions in query.data['solutions']]
+
+
+def assertSameSolve(query, expected, keys=('DP', 'masks')):
+    """Same tables under keys, and same best costs, in two queries of the same progression."""
+    for key in keys:
+        assert query.data[key] == expected.data[key], key
+    assert bestCosts(query) == bestCosts(expected)
+
+
+def pathCosts(e, line):
+    """Total cost of every path through the voicings of a short phrase, as an array indexed by voicing per chord."""
+    chords = parsePhrase(e, line)
+    V = [list(e.voiceChord(*chord)) for chord in chords]
+    total = np.array([e.chordCost(v, chords[0][0]) for v in V[0]])
+    for i in range(1, len(chords)):
+        (rm1,), (rm2,) = chords[i-1], chords[i]
+        transitions = np.array([[e.voiceLeadingCost(a, rm1, b, rm2) for b in V[i]] for a in V[i-1]])
+        total = total[..., None] + transitions.reshape((1,) * (i-1) + transitions.shape)
+        total = total + np.array([e.chordCost(v, rm2, last_chord=i+1 == len(chords)) for v in V[i]])
+    return total
+
+
+def bruteForceCosts(e, line):
+    """Total cost of every path through the voicings of a short phrase, ascending (no DP, no pruning)."""
+    return np.sort(pathCosts(e, line), axis=None).tolist()
+
+
+def pathCost(e, chords, V, path):
+    """Total cost of one path (a voicing index per chord), scored voicing by voicing."""
+    cost = e.chordCost(V[0][path[0]], chords[0][0])
+    for i in range(1, len(chords)):
+        (rm1,), (rm2,) = chords[i-1], chords[i]
+        cost += e.voiceLeadingCost(V[i-1][path[i-1]], rm1, V[i][path[i]], rm2)
+        cost += e.chordCost(V[i][path[i]], rm2, last_chord=i+1 == len(chords))
+    return cost
+
+
+# ----- Compact voicings ----- #
+
+def test_voicings_roundtrip_through_music21():
+    e = engine()
+    for chords in parsePhrase(e, phrase):
+        for v in e.voiceChord(*chords):
+            c = v.toChord()
+            assert Voicing.fromChord(c) == v
+            assert v.midi == tuple(p.midi for p in c.pitches)
+            assert v.pc == tuple(p.pitchClass for p in c.pitches)
+
+
+# ----- Spelled intervals ----- #
+
+def test_interval_table_matches_music21():
+    pitches = [mus.pitch.Pitch(letter + accidental + str(octave)) for letter in 'CDEFGAB' for accidental in ('', '#', '-') for octave in (2, 4)]
+    for p1 in pitches:
+        for p2 in pitches:
+            interval = mus.interval.Interval(p1, p2)
+            v1, v2 = Voicing.fromPitches([p1] * 4), Voicing.fromPitches([p2] * 4)
+            generic, dissonant, direction = INTERVALS[v2.step[0] - v1.step[0]][v2.midi[0] - v1.midi[0]]
+            assert generic == abs(interval.generic.value)
+            assert direction == interval.direction.value
+            assert dissonant == (generic != 1 and interval.specifier.name not in ('PERFECT', 'MAJOR', 'MINOR'))
+
+
+# ----- Voicing generation ----- #
+
+def test_distinct_permutations_cover_permutations_once():
+    members = ['D', 'F#', 'A', 'D']
+    distinct = list(distinctPermutations(members, 3))
+    assert len({p for p, _ in distinct}) == len(distinct)
+    assert {p for p, _ in distinct} == set(permutations(members, 3))
+    assert sum(n for _, n in distinct) == len(list(permutations(members, 3)))
+
+
+def test_voicings_have_no_duplicates():
+    e = engine()
+    for chords in parsePhrase(e, "D: I IV6 viio6 V7 I"):
+        V = list(e.voiceChord(*chords))
+        assert len(set(V)) == len(V)
+    assert e.stats['voicing_duplicates_removed'] > 0
+
+
+def test_voicings_follow_the_generation_rules():
+    e = engine()
+    for (rm, *_) in parsePhrase(e, phrase) + parsePhrase(e, "D: I IV6 viio6 V7 I"):
+        names = {p.name for p in rm.pitches}
+        for v in e.voiceChord(rm):
+            b, t, a, s = v.midi
+            assert b < t <= a <= s and s - a <= 12 and a - t <= 12 # (tenor above bass, SA and AT within an octave)
+            assert v.names[0] == rm.bass().name and set(v.names) <= names
+
+
+def test_voicings_match_the_music21_generator():
+    """Inversions, sevenths and altered chords in a major and a minor key, against test_fourpart_voicings.txt."""
+    e = engine()
+    with open(os.path.join(os.path.dirname(__file__), 'test_fourpart_voicings.txt')) as f:
+        expected = dict(line.rstrip('\n').split(' = ') for line in f if not line.startswith('#'))
+    for chord, voicings in expected.items():
+        (rm,), = parsePhrase(e, chord)
+        assert sorted(' '.join(p.nameWithOctave for p in v.toChord().pitches) for v in e.voiceChord(rm)) == voicings.split(', ')
+
+
+def test_voicing_disk_cache_survives_a_new_engine(tmp_path):
+    line = "D: I IV6 viio6 V7 I"
+    first = engine(voicing_cache_dir=str(tmp_path))
+    V = [first.voiceChord(*chord) for chord in parsePhrase(first, line)]
+    second = engine(voicing_cache_dir=str(tmp_path))
+    assert [second.voiceChord(*chord) for chord in parsePhrase(second, line)] == V
+    assert second.voicingCache.misses == 0 and second.voicingCache.hits > 0
+    assert [second.voiceChord(*chord) for chord in parsePhrase(second, "Bb: I vi V/vi")] == \
+        [engine().voiceChord(*chord) for chord in parsePhrase(second, "Bb: I vi V/vi")]
+
+
+# ----- NumPy engine ----- #
+
+@pytest.mark.parametrize('config', [{}, {'vl_melody_static': 2.5, 'vl_parallelism': 0}])
+def test_numpy_transition_costs_match_scalar(config):
+    vectorized, scalar = enginePair(**config)
+    for line in (phrase, "D: I IV V V7 I!4", "E: ii65 V/V V7 vi"):
+        chords = parsePhrase(scalar, line)
+        V = [list(scalar.voiceChord(*chord)) for chord in chords]
+        for (rm1,), (rm2,), V1, V2 in zip(chords, chords[1:], V, V[1:]):
+            costs = vectorized._get_transitionCostFunction(rm1, rm2)(VoicingArrays(V1), VoicingArrays(V2)).tolist()
+            assert costs == [[scalar.voiceLeadingCost(a, rm1, b, rm2) for b in V2] for a in V1]
+            if not config: # (integral weights: integral costs)
+                assert {type(c) for row in costs for c in row} == {int}
+
+
+def test_numpy_dp_tables_match_scalar():
+    vectorized, scalar = enginePair()
+    chords = parsePhrase(scalar, phrase)
+    assert vectorized.DP_MemoizePhrase(chords) == scalar.DP_MemoizePhrase(chords)
+
+
+# ----- Transition cost cache ----- #
+
+def test_memoized_transition_costs_match_uncached():
+    cp = "D: I IV V I!4\nG: I IV V I!4\nD: I IV V I!4"
+    cached, uncached = engine(), engine(transition_cache_size=0)
+    assert FPChordsQuery(cached, cp).data['DP'] == FPChordsQuery(uncached, cp).data['DP']
+    assert cached.transitionCache.hits > 0
+
+
+def test_reduced_signature_shares_matrices_across_keys():
+    cp = "D: I vi!4\nA: IV ii!4" # (same chords, neither dominant: one voice leading signature)
+    cached, uncached = engine(), engine(transition_cache_size=0)
+    assert FPChordsQuery(cached, cp).data['DP'] == FPChordsQuery(uncached, cp).data['DP']
+    assert (cached.transitionCache.hits, cached.transitionCache.misses) == (1, 1)
+
+
+# ----- Branch and bound, exact pruning ----- #
+
+def test_branch_and_bound_keeps_dp_tables():
+    chords = parsePhrase(engine(), phrase)
+    bounded, plain = engine(dp_engine='python', dp_branch_and_bound=True), engine(dp_engine='python', dp_branch_and_bound=False)
+    assert bounded.DP_MemoizePhrase(chords) == plain.DP_MemoizePhrase(chords)
+    assert bounded.stats['pairs_bounded'] > 0
+
+
+@pytest.mark.parametrize('dp_engine', ['numpy', 'python'])
+def test_exact_pruning_is_optimal(dp_engine):
+    e, full = engine(dp_pruning='exact', dp_engine=dp_engine), engine(dp_pruning=False, dp_engine=dp_engine)
+    for line in (short, phrase, "D: I IV V V7 I!4", "E: ii65 V/V V7 vi"):
+        assert bestCosts(FPChordsQuery(e, line)) == bestCosts(FPChordsQuery(full, line))
+    assert bestCosts(FPChordsQuery(e, short)) == [bruteForceCosts(full, short)[0]]
+    assert e.DP_MemoizePhrase(parsePhrase(e, "D: I")) == full.DP_MemoizePhrase(parsePhrase(full, "D: I")) # (one chord: nothing to prune)
+
+
+# ----- Alternative solutions ----- #
+
+@pytest.mark.parametrize('dp_engine', ['numpy', 'python'])
+def test_k_best_solutions_match_brute_force(dp_engine):
+    e = engine(dp_engine=dp_engine)
+    for line in (short, "D: I", "d: i"): # (a single chord is the first chord: no last chord costs, as in the 1-best DP)
+        solutions = FPChordsQuery(e, line, nBest=25).data['solutions'][0]
+        assert [cost for _, cost in solutions] == bruteForceCosts(e, line)[:25]
+        assert solutions[0][1] == bestCosts(FPChordsQuery(e, line))[0]
+
+
+@pytest.mark.parametrize('dp_engine', ['numpy', 'python'])
+def test_lattice_enumeration_matches_brute_force(dp_engine):
+    e = engine(dp_pruning=False, dp_engine=dp_engine) # (pruned voicings are not in the lattice)
+    solutions = list(islice(FPChordsQuery(e, short).iter_solutions(0), 40))
+    assert [cost for _, cost in solutions] == bruteForceCosts(e, short)[:40]
+    assert len({tuple(p.nameWithOctave for chord in solution for p in chord.pitches) for solution, _ in solutions}) == 40
+
+
+def test_best_cost_through_every_voicing_matches_brute_force():
+    e = engine(dp_pruning=False)
+    query, total = FPChordsQuery(e, short), pathCosts(e, short)
+    for ch in range(total.ndim):
+        through = total.min(axis=tuple(axis for axis in range(total.ndim) if axis != ch))
+        for op, cost in enumerate(through.tolist()):
+            assert query.bestCostThrough(0, ch, op) == cost
+            assert query.pinnedSolution(0, ch, op)[1] == cost
+
+
+# ----- Optimality audit ----- #
+
+def test_audit_reports_the_pruning_gap():
+    e = engine(dp_pruning=True)
+    chords = parsePhrase(e, phrase)
+    report = e.DP_AuditPhrase(chords)
+    DP_exact, _ = engine(dp_pruning=False).DP_MemoizePhrase(chords)
+    DP, _ = e.DP_MemoizePhrase(chords)
+    assert report['optimal'] == min(DP_exact[-1])[0] and report['cost'] == min(DP[-1])[0]
+    assert report['gap'] == report['cost'] - report['optimal'] >= 0
+    assert 0 < report['savings'] < 1 and report['pairs'] < report['pairs_exact']
+    assert len(report['path']) == len(chords)
+
+
+def test_audit_cli_reads_progression_files(tmp_path, capsys):
+    first = BENCHMARKS.splitlines()[0]
+    path = tmp_path / "progression.txt"
+    path.write_text(first + "\n")
+    status = audit.main([str(path)])
+    report = engine(dp_pruning=True).DP_AuditPhrase(parsePhrase(engine(), first))
+    assert status == (1 if report['gap'] > 0 else 0)
+    assert f"== {path}\n{first}\n    cost {report['cost']} (optimal {report['optimal']}" in capsys.readouterr().out
+
+
+# ----- Incremental sessions ----- #
+
+edits = [
+    "D: I IV V V7 I!4\nE: I IV V V7 I!4",
+    "D: I IV V V7 I!4\nE: I ii6 V V7 I!4", # one chord changed
+    "D: I IV V V7 I!4\nE: I ii6 V V7 vi I!4", # one chord inserted
+    "E: I ii6 V V7 vi I!4\nD: I IV V V7 I!4", # phrases swapped
+    "D: I IV V V7 I!4", # phrase removed
+]
+
+
+@pytest.mark.parametrize('dp_pruning', [False, True, 'exact', 'beam'])
+def test_session_matches_fresh_solves(dp_pruning):
+    e = engine(dp_pruning=dp_pruning, dp_backward=True)
+    session = FPChordsSession(e)
+    for cp in edits:
+        assertSameSolve(session.solve(cp), FPChordsQuery(e, cp), keys=('DP', 'masks', 'backward'))
+    assert session.stats['phrases_reused'] > 0 and session.stats['rows_reused'] > 0
+
+
+def test_session_rejects_nbest():
+    e = engine()
+    with pytest.raises(ValueError):
+        FPChordsQuery(e, short, nBest=3, session=FPChordsSession(e))
+
+
+# ----- Worker processes ----- #
+
+@pytest.fixture(scope='module')
+def pool():
+    with PhrasePool(engine(dp_backward=True), 2) as pool:
+        yield pool
+
+
+def test_worker_phrases_match_serial_solve(pool):
+    cp = edits[0] + "\n" + phrase
+    keys = ('DP', 'voicings', 'masks', 'backward', 'deadline')
+    assertSameSolve(FPChordsQuery(pool.engine, cp, workers=pool), FPChordsQuery(pool.engine, cp), keys)
+
+
+def test_workers_reject_nbest_and_session(pool):
+    for options in ({'nBest': 3}, {'session': FPChordsSession(pool.engine)}):
+        with pytest.raises(ValueError):
+            FPChordsQuery(pool.engine, short, workers=pool, **options)
+
+
+@pytest.mark.parametrize('segments', [1, 2, 3, 4])
+def test_segmented_solve_is_optimal(pool, segments):
+    e = engine(dp_pruning=False)
+    chords = parsePhrase(e, phrase)
+    DP, V = e.DP_MemoizePhrase(chords)
+    best = min(cost for cost, _ in DP[-1])
+    for executor in (None, pool.executor()):
+        cost, path = solveSegmented(e, phrase, segments, executor)
+        assert cost == best
+        assert len(path) == len(chords)
+        assert pathCost(e, chords, V, path) == best
+
+
+def test_batch_results_match_with_and_without_workers(pool):
+    corpus = edits[:3] + ["C: I Xq V"] + [phrase]
+    serial, stats = list(solve_many(pool.engine, corpus)), {}
+    parallel = sorted(solve_many(pool.engine, iter(corpus), workers=pool, maxInFlight=2, stats=stats), key=lambda r: r['index'])
+    assert [r['index'] for r in parallel] == list(range(len(corpus)))
+    assert [r['solutions'] for r in parallel] == [r['solutions'] for r in serial]
+    assert [r['error'] is not None for r in parallel] == [r['error'] is not None for r in serial] == [False, False, False, True, False]
+    assert stats['done'] == len(corpus) and stats['failed'] == 1
+    assert [cost for cost, _ in serial[4]['solutions']] == bestCosts(FPChordsQuery(pool.engine, phrase))
+
+
+# ----- Deadlines ----- #
+
+@pytest.mark.parametrize('dp_pruning', [False, True, 'exact', 'beam'])
+def test_expired_deadline_still_solves(dp_pruning):
+    chords = parsePhrase(engine(), phrase)
+    vectorized, scalar = enginePair(dp_pruning=dp_pruning)
+    run = {}
+    DP, V = vectorized.DP_MemoizePhrase(chords, deadline=Deadline(0), run=run)
+    assert run['deadline'] == 1
+    assert len(DP) == len(chords) and min(DP[-1])[0] < 1e9
+    assert vectorized.transitionCache.misses == 0 # (only the kept rows were computed)
+    assert scalar.DP_MemoizePhrase(chords, deadline=Deadline(0)) == (DP, V)
+    assert vectorized.DP_MemoizePhrase(chords, deadline=Deadline(60), run=run) == vectorized.DP_MemoizePhrase(chords)
+    assert run['deadline'] is None
+
+
+def test_concurrent_solves_keep_their_own_run_records():
+    e = engine()
+    chords = parsePhrase(e, phrase)
+    runs = [{} for _ in range(4)]
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(lambda n: e.DP_MemoizePhrase(chords, deadline=Deadline(0 if n % 2 else 60), run=runs[n]), range(4)))
+    assert [run['deadline'] for run in runs] == [None, 1, None, 1]
+    assert runs[0]['mask'] == runs[2]['mask'] != runs[1]['mask'] == runs[3]['mask']
+
+
+def test_cancelled_deadline_expires():
+    deadline = Deadline()
+    assert not deadline.expired() and deadline.remaining() is None
+    deadline.cancel()
+    assert deadline.expired() and deadline.remaining() == 0
+
+
+def test_query_deadline_with_nbest_session_and_workers(pool):
+    cp = edits[0]
+    e = pool.engine
+    expected = bestCosts(FPChordsQuery(e, cp, deadline=Deadline(0)))
+    for query in (FPChordsSession(e).solve(cp, deadline=Deadline(0)),
+                  FPChordsQuery(e, cp, workers=pool, deadline=Deadline(0)),
+                  FPChordsQuery(e, cp, nBest=1, deadline=Deadline(0))):
+        assert query.data['deadline'] == [1, 1]
+        assert bestCosts(query) == expected
+
+
+# ----- Beam search ----- #
+
+def test_beam_search_bounds():
+    chords = parsePhrase(engine(), phrase)
+    DP_exact, V = engine(dp_pruning=False).DP_MemoizePhrase(chords)
+    narrow, wide = engine(dp_pruning='beam', dp_beam_width=2), engine(dp_pruning='beam', dp_beam_width=max(map(len, V)))
+    run = {}
+    DP, _ = narrow.DP_MemoizePhrase(chords, run=run)
+    assert all(sum(kept) <= 2 for kept in run['mask'][:-1])
+    assert narrow.optimalityGap(DP, DP_exact)['gap'] >= 0
+    assert wide.DP_MemoizePhrase(chords)[0] == DP_exact # (as wide as every chord: nothing pruned)
+
+
+def test_beam_rows_come_from_memoized_matrices(monkeypatch):
+    chords = parsePhrase(engine(), phrase)
+    vectorized, scalar = enginePair(dp_pruning='beam', dp_beam_width=4)
+    DP, V = vectorized.DP_MemoizePhrase(chords)
+    assert scalar.DP_MemoizePhrase(chords) == (DP, V)
+    assert vectorized.transitionCache.misses == 0 # (only the beams were computed)
+    vectorized.overlay(dp_pruning=False).DP_MemoizePhrase(chords) # (memoizes every full matrix, in the shared cache)
+    monkeypatch.setattr(vectorized, '_get_transitionCostFunction', None)
+    assert vectorized.DP_MemoizePhrase(chords) == (DP, V)
+
+
+# ----- Adaptive pruning ----- #
+
+def test_pair_budget_bounds_every_chord():
+    chords = parsePhrase(engine(), phrase)
+    vectorized, scalar = enginePair(dp_pair_budget=500)
+    run = {}
+    DP, V = vectorized.DP_MemoizePhrase(chords, run=run)
+    assert scalar.DP_MemoizePhrase(chords) == (DP, V)
+    assert vectorized.transitionCache.misses == 0 # (only the kept pairs were computed)
+    assert [c['chord'] for c in run['cutoffs']] == list(range(len(chords) - 1))
+    for c in run['cutoffs']:
+        assert c['pairs'] == sum(run['mask'][c['chord']]) * len(V[c['chord'] + 1]) <= 2 * 500
+
+
+@pytest.mark.parametrize('edited', ["Bb: I vi V/vi vi V6/V V/V V I IV7/V V/V V I", "Bb: I vi V/vi vi V6/V V/V V I!2"])
+def test_session_phrase_budget_matches_fresh_solve(edited):
+    e = engine(dp_pruning=True, dp_pair_budget_phrase=2000)
+    session = FPChordsSession(e)
+    session.solve(phrase)
+    assertSameSolve(session.solve(edited), FPChordsQuery(e, edited))
+
+
+# ----- Configuration ----- #
+
+def test_config_is_immutable_and_fingerprinted():
+    with pytest.raises(TypeError):
+        default_config['vl_melody_static'] = 0
+    config = default_config.replace(vl_melody_static=9)
+    assert default_config['vl_melody_static'] != 9 and config['vl_melody_static'] == 9
+    assert config.fingerprint != default_config.fingerprint
+    assert config == pickle.loads(pickle.dumps(config)) and hash(config) == hash(default_config.replace(vl_melody_static=9))
+    assert default_config.replace(vl_melody_static=default_config['vl_melody_static']) is default_config
+    assert config.changed(default_config) == {'vl_melody_static'}
+
+
+def test_overlay_leaves_the_engine_untouched():
+    e = engine()
+    config = e.config
+    overlay = e.overlay(vl_melody_static=9, dp_pruning='exact')
+    assert e.config is config and overlay.config['vl_melody_static'] == 9
+    assert overlay.transitionCache is e.transitionCache and overlay.stats is e.stats
+    configured = engine(vl_melody_static=9, dp_pruning='exact')
+    assert e.solve(phrase, overrides={'vl_melody_static': 9, 'dp_pruning': 'exact'}) == configured.solve(phrase) == overlay.solve(phrase)
+    assert e.solve(phrase) == engine().solve(phrase)
+
+
+def test_overlays_solve_concurrently():
+    e = engine()
+    overrides = [{'dp_confidence': 1.5}, {'vl_melody_static': 9}, {'dp_pruning': 'exact'}, {'dp_engine': 'python'}] * 2
+    expected = [engine(**o).solve(phrase) for o in overrides]
+    with ThreadPoolExecutor(4) as threads:
+        assert list(threads.map(lambda o: e.solve(phrase, overrides=o), overrides)) == expected
+
+
+# ----- Rule features, specialized kernels ----- #
+
+reweighted = {'vl_melody_static': 9, 'vl_parallelism': 250, 'ch_triad_did_not_double_root': 7}
+zeroed = {k: 0 for k in ('vl_parallelism', 'vl_parallelism_outer', 'vl_voice_crossing', 'vl_melody_static', 'vl_frustrated_lt',
+                         'vl_nd7_not_resolved', 'vl_soprano_leap_dissonant', 'ch_triad_did_not_double_root', 'ch_last_not_authentic_third')}
+
+
+def test_reweighting_rescores_memoized_features():
+    e = engine(dp_pruning=False)
+    chords = parsePhrase(e, phrase)
+    e.DP_MemoizePhrase(chords)
+    e.configure(**reweighted)
+    hits = e.featureCache.hits
+    assert e.DP_MemoizePhrase(chords) == engine(dp_pruning=False, **reweighted).DP_MemoizePhrase(chords)
+    assert e.featureCache.hits > hits
+
+
+@pytest.mark.parametrize('dp_engine', ['numpy', 'python'])
+def test_zero_weight_kernels_match_full_kernels(dp_engine):
+    specialized = engine(dp_engine=dp_engine, **zeroed)
+    assert specialized.zeroRules == frozenset(zeroed)
+    for line in (phrase, "D: I IV V V7 I!4", "E: ii65 V/V V7 vi"):
+        chords = parsePhrase(specialized, line)
+        V = [specialized.voiceChord(*chord) for chord in chords]
+        full = engine() # (rule features of every rule, memoized, then re-scored with the zero weights)
+        for i in range(len(chords)):
+            full.chordCosts(chords, V, i)
+            if i:
+                full.DP_TransitionCosts(chords, V, i)
+        full.configure(**zeroed)
+        misses = full.featureCache.misses
+        for i in range(len(chords)):
+            assert specialized.chordCosts(chords, V, i) == full.chordCosts(chords, V, i)
+            assert [specialized.chordCost(v, chords[i][0], last_chord=i+1 == len(chords)) for v in V[i]] == full.chordCosts(chords, V, i)
+        for i in range(1, len(chords)):
+            assert specialized.DP_TransitionCosts(chords, V, i) == full.DP_TransitionCosts(chords, V, i)
+        assert full.featureCache.misses == misses